@@ -0,0 +1,213 @@
+"""A JSON / NDJSON HTTP API for batches and ranges of Collatz Conjecture seeds.
+
+Routes (registered on the Flask server of the Dash app under /api):
+    POST /api/seeds   body {"seeds": [27, "1000000000000000000000", ...], "trajectory": false}
+    GET  /api/range?start=1&stop=1000000&trajectory=0
+
+Each result is {"seed": n, "steps": s, "peak": p} (plus "trajectory": [...] when asked for), with
+exact integers.  With "trajectory": "parity" (or ?trajectory=parity) the trajectory is sent in its
+compact encoding instead, "parity": base64 of one bit per step (step i in bit i of byte i // 8,
+1 for a 3n+1 step, 0 for a halving), from which the values follow given the seed.
+
+Results are sent as one JSON document ({"results": [...]}) or streamed as NDJSON, one result per
+line, with ?format=ndjson or an 'Accept: application/x-ndjson' header.  Ranges are streamed by
+default, so the memory used by a response does not grow with its size.
+"""
+
+import functools
+import json
+import os
+import flask
+import collatz_conjecture as cc
+
+# Limits of a single request
+MAX_BATCH_SEEDS = 10000
+MAX_RANGE_SEEDS = 10**7
+
+# Seeds computed per chunk when streaming the stats of a range
+RANGE_CHUNK_SIZE = 1 << 16
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+# ----------------------------------------------------------------------------------------------
+
+class APIError(ValueError):
+    """Raised for a request the API cannot serve, sent back as a 400 response."""
+
+# ----------------------------------------------------------------------------------------------
+
+def parse_seed(value) -> int:
+    """Converts a seed given as a JSON integer or decimal string to an integer.
+
+    Raises:
+        APIError: If the value is not a positive integer.
+    """
+
+    try:
+        n = int(value) if isinstance(value, (int, str)) and not isinstance(value, bool) else None
+    except ValueError:
+        n = None
+
+    if n is None or n < 1:
+        raise APIError(f"Seeds must be positive integers, got {value!r}.")
+
+    return n
+
+# ----------------------------------------------------------------------------------------------
+
+def _flag(value) -> bool:
+    """Reads a boolean given as JSON or as a query string parameter."""
+
+    if isinstance(value, str):
+        return value.lower() in ('1', 'true', 'yes')
+
+    return bool(value)
+
+# ----------------------------------------------------------------------------------------------
+
+def _trajectory_option(value):
+    """Reads the trajectory option: None (stats only), 'values' or 'parity' (encoded)."""
+
+    if isinstance(value, str) and value.lower() == 'parity':
+        return 'parity'
+
+    return 'values' if _flag(value) else None
+
+# ----------------------------------------------------------------------------------------------
+
+def trajectory_record(trajectory, with_values=None) -> dict:
+    """Returns the result of one seed from its encoded trajectory (a parity_cc.ParityTrajectory).
+
+    with_values is None for the stats only, 'values' to add the values of the trajectory, or
+    'parity' to add its encoding.
+    """
+
+    record = {'seed': trajectory.seed,
+              'steps': len(trajectory),
+              'peak': trajectory.peak}
+
+    if with_values == 'parity':
+        record['parity'] = trajectory.to_json()['parity']
+    elif with_values:
+        record['trajectory'] = list(trajectory.decode())
+
+    return record
+
+# ----------------------------------------------------------------------------------------------
+
+@functools.lru_cache(maxsize=1)
+def range_index():
+    """Returns the known table of the stopping-time index named by CC_INDEX (see index_cc), None
+    if it is not set.  The index is opened once and stays mapped for the life of the process."""
+
+    path = os.environ.get('CC_INDEX')
+    if not path:
+        return None
+
+    import index_cc
+
+    return index_cc.StoppingTimeIndex(path).known()
+
+# ----------------------------------------------------------------------------------------------
+
+def range_records(start, stop):
+    """Yields the stats of every seed in [start, stop), computed chunk by chunk with cc.iter_stopping_times.
+
+    Seeds held by the CC_INDEX index are read from it instead of being computed.
+    """
+
+    for chunk_start, steps, peaks in cc.iter_stopping_times(start, stop, RANGE_CHUNK_SIZE, range_index()):
+        for n, s, p in zip(range(chunk_start, chunk_start + len(steps)), steps, peaks):
+            yield {'seed': n, 'steps': s, 'peak': p}
+
+# ----------------------------------------------------------------------------------------------
+
+def wants_ndjson(default=False) -> bool:
+    """Whether the current request asked for an NDJSON stream."""
+
+    fmt = flask.request.args.get('format')
+    if fmt:
+        return fmt == 'ndjson'
+
+    return default or NDJSON_MIMETYPE in flask.request.headers.get('Accept', '')
+
+# ----------------------------------------------------------------------------------------------
+
+def respond(records, ndjson):
+    """Sends results as a streamed NDJSON response or as a single JSON document."""
+
+    if ndjson:
+        lines = (json.dumps(record) + '\n' for record in records)
+        return flask.Response(flask.stream_with_context(lines), mimetype=NDJSON_MIMETYPE)
+
+    return flask.Response(json.dumps({'results': list(records)}), mimetype='application/json')
+
+# ----------------------------------------------------------------------------------------------
+
+def create_api(get_trajectory) -> flask.Blueprint:
+    """Creates the blueprint of the API.
+
+    Args:
+        get_trajectory (callable): Returns the (cached) parity_cc.ParityTrajectory of a seed, or
+            None when the seed is too large to be computed during a request.  The Dash app passes
+            its own, so batches (and ranges with trajectories) share the compute path and the
+            cache of the UI.  The stats of a range are computed outside the cache, chunk by chunk
+            with range_records (or read from CC_INDEX): ranges of up to MAX_RANGE_SEEDS seeds
+            would otherwise evict every trajectory the UI keeps.
+
+    Returns:
+        flask.Blueprint: The blueprint, to register on the Flask server.
+    """
+
+    api = flask.Blueprint('cc_api', __name__, url_prefix='/api')
+
+    def seed_record(n, with_values):
+        trajectory = get_trajectory(n)
+        if trajectory is None:
+            return {'seed': n, 'error': 'Seed is too large to be computed during a request.'}
+        return trajectory_record(trajectory, with_values)
+
+    @api.errorhandler(APIError)
+    def bad_request(error):
+        return flask.jsonify(error=str(error)), 400
+
+    @api.route('/seeds', methods=['POST'])
+    def seeds():
+        body = flask.request.get_json(silent=True)
+        if not isinstance(body, dict) or not isinstance(body.get('seeds'), list):
+            raise APIError('Expected a JSON object with a list of "seeds".')
+
+        if len(body['seeds']) > MAX_BATCH_SEEDS:
+            raise APIError(f"At most {MAX_BATCH_SEEDS} seeds per request, use /api/range for ranges.")
+
+        seeds = [parse_seed(n) for n in body['seeds']]
+        with_values = _trajectory_option(body.get('trajectory', False))
+
+        return respond((seed_record(n, with_values) for n in seeds), wants_ndjson())
+
+    @api.route('/range')
+    def seed_range():
+        try:
+            start = int(flask.request.args['start'])
+            stop = int(flask.request.args['stop'])
+        except (KeyError, ValueError):
+            raise APIError('Expected integer "start" and "stop" parameters.')
+
+        if start < 1 or stop < start:
+            raise APIError(f"Expected 1 <= start <= stop, got start={start}, stop={stop}.")
+        if stop - start > MAX_RANGE_SEEDS:
+            raise APIError(f"At most {MAX_RANGE_SEEDS} seeds per range.")
+
+        ndjson = wants_ndjson(default=True)
+        if not ndjson and stop - start > MAX_BATCH_SEEDS:
+            raise APIError(f"Ranges over {MAX_BATCH_SEEDS} seeds are only sent as NDJSON.")
+
+        with_values = _trajectory_option(flask.request.args.get('trajectory', False))
+        if with_values:
+            records = (seed_record(n, with_values) for n in range(start, stop))
+        else:
+            records = range_records(start, stop)
+
+        return respond(records, ndjson)
+
+    return api
@@ -0,0 +1,218 @@
+"""Computes the Collatz Conjecture for many seeds at once with NumPy."""
+
+import argparse
+from timeit import default_timer as timer
+import numpy as np
+import collatz_conjecture as cc
+
+# Largest odd value whose 3n+1 step still fits in a uint64 lane
+UINT64_ODD_LIMIT = (2**64 - 2) // 3
+
+# Retired lanes are dropped from the working arrays once they make up this fraction of them
+COMPACT_FRACTION = 0.5
+
+# ----------------------------------------------------------------------------------------------
+
+def batch_steps(seeds, cmap=None) -> np.ndarray:
+    """Computes the number of steps to reach 1 for every seed, advancing all of them in lock-step.
+
+    Each iteration applies one masked update to every active lane: odd lanes take the 3n+1 step
+    and the halving that always follows it (2 steps), even lanes are halved (1 step).  Lanes are
+    retired when they reach 1.  A lane whose next 3n+1 step would overflow uint64 (or a seed that
+    does not fit in one) is finished with Python integers instead.
+
+    Args:
+        seeds (iterable): Positive integer seeds.
+        cmap (cc.CollatzMap, optional): A generalized map to follow instead of 3n+1 (see
+            batch_map_steps). Defaults to None.
+
+    Returns:
+        np.ndarray: uint32 array of the number of steps (as counted by cc.do_cc) for each seed.
+
+    Raises:
+        ValueError: If any seed is less than 1.
+    """
+
+    seeds = list(seeds)
+    steps = np.zeros(len(seeds), dtype=np.uint32)
+
+    if any(n < 1 for n in seeds):
+        raise ValueError("Seeds must be positive integers.")
+
+    if cmap is not None and not cmap.is_standard:
+        return batch_map_steps(seeds, cmap)
+
+    # Seeds that do not fit in a lane go straight to the big-int path
+    lanes = []
+    for i, n in enumerate(seeds):
+        if n >= 2**64:
+            steps[i] = cc.stopping_time(n)[0]
+        else:
+            lanes.append(i)
+
+    index = np.array(lanes, dtype=np.int64)
+    values = np.array([seeds[i] for i in lanes], dtype=np.uint64)
+    counts = np.zeros(len(index), dtype=np.uint32)
+    active = values != 1
+
+    while True:
+        live = np.count_nonzero(active)
+
+        # Drop retired lanes once enough of them have accumulated
+        if live < COMPACT_FRACTION * len(active):
+            done = ~active
+            steps[index[done]] = counts[done]
+            index, values, counts = index[active], values[active], counts[active]
+            active = np.ones(len(index), dtype=bool)
+
+        if not live:
+            break
+
+        odd = values & 1
+        overflow = active & (odd == 1) & (values > UINT64_ODD_LIMIT)
+
+        if overflow.any():
+            for lane in np.flatnonzero(overflow):
+                counts[lane] += cc.stopping_time(int(values[lane]))[0]
+            active &= ~overflow
+
+        # (3n+1)/2 == n//2 + n + 1 for odd n, so both branches share one expression
+        np.copyto(values, (values >> 1) + odd*(values + 1), where=active)
+        np.add(counts, 1 + odd, out=counts, where=active, casting='unsafe')
+
+        active &= values != 1
+
+    steps[index[~active]] = counts[~active]
+
+    return steps
+
+# ----------------------------------------------------------------------------------------------
+
+def batch_map_steps(seeds, cmap) -> np.ndarray:
+    """Computes the number of steps to reach 1 for every seed under a generalized map, in lock-step.
+
+    Each iteration gathers the (a, b, d) rule of every active lane from its residue and applies
+    it with one masked update.  Every lane runs its own Brent cycle detection (a tortoise value,
+    a power of 2 and a distance), so lanes that enter a cycle or reach cmap.max_steps are retired
+    as cc.UNRESOLVED with constant memory per lane.  A lane whose next step would overflow uint64
+    (or a seed that does not fit in one) is finished with cc.map_stopping_time instead.
+
+    Args:
+        seeds (list): Positive integer seeds.
+        cmap (cc.CollatzMap): The map.
+
+    Returns:
+        np.ndarray: uint32 array of the number of steps for each seed, cc.UNRESOLVED for seeds
+            that never reach 1.
+    """
+
+    steps = np.zeros(len(seeds), dtype=np.uint32)
+    modulus = np.uint64(cmap.modulus)
+    max_steps = cmap.max_steps
+
+    # Per-residue rules, b split into its positive and negative parts to stay unsigned
+    a = np.array([rule[0] for rule in cmap.rules], dtype=np.uint64)
+    b_add = np.array([max(rule[1], 0) for rule in cmap.rules], dtype=np.uint64)
+    b_sub = np.array([max(-rule[1], 0) for rule in cmap.rules], dtype=np.uint64)
+    d = np.array([rule[2] for rule in cmap.rules], dtype=np.uint64)
+    limit = np.array([(2**64 - 1 - max(rule[1], 0)) // rule[0] for rule in cmap.rules], dtype=np.uint64)
+
+    lanes = []
+    for i, n in enumerate(seeds):
+        if n >= 2**64:
+            steps[i] = cc.map_stopping_time(n, cmap)[0]
+        else:
+            lanes.append(i)
+
+    index = np.array(lanes, dtype=np.int64)
+    values = np.array([seeds[i] for i in lanes], dtype=np.uint64)
+    counts = np.zeros(len(index), dtype=np.uint32)
+    tortoise = values.copy()
+    power = np.ones(len(index), dtype=np.uint64)
+    lam = np.ones(len(index), dtype=np.uint64)
+    active = values != 1
+
+    while True:
+        live = np.count_nonzero(active)
+
+        # Drop retired lanes once enough of them have accumulated
+        if live < COMPACT_FRACTION * len(active):
+            done = ~active
+            steps[index[done]] = counts[done]
+            index, values, counts = index[active], values[active], counts[active]
+            tortoise, power, lam = tortoise[active], power[active], lam[active]
+            active = np.ones(len(index), dtype=bool)
+
+        if not live:
+            break
+
+        residue = values % modulus
+        overflow = active & (values > limit[residue])
+
+        if overflow.any():
+            for lane in np.flatnonzero(overflow):
+                tail_steps = cc.map_stopping_time(int(values[lane]), cmap, max_steps - int(counts[lane]))[0]
+                counts[lane] = cc.UNRESOLVED if tail_steps == cc.UNRESOLVED else counts[lane] + tail_steps
+            active &= ~overflow
+
+        np.copyto(values, (a[residue]*values + b_add[residue] - b_sub[residue]) // d[residue], where=active)
+        np.add(counts, 1, out=counts, where=active, casting='unsafe')
+
+        reached = values == 1
+        unresolved = active & ~reached & ((values == tortoise) | (counts >= max_steps))
+        counts[unresolved] = cc.UNRESOLVED
+        active &= ~reached & ~unresolved
+
+        # Brent: move the tortoise to the current value every power of 2 steps
+        jump = active & (power == lam)
+        tortoise[jump] = values[jump]
+        power[jump] *= 2
+        lam[jump] = 0
+        lam[active] += 1
+
+    steps[index[~active]] = counts[~active]
+
+    return steps
+
+# ----------------------------------------------------------------------------------------------
+
+def benchmark(start, stop) -> tuple:
+    """Times batch_steps against calling cc.do_cc for every seed in [start, stop).
+
+    Args:
+        start (int): The first seed of the range.
+        stop (int): One past the last seed of the range.
+
+    Returns:
+        tuple : (batch_time, do_cc_time) in seconds.
+
+    Raises:
+        AssertionError: If the two disagree on the number of steps for any seed.
+    """
+
+    begin = timer()
+    steps = batch_steps(range(start, stop))
+    batch_time = timer() - begin
+
+    begin = timer()
+    expected = [len(cc.do_cc(n)[0]) for n in range(start, stop)]
+    do_cc_time = timer() - begin
+
+    assert steps.tolist() == expected, "batch_steps disagrees with do_cc"
+
+    return batch_time, do_cc_time
+
+# ----------------------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmarks the NumPy batch kernel against do_cc.')
+    parser.add_argument('start', type=int, nargs='?', default=1, help='First seed. Defaults to 1.')
+    parser.add_argument('stop', type=int, nargs='?', default=100000, help='One past the last seed. Defaults to 100000.')
+    args = parser.parse_args()
+
+    batch_time, do_cc_time = benchmark(args.start, args.stop)
+
+    print(f'Seeds: [{args.start}, {args.stop})')
+    print(f'batch_steps: {batch_time:.3f} s')
+    print(f'do_cc:       {do_cc_time:.3f} s ({do_cc_time/batch_time:.1f}x slower)')
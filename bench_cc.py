@@ -0,0 +1,350 @@
+"""Benchmarks the hot paths of the Collatz Conjecture core, plotting and Dash callbacks.
+
+Results are written as JSON so that runs can be compared over time:
+    python bench_cc.py --output before.json
+    python bench_cc.py --output after.json --compare before.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from timeit import default_timer as timer
+import collatz_conjecture as cc
+
+# Seeds of increasing size, from small ints to multi-thousand-digit big ints
+SEEDS = {'27': 27,
+         '2^64-1': 2**64 - 1,
+         '100_digits': 10**99 + 7,
+         '1000_digits': 10**999 + 7,
+         '3000_digits': 10**2999 + 7}
+
+DEFAULT_REPEAT = 5
+DEFAULT_MIN_TIME = 0.2
+
+# Startup cases of the CLI, plotting and server entry points: the arguments of a fresh interpreter,
+# and the budget (in seconds) of the import time it reports with -X importtime
+STARTUP_COMMANDS = {'startup/collatz_conjecture': ['-c', 'import collatz_conjecture'],
+                    'startup/collatz_conjecture_help': ['collatz_conjecture.py', '--help'],
+                    'startup/plot_cc': ['-c', 'import plot_cc'],
+                    'startup/dash_cc': ['-c', 'import dash_cc']}
+STARTUP_BUDGETS = {'startup/collatz_conjecture': 0.05,
+                   'startup/collatz_conjecture_help': 0.05,
+                   'startup/plot_cc': 0.1,
+                   'startup/dash_cc': 1.0}
+
+# Directory of the entry points, where the startup commands are run
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# ----------------------------------------------------------------------------------------------
+
+def measure(func, setup=None, repeat=DEFAULT_REPEAT, min_time=DEFAULT_MIN_TIME) -> dict:
+    """Times a function, calling it enough times per repeat to last at least min_time.
+
+    Args:
+        func (callable): The function to time, called without arguments.
+        setup (callable, optional): Called (untimed) before every call of func. Defaults to None.
+        repeat (int, optional): Number of timed repeats. Defaults to DEFAULT_REPEAT.
+        min_time (float, optional): Minimum duration of a repeat in seconds. Defaults to DEFAULT_MIN_TIME.
+
+    Returns:
+        dict: 'number' (calls per repeat) and 'min', 'median', 'mean' (seconds per call).
+    """
+
+    # Calibrate the number of calls per repeat
+    number = 1
+    while True:
+        elapsed = _run(func, setup, number)
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    times = [_run(func, setup, number) / number for _ in range(repeat)]
+
+    return {'number': number,
+            'min': min(times),
+            'median': statistics.median(times),
+            'mean': statistics.fmean(times)}
+
+# ----------------------------------------------------------------------------------------------
+
+def _run(func, setup, number) -> float:
+    """Returns the total time of number calls of func, excluding setup."""
+
+    total = 0.0
+
+    for _ in range(number):
+        if setup:
+            setup()
+        start = timer()
+        func()
+        total += timer() - start
+
+    return total
+
+# ----------------------------------------------------------------------------------------------
+
+def core_benchmarks(quick=False) -> dict:
+    """Returns the benchmarks of single steps, whole sequences and their parity encoding, by seed size."""
+
+    import parity_cc
+
+    benchmarks = {}
+
+    for name, n in SEEDS.items():
+        if quick and n.bit_length() > 4000:
+            continue
+
+        odd = n | 1
+        encoded = parity_cc.compute(n)
+        benchmarks[f'single_collatz_conjecture/{name}'] = lambda odd=odd: cc.single_collatz_conjecture(odd)
+        benchmarks[f'do_cc/{name}'] = lambda n=n: cc.do_cc(n)
+        benchmarks[f'do_cc_compact/{name}'] = lambda n=n: cc.do_cc_compact(n)
+        benchmarks[f'parity_compute/{name}'] = lambda n=n: parity_cc.compute(n)
+        benchmarks[f'parity_decode/{name}'] = encoded.decode
+
+    return benchmarks
+
+# ----------------------------------------------------------------------------------------------
+
+def range_benchmarks(quick=False) -> dict:
+    """Returns the benchmarks of the range scan engines."""
+
+    import batch_cc
+    import jump_cc
+
+    stop = 10**4 if quick else 10**5
+
+    return {f'stopping_times/1-{stop}': lambda: cc.stopping_times(1, stop),
+            f'scan_range/1-{stop}': lambda: cc.scan_range(1, stop),
+            f'jump_stopping_times/1-{stop}': lambda: jump_cc.jump_stopping_times(1, stop),
+            f'batch_steps/1-{stop}': lambda: batch_cc.batch_steps(range(1, stop))}
+
+# ----------------------------------------------------------------------------------------------
+
+def plot_benchmarks(quick=False) -> dict:
+    """Returns the benchmarks of figure construction, online (Dash) and offline (HTML, not written)."""
+
+    from plot_cc import plot_line
+
+    benchmarks = {}
+    seeds = {'27': 27, '2^1000-1': 2**1000 - 1} if quick else {'27': 27, '2^1000-1': 2**1000 - 1, '2^10000-1': 2**10000 - 1}
+
+    for name, n in seeds.items():
+        trajectory = cc.do_cc_compact(n)
+        benchmarks[f'plot_line/online/{name}'] = lambda t=trajectory: plot_line(t, None, 0, False, True)
+        benchmarks[f'plot_line/offline_player/{name}'] = lambda t=trajectory: plot_line(t, None, 0, filename=None)
+        benchmarks[f'plot_line/offline_frames/{name}'] = lambda t=trajectory: plot_line(t, None, 0, animation='frames', filename=None)
+
+    return benchmarks
+
+# ----------------------------------------------------------------------------------------------
+
+def callback_payload(app, name, values, triggered) -> dict:
+    """Builds the request body Dash's renderer posts to /_dash-update-component for a callback.
+
+    Args:
+        app (dash.Dash): The Dash app.
+        name (str): The name of the callback function.
+        values (dict): Values of the inputs and states, keyed by 'id.property' (None when missing).
+        triggered (str): The 'id.property' of the input that triggered the callback.
+
+    Returns:
+        dict: The JSON body of the request.
+    """
+
+    for output, spec in app.callback_map.items():
+        if getattr(spec['callback'], '__name__', None) == name:
+            break
+    else:
+        raise KeyError(f"No callback named {name}.")
+
+    def props(deps):
+        return [{**dep, 'value': values.get(f"{dep['id']}.{dep['property']}")} for dep in deps]
+
+    outputs = [dict(zip(('id', 'property'), key.split('.'))) for key in output.strip('.').split('...')]
+
+    return {'output': output,
+            'outputs': outputs if len(outputs) > 1 else outputs[0],
+            'inputs': props(spec['inputs']),
+            'state': props(spec['state']),
+            'changedPropIds': [triggered]}
+
+# ----------------------------------------------------------------------------------------------
+
+def dash_benchmarks(quick=False) -> dict:
+    """Returns the benchmarks of the update_table callback, run in-process through the Flask test client."""
+
+    import dash_cc
+
+    client = dash_cc.server.test_client()
+    benchmarks = {}
+
+    def post(body):
+        response = client.post('/_dash-update-component', json=body)
+        assert response.status_code == 200, response.status_code
+
+    for name, n in {'27': 27, '77031': 77031, '2^1000-1': 2**1000 - 1}.items():
+        body = callback_payload(dash_cc.app, 'update_table',
+                                {'dark-mode-switch.value': True, 'input-num-cc.value': str(n), 'cc-stats.data': []},
+                                'input-num-cc.value')
+        benchmarks[f'update_table/cold/{name}'] = (lambda body=body: post(body), dash_cc.cc_cache.clear)
+        benchmarks[f'update_table/cached/{name}'] = lambda body=body: post(body)
+
+    return benchmarks
+
+# ----------------------------------------------------------------------------------------------
+
+def start_interpreter(args, importtime=False) -> subprocess.CompletedProcess:
+    """Runs a fresh interpreter (so that nothing is already imported) with the given arguments."""
+
+    return subprocess.run([sys.executable] + ['-X', 'importtime'] * importtime + args, cwd=HERE,
+                          capture_output=True, text=True, check=True)
+
+# ----------------------------------------------------------------------------------------------
+
+def import_time(args) -> float:
+    """Returns the time a command spends importing modules, as reported by -X importtime.
+
+    The imports of the interpreter startup (up to and including site) are not counted, the
+    cumulative times of the top-level imports that follow are summed.
+    """
+
+    total = 0
+    started = False
+
+    # "import time: self [us] | cumulative | name", nested imports are indented after one space
+    for line in start_interpreter(args, importtime=True).stderr.splitlines():
+        fields = line.split('|')
+        if not line.startswith('import time:') or not fields[1].strip().isdigit():
+            continue
+        if started and not fields[2].startswith('  '):
+            total += int(fields[1])
+        started = started or fields[2].strip() == 'site'
+
+    return total / 1e6
+
+# ----------------------------------------------------------------------------------------------
+
+def startup_benchmarks(quick=False) -> dict:
+    """Returns the benchmarks of starting each entry point (wall-clock, interpreter startup included).
+
+    run() also measures their import time, which is checked against STARTUP_BUDGETS.
+    """
+
+    return {name: lambda args=args: start_interpreter(args) for name, args in STARTUP_COMMANDS.items()}
+
+# ----------------------------------------------------------------------------------------------
+
+def run(groups, quick=False, repeat=DEFAULT_REPEAT, min_time=DEFAULT_MIN_TIME, select=None) -> dict:
+    """Runs benchmark groups and returns the machine-readable results.
+
+    Args:
+        groups (list): Names of the groups to run ('core', 'range', 'plot', 'dash', 'startup').
+        quick (bool, optional): Whether to use smaller inputs. Defaults to False.
+        repeat (int, optional): Number of timed repeats. Defaults to DEFAULT_REPEAT.
+        min_time (float, optional): Minimum duration of a repeat in seconds. Defaults to DEFAULT_MIN_TIME.
+        select (str, optional): Only run benchmarks whose name contains this string. Defaults to None.
+
+    Returns:
+        dict: 'meta' (environment of the run) and 'results' (timings keyed by benchmark name).
+    """
+
+    results = {}
+
+    for group in groups:
+        for name, bench in GROUPS[group](quick).items():
+            if select and select not in name:
+                continue
+
+            func, setup = bench if isinstance(bench, tuple) else (bench, None)
+            results[name] = measure(func, setup, repeat, min_time)
+
+            if name in STARTUP_BUDGETS:
+                times = [import_time(STARTUP_COMMANDS[name]) for _ in range(repeat)]
+                results[name].update(import_time=statistics.median(times), budget=STARTUP_BUDGETS[name])
+                print(f"{name:<45} {results[name]['median']*1e6:>14.3f} us "
+                      f"(imports {results[name]['import_time']*1e6:.0f} us, budget {STARTUP_BUDGETS[name]*1e6:.0f} us)")
+            else:
+                print(f"{name:<45} {results[name]['median']*1e6:>14.3f} us")
+
+    return {'meta': environment(quick, repeat, min_time), 'results': results}
+
+# ----------------------------------------------------------------------------------------------
+
+def environment(quick, repeat, min_time) -> dict:
+    """Describes the machine, interpreter and code version of a run."""
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'commit': commit,
+            'python': sys.version,
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'quick': quick,
+            'repeat': repeat,
+            'min_time': min_time}
+
+# ----------------------------------------------------------------------------------------------
+
+def compare(results, baseline):
+    """Prints the change of every benchmark median against a baseline run."""
+
+    print(f"\n{'benchmark':<45} {'baseline (us)':>14} {'current (us)':>14} {'change':>8}")
+
+    for name, result in results['results'].items():
+        if name not in baseline['results']:
+            continue
+        before = baseline['results'][name]['median']
+        after = result['median']
+        print(f"{name:<45} {before*1e6:>14.3f} {after*1e6:>14.3f} {(after - before) / before:>+8.1%}")
+
+# ----------------------------------------------------------------------------------------------
+
+GROUPS = {'core': core_benchmarks,
+          'range': range_benchmarks,
+          'plot': plot_benchmarks,
+          'dash': dash_benchmarks,
+          'startup': startup_benchmarks}
+
+# ----------------------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmarks the Collatz Conjecture hot paths.')
+    parser.add_argument('groups', nargs='*', metavar='group',
+                        help=f"Benchmark groups to run ({', '.join(GROUPS)}). Defaults to all of them.")
+    parser.add_argument('--output', default='bench_results.json', help='Results file. Defaults to bench_results.json.')
+    parser.add_argument('--compare', help='Results file of a previous run to compare against.')
+    parser.add_argument('--quick', action='store_true', help='Use smaller inputs.')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help=f'Timed repeats. Defaults to {DEFAULT_REPEAT}.')
+    parser.add_argument('--min-time', type=float, default=DEFAULT_MIN_TIME,
+                        help=f'Minimum seconds per repeat. Defaults to {DEFAULT_MIN_TIME}.')
+    parser.add_argument('-k', dest='select', help='Only run benchmarks whose name contains this string.')
+    args = parser.parse_args()
+
+    for group in args.groups:
+        if group not in GROUPS:
+            parser.error(f"unknown group {group!r}, choose from {', '.join(GROUPS)}")
+
+    results = run(args.groups or list(GROUPS), args.quick, args.repeat, args.min_time, args.select)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+    over_budget = [name for name, result in results['results'].items()
+                   if 'budget' in result and result['import_time'] > result['budget']]
+    if over_budget:
+        sys.exit(f"Over the startup budget: {', '.join(over_budget)}")
@@ -0,0 +1,166 @@
+"""A thread-safe, memory-bounded LRU cache for computed Collatz Conjecture results."""
+
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+import collatz_conjecture as cc
+
+# Default memory budget of a cache, in bytes
+DEFAULT_MAX_BYTES = 256 * 2**20
+
+# Rough per-point cost of a cached figure (x and y as Python objects) and its fixed overhead
+FIGURE_BYTES_PER_POINT = 64
+FIGURE_OVERHEAD_BYTES = 16 * 2**10
+
+# ----------------------------------------------------------------------------------------------
+
+def estimate_size(value) -> int:
+    """Estimates the memory used by a cached value.
+
+    Args:
+        value (Any): A cc.Trajectory, a ParityTrajectory, cc.MergedTrajectories, a plotly figure,
+            or any other object.
+
+    Returns:
+        int: The estimated size in bytes.
+    """
+
+    # parity_cc loads NumPy, it is only imported once there can be encoded trajectories to size
+    from parity_cc import ParityTrajectory
+
+    if isinstance(value, cc.Trajectory):
+        return _values_size(value.values)
+
+    if isinstance(value, ParityTrajectory):
+        return value.nbytes
+
+    if isinstance(value, cc.MergedTrajectories):
+        return sum(_values_size(segment) for segment in value.segments)
+
+    data = getattr(value, 'data', None)
+    if data is not None:
+        points = sum(len(trace.x) for trace in data if trace.x is not None)
+        return FIGURE_OVERHEAD_BYTES + FIGURE_BYTES_PER_POINT*points
+
+    return sys.getsizeof(value)
+
+# ----------------------------------------------------------------------------------------------
+
+def _values_size(values) -> int:
+    """Returns the memory used by the values of a trajectory (an array, or a list of big ints)."""
+
+    if isinstance(values, array):
+        return sys.getsizeof(values)
+
+    return sys.getsizeof(values) + sum(sys.getsizeof(v) for v in values)
+
+# ----------------------------------------------------------------------------------------------
+
+class LRUCache:
+    """A least-recently-used cache bounded by the total (estimated) size of its entries.
+
+    All operations take an internal lock, so one instance can be shared by the threads of a
+    server process.  Each process (e.g. each gunicorn worker) has its own instance.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, sizeof=estimate_size):
+        """
+        Args:
+            max_bytes (int, optional): Memory budget of the cache. Defaults to DEFAULT_MAX_BYTES.
+            sizeof (callable, optional): Estimates the size of a value. Defaults to estimate_size.
+        """
+
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key, default=None):
+        """Returns the value cached for key (marking it as recently used), or default."""
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """Caches a value, evicting the least recently used entries to stay within max_bytes.
+
+        Values larger than max_bytes on their own are not cached.
+        """
+
+        size = self.sizeof(value)
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+
+            if size > self.max_bytes:
+                return
+
+            self._entries[key] = (value, size)
+            self._bytes += size
+
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """Returns the cached value for key, computing and caching it on a miss.
+
+        The computation runs outside the lock, so two threads missing on the same key at the same
+        time may both compute it.
+
+        Args:
+            key (hashable): The cache key.
+            compute (callable): Called without arguments to compute the value on a miss.
+
+        Returns:
+            Any: The cached or computed value.
+        """
+
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+
+        return value
+
+    def clear(self):
+        """Removes every entry (the counters are kept)."""
+
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Returns the entry count, memory use and hit/miss/eviction counters."""
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'entries': len(self._entries),
+                    'bytes': self._bytes,
+                    'max_bytes': self.max_bytes,
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions,
+                    'hit_rate': self.hits / lookups if lookups else 0.0}
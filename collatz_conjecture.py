@@ -1,7 +1,36 @@
 """Contains functionality for computing the Collatz Conjecture."""
 
+import os
+from array import array
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
 from timeit import default_timer as timer
 
+# Seeds below this limit have their stopping times tabulated once per process so that
+# range scans starting far from 1 can finish trajectories that fall below their range
+LOW_MEMO_LIMIT = 1 << 16
+
+# Sharded range scans first tabulate the seeds below this limit, in rounds each reaching this
+# many times further, for the trajectories leaving a chunk to finish on
+SCAN_MEMO_LIMIT = 1 << 22
+SCAN_ROUND_GROWTH = 1.25
+
+# Record searches tabulate the seeds below this limit, check for interrupts and report progress
+# every block of seeds, and write their checkpoint at most this often
+RECORDS_MEMO_LIMIT = 1 << 20
+RECORDS_BLOCK_SIZE = 1 << 16
+CHECKPOINT_SECONDS = 60.0
+
+# Generalized maps stop after this many steps by default, and count the steps of seeds that never
+# reach 1 (they enter a cycle or hit the step cap) as UNRESOLVED in range scans
+DEFAULT_MAP_MAX_STEPS = 1 << 14
+UNRESOLVED = 2**32 - 1
+
+# How the trajectory of a generalized map ended
+CONVERGED = 'converged'
+CYCLE = 'cycle'
+CAPPED = 'capped'
+
 # ----------------------------------------------------------------------------------------------
 
 def get_number() -> str:
@@ -108,13 +137,1334 @@ def do_cc(n) -> tuple:
 
 # ----------------------------------------------------------------------------------------------
 
+def iter_cc(n):
+    """Lazily yields the Collatz sequence of a given integer, one step at a time.
+
+    Args:
+        n (int): The starting integer for the Collatz sequence.
+
+    Yields:
+        tuple : (step, value) for steps 1, 2, ... until the value 1 is yielded.
+    """
+
+    step = 0
+
+    while n != 1:
+        n = single_collatz_conjecture(n)
+        step += 1
+        yield step, n
+
+# ----------------------------------------------------------------------------------------------
+
+def iter_cc_chunks(n, chunk_size=65536):
+    """Lazily yields the Collatz sequence of a given integer in bounded-size chunks.
+
+    Args:
+        n (int): The starting integer for the Collatz sequence.
+        chunk_size (int, optional): Maximum number of values per chunk. Defaults to 65536.
+
+    Yields:
+        tuple : (first_step, values) where values is an array('Q') (a list once a value exceeds
+                64 bits) holding the values of steps first_step, first_step + 1, ...
+    """
+
+    first_step = 1
+    values = array('Q')
+
+    for _, value in iter_cc(n):
+        values = _compact_append(values, value)
+
+        if len(values) == chunk_size:
+            yield first_step, values
+            first_step += chunk_size
+            values = array('Q')
+
+    if values:
+        yield first_step, values
+
+# ----------------------------------------------------------------------------------------------
+
+class Trajectory:
+    """A computed Collatz sequence backed by a compact array.
+
+    The values are kept in an array('Q') (a list only if a value exceeds 64 bits) and the step
+    numbers, which are always 1..len, are never stored.
+
+    Attributes:
+        seed (int): The starting integer, None if unknown.
+        values (array or list): The value after each step, the last one being 1.
+        processing_time (float): The amount of time taken (in seconds) to compute the sequence.
+    """
+
+    __slots__ = ('seed', 'values', 'processing_time')
+
+    def __init__(self, seed, values, processing_time=0.0):
+        self.seed = seed
+        self.values = values
+        self.processing_time = processing_time
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        return zip(self.steps, self.values)
+
+    @property
+    def steps(self) -> range:
+        """The step numbers 1..len, as a range."""
+
+        return range(1, len(self.values) + 1)
+
+    @classmethod
+    def collect(cls, pairs, seed=None):
+        """Builds a Trajectory from (step, value) pairs or (first_step, values) chunks.
+
+        Args:
+            pairs (iterable): The output of iter_cc or iter_cc_chunks.
+            seed (int, optional): The starting integer. Defaults to None.
+
+        Returns:
+            Trajectory: The collected sequence.
+        """
+
+        start = timer()
+        values = array('Q')
+
+        for _, value in pairs:
+            if isinstance(value, (array, list)):
+                try:
+                    values.extend(value)
+                except OverflowError:
+                    values = list(values) + list(value)
+            else:
+                values = _compact_append(values, value)
+
+        return cls(seed, values, timer() - start)
+
+# ----------------------------------------------------------------------------------------------
+
+def do_cc_compact(n, cmap=None) -> Trajectory:
+    """Computes the Collatz conjecture sequence for a given integer into a compact Trajectory.
+
+    Same sequence as do_cc, without building the step number list or a list of Python ints.
+
+    Args:
+        n (int): The starting integer for the Collatz sequence.
+        cmap (CollatzMap, optional): A generalized map to follow instead of 3n+1 (see
+            map_trajectory). Defaults to None.
+
+    Returns:
+        Trajectory: The sequence with its processing time (a MapTrajectory for a generalized map).
+    """
+
+    if cmap is not None and not cmap.is_standard:
+        return map_trajectory(n, cmap)
+
+    seed = n
+    values = array('Q')
+
+    start = timer()
+
+    while n != 1:
+        n = single_collatz_conjecture(n)
+        values = _compact_append(values, n)
+
+    end = timer()
+    return Trajectory(seed, values, end - start)
+
+# ----------------------------------------------------------------------------------------------
+
+class MergedTrajectories:
+    """The trajectories of several seeds stored as a merge tree, every value being stored once.
+
+    Trajectories quickly run into one another and then share their whole tail.  The segment of
+    a seed holds its values from the seed itself up to the first value already held by the
+    segment of an earlier seed, where it joins that segment.  The first segment (and any other
+    that reaches 1 without meeting an earlier one) ends with 1.
+
+    Attributes:
+        seeds (list): The distinct seeds, in the order given.
+        segments (list): Values of the segment of each seed, as array('Q') (a list if a value
+            exceeds 64 bits).  Empty when the seed is itself in an earlier segment.
+        joins (list): (j, k) for each seed, the segment continues at segments[j][k], or None
+            when the segment ends with 1.
+        steps (list): Number of steps from each seed to 1, as counted by do_cc.
+        processing_time (float): The amount of time taken (in seconds) to compute the tree.
+    """
+
+    __slots__ = ('seeds', 'segments', 'joins', 'steps', 'processing_time')
+
+    def __init__(self, seeds, segments, joins, steps, processing_time=0.0):
+        self.seeds = seeds
+        self.segments = segments
+        self.joins = joins
+        self.steps = steps
+        self.processing_time = processing_time
+
+    def __len__(self):
+        return len(self.seeds)
+
+    @property
+    def stored(self) -> int:
+        """Number of values stored, i.e. of distinct values over every trajectory."""
+
+        return sum(len(segment) for segment in self.segments)
+
+    def trajectory(self, i) -> Trajectory:
+        """Rebuilds the full trajectory of the i-th seed by following the joins.
+
+        Args:
+            i (int): Index of the seed.
+
+        Returns:
+            Trajectory: The same sequence as do_cc_compact(seeds[i]).
+        """
+
+        seed = self.seeds[i]
+        values = array('Q')
+        start = 1
+
+        # A seed met by an earlier segment starts right after its place there
+        if not self.segments[i]:
+            i, start = self.joins[i]
+            start += 1
+
+        while True:
+            for value in self.segments[i][start:]:
+                values = _compact_append(values, value)
+            if self.joins[i] is None:
+                break
+            i, start = self.joins[i]
+
+        return Trajectory(seed, values)
+
+# ----------------------------------------------------------------------------------------------
+
+def merge_trajectories(seeds) -> MergedTrajectories:
+    """Computes the trajectories of several seeds into a merge tree (see MergedTrajectories).
+
+    Each trajectory is only followed until it meets a value of an earlier one, so the shared
+    tails are computed and stored once.
+
+    Args:
+        seeds (iterable): Positive integer seeds, duplicates are ignored.
+
+    Returns:
+        MergedTrajectories: The merged trajectories with their processing time.
+
+    Raises:
+        ValueError: If a seed is less than 1.
+    """
+
+    seeds = list(dict.fromkeys(seeds))
+    if any(n < 1 for n in seeds):
+        raise ValueError("Seeds must be positive integers.")
+
+    # Segment and position of every value met so far
+    owners = {}
+    segments = []
+    joins = []
+    steps = []
+
+    start = timer()
+
+    for i, n in enumerate(seeds):
+        segment = array('Q')
+
+        while n not in owners:
+            owners[n] = (i, len(segment))
+            segment = _compact_append(segment, n)
+            if n == 1:
+                break
+            n = single_collatz_conjecture(n)
+
+        if segment and segment[-1] == 1:
+            joins.append(None)
+            steps.append(len(segment) - 1)
+        else:
+            j, k = owners[n]
+            joins.append((j, k))
+            steps.append(len(segment) + steps[j] - k)
+
+        segments.append(segment)
+
+    end = timer()
+    return MergedTrajectories(seeds, segments, joins, steps, end - start)
+
+# ----------------------------------------------------------------------------------------------
+
+def _compact_append(values, value):
+    """Appends a value to a compact unsigned array, falling back to a list for big integers.
+
+    Args:
+        values (array or list): The values collected so far.
+        value (int): The value to append.
+
+    Returns:
+        array or list: The container holding all the values (a list once any value exceeds 64 bits).
+    """
+
+    try:
+        values.append(value)
+    except OverflowError:
+        values = list(values)
+        values.append(value)
+
+    return values
+
+# ----------------------------------------------------------------------------------------------
+
+@lru_cache(maxsize=1)
+def _low_table() -> tuple:
+    """Returns the (steps, peaks) table for every seed in [1, LOW_MEMO_LIMIT), computed once."""
+
+    return stopping_times(1, LOW_MEMO_LIMIT)
+
+# ----------------------------------------------------------------------------------------------
+
+def stopping_time(x, known=None) -> tuple:
+    """Computes the number of steps and the peak value of a single trajectory without storing it.
+
+    Used to finish trajectories that have fallen below the seeds of a range scan, and by the
+    batch kernels for lanes that no longer fit in a machine word.
+
+    Args:
+        x (int): The starting value (must be >= 1).
+        known (tuple, optional): (steps, peaks) sequences already computed for the seeds
+            1, 2, ..., len(steps), used instead of the table of the seeds below LOW_MEMO_LIMIT
+            when longer. Defaults to None.
+
+    Returns:
+        tuple : (steps, peak) taken from x to 1, and the largest value seen on the way.
+    """
+
+    if known is None or len(known[0]) < LOW_MEMO_LIMIT - 1:
+        known = _low_table()
+
+    low_steps, low_peaks = known
+    limit = len(low_steps)
+    steps = 0
+    peak = x
+
+    while x > limit:
+        if x & 1:
+            x = 3*x + 1
+            steps += 1
+            if x > peak:
+                peak = x
+
+        # Divide out every factor of 2 at once
+        tz = (x & -x).bit_length() - 1
+        x >>= tz
+        steps += tz
+
+    steps += low_steps[x - 1]
+    peak = max(peak, low_peaks[x - 1])
+
+    return steps, peak
+
+# ----------------------------------------------------------------------------------------------
+
+def stopping_times(start, stop, known=None, cmap=None) -> tuple:
+    """Computes the number of steps and the peak value for every seed in [start, stop).
+
+    Seeds are processed in increasing order and each trajectory is only followed until it drops
+    below its own seed.  From there the result already computed for that smaller seed is reused,
+    so no per-step lists are ever built.
+
+    Args:
+        start (int): The first seed of the range (must be >= 1).
+        stop (int): One past the last seed of the range.
+        known (tuple, optional): (steps, peaks) sequences already computed for the seeds
+            1, 2, ..., len(steps), reused for trajectories that fall below start. Defaults to None.
+        cmap (CollatzMap, optional): A generalized map to follow instead of 3n+1, known is then
+            ignored. Defaults to None.
+
+    Returns:
+        tuple : (steps, peaks)
+            - steps : array('I') of the number of steps (as counted by do_cc) for each seed,
+                      UNRESOLVED for seeds of a generalized map that never reach 1.
+            - peaks : array('Q') of the largest value reached by each trajectory, including the seed.
+                      A list is returned instead if any peak does not fit in 64 bits.
+
+    Raises:
+        ValueError: If start is less than 1.
+    """
+
+    if start < 1:
+        raise ValueError(f"Seeds must be positive integers, got start={start}.")
+
+    if cmap is not None and not cmap.is_standard:
+        return _map_stopping_times(start, stop, cmap)
+
+    steps = array('I')
+    peaks = array('Q')
+
+    for n in range(start, stop):
+        x = n
+        s = 0
+        peak = n
+
+        while True:
+            if x & 1:
+                if x == 1:
+                    break
+                x = 3*x + 1
+                s += 1
+                if x > peak:
+                    peak = x
+
+            tz = (x & -x).bit_length() - 1
+            x >>= tz
+            s += tz
+
+            if x < n:
+                if x >= start:
+                    s += steps[x - start]
+                    known_peak = peaks[x - start]
+                elif known is not None and x <= len(known[0]):
+                    s += known[0][x - 1]
+                    known_peak = known[1][x - 1]
+                else:
+                    tail_steps, known_peak = stopping_time(x, known)
+                    s += tail_steps
+
+                if known_peak > peak:
+                    peak = known_peak
+                break
+
+        steps.append(s)
+        peaks = _compact_append(peaks, peak)
+
+    return steps, peaks
+
+# ----------------------------------------------------------------------------------------------
+
+def iter_stopping_times(start, stop, chunk_size, known=None):
+    """Lazily yields the stopping_times of every seed in [start, stop), one chunk at a time.
+
+    The results of the chunks below SCAN_MEMO_LIMIT are kept as the memo of the later ones, so
+    streaming a range does about the work of a single stopping_times call over it.  A range
+    starting below SCAN_MEMO_LIMIT and at most its own length from 1 tabulates the seeds below
+    start first, for the same reason.
+
+    Args:
+        start (int): The first seed of the range (must be >= 1).
+        stop (int): One past the last seed of the range.
+        chunk_size (int): Seeds per chunk.
+        known (tuple, optional): (steps, peaks) sequences already computed for the seeds
+            1, 2, ..., len(steps), e.g. a stopping-time index (see index_cc).  The seeds it holds
+            are copied from it, the others finish their trajectories on it. Defaults to None.
+
+    Yields:
+        tuple : (chunk_start, steps, peaks) with the stopping_times of [chunk_start, chunk_start + len(steps)).
+    """
+
+    if known is not None:
+        held = min(len(known[0]) + 1, stop)
+
+        for chunk_start in range(start, held, chunk_size):
+            chunk_stop = min(chunk_start + chunk_size, held)
+            yield (chunk_start, array('I', known[0][chunk_start - 1:chunk_stop - 1].tobytes()),
+                   array('Q', known[1][chunk_start - 1:chunk_stop - 1].tobytes()))
+
+        start = max(start, held)
+
+        # A table ending right below the rest of the range keeps growing with it (as a copy)
+        growing = len(known[0]) == start - 1 and start <= SCAN_MEMO_LIMIT
+        if growing:
+            known = array('I', known[0].tobytes()), array('Q', known[1].tobytes())
+
+    else:
+        growing = start <= min(stop - start + 1, SCAN_MEMO_LIMIT)
+        if growing:
+            known = stopping_times(1, start)
+
+    for chunk_start in range(start, stop, chunk_size):
+        chunk_stop = min(chunk_start + chunk_size, stop)
+        steps, peaks = stopping_times(chunk_start, chunk_stop, known)
+
+        yield chunk_start, steps, peaks
+
+        if growing and chunk_stop <= SCAN_MEMO_LIMIT:
+            known[0].extend(steps)
+            known[1].extend(peaks)
+
+# ----------------------------------------------------------------------------------------------
+
+class CollatzMap:
+    """A generalized Collatz-type map, n -> (a*n + b) / d with (a, b, d) chosen by n mod m.
+
+    The 3n+1 map is CollatzMap(2, ((1, 0, 2), (3, 1, 1))).  Every rule must send every positive
+    integer of its residue class to a positive integer, which is checked when the map is created.
+    Trajectories stop at 1, and are also stopped when they enter a cycle (detected with Brent's
+    algorithm, in constant memory) or after max_steps steps.
+
+    Attributes:
+        modulus (int): m, the number of residue classes.
+        rules (tuple): (a, b, d) of each residue 0, 1, ..., m - 1.
+        max_steps (int): The step cap of a trajectory.
+    """
+
+    __slots__ = ('modulus', 'rules', 'max_steps')
+
+    def __init__(self, modulus, rules, max_steps=DEFAULT_MAP_MAX_STEPS):
+        """
+        Raises:
+            ValueError: If the rules do not map positive integers to positive integers.
+        """
+
+        rules = tuple(tuple(int(v) for v in rule) for rule in rules)
+
+        if modulus < 1 or len(rules) != modulus:
+            raise ValueError(f"A map modulo {modulus} needs {modulus} rules, got {len(rules)}.")
+        if not 0 < max_steps < UNRESOLVED:
+            raise ValueError(f"The step cap must be between 1 and {UNRESOLVED - 1}, got {max_steps}.")
+
+        for r, (a, b, d) in enumerate(rules):
+            if a < 1 or d < 1:
+                raise ValueError(f"Rule {r} mod {modulus}: a and d must be positive, got a={a}, d={d}.")
+            # d must divide a*n + b for every n = r + k*m, and the smallest such n must not go below 1
+            if (a*r + b) % d or (a*modulus) % d:
+                raise ValueError(f"Rule {r} mod {modulus}: {d} does not divide {a}n{b:+d} for every n = {r} mod {modulus}.")
+            if a*(r or modulus) + b < d:
+                raise ValueError(f"Rule {r} mod {modulus}: ({a}n{b:+d})/{d} is not positive for n = {r or modulus}.")
+
+        self.modulus = modulus
+        self.rules = rules
+        self.max_steps = max_steps
+
+    @classmethod
+    def parse(cls, spec, max_steps=DEFAULT_MAP_MAX_STEPS):
+        """Reads a map from text.
+
+        Args:
+            spec (str): 'qn+r' (e.g. '3n+1', '5n+1', '3n-1'), halving even numbers, or one 'a,b,d'
+                rule per residue separated by semicolons (e.g. '1,0,2; 3,1,1' for 3n+1).
+            max_steps (int, optional): The step cap. Defaults to DEFAULT_MAP_MAX_STEPS.
+
+        Returns:
+            CollatzMap: The map.
+
+        Raises:
+            ValueError: If the text is not a valid map.
+        """
+
+        import re
+
+        match = re.fullmatch(r'\s*(\d*)\s*n\s*(?:([+-])\s*(\d+))?\s*', spec)
+        if match:
+            q = int(match[1] or 1)
+            r = int(match[3] or 0) * (-1 if match[2] == '-' else 1)
+            return cls(2, ((1, 0, 2), (q, r, 1)), max_steps)
+
+        try:
+            rules = [tuple(int(v) for v in rule.split(',')) for rule in spec.split(';')]
+        except ValueError:
+            rules = None
+
+        if not rules or any(len(rule) != 3 for rule in rules):
+            raise ValueError(f"Expected a map like '5n+1' or 'a,b,d; a,b,d' rules, got {spec!r}.")
+
+        return cls(len(rules), rules, max_steps)
+
+    @property
+    def is_standard(self) -> bool:
+        """Whether this is the 3n+1 map, computed by the optimized 3n+1 code paths."""
+
+        return self.modulus == 2 and self.rules == ((1, 0, 2), (3, 1, 1))
+
+    def step(self, n) -> int:
+        """Applies the map once."""
+
+        a, b, d = self.rules[n % self.modulus]
+        return (a*n + b) // d
+
+    def to_meta(self) -> dict:
+        """Returns the map as JSON data, e.g. for the clientside playback of a figure."""
+
+        return {'modulus': self.modulus, 'rules': [list(rule) for rule in self.rules]}
+
+    def __str__(self):
+        if self.modulus == 2 and self.rules[0] == (1, 0, 2) and self.rules[1][2] == 1:
+            a, b, _ = self.rules[1]
+            return f'{a}n{b:+d}' if b else f'{a}n'
+        return '; '.join(','.join(str(v) for v in rule) for rule in self.rules)
+
+    def __repr__(self):
+        return f'CollatzMap({self.modulus}, {self.rules}, max_steps={self.max_steps})'
+
+    def __eq__(self, other):
+        return (isinstance(other, CollatzMap) and (self.modulus, self.rules, self.max_steps)
+                == (other.modulus, other.rules, other.max_steps))
+
+    def __hash__(self):
+        return hash((self.modulus, self.rules, self.max_steps))
+
+    def __getstate__(self):
+        return self.modulus, self.rules, self.max_steps
+
+    def __setstate__(self, state):
+        self.modulus, self.rules, self.max_steps = state
+
+# ----------------------------------------------------------------------------------------------
+
+class MapTrajectory(Trajectory):
+    """The trajectory of a seed under a generalized map, with how it ended.
+
+    A trajectory entering a cycle ends with the first repeated value, i.e. it goes around the
+    cycle exactly once.
+
+    Attributes:
+        cmap (CollatzMap): The map followed.
+        outcome (str): CONVERGED (reached 1), CYCLE or CAPPED (stopped at cmap.max_steps).
+        cycle_length (int): The length of the cycle, 0 unless outcome is CYCLE.
+    """
+
+    __slots__ = ('cmap', 'outcome', 'cycle_length')
+
+    def __init__(self, seed, values, processing_time=0.0, cmap=None, outcome=CONVERGED, cycle_length=0):
+        super().__init__(seed, values, processing_time)
+        self.cmap = cmap
+        self.outcome = outcome
+        self.cycle_length = cycle_length
+
+    def describe(self) -> str:
+        """Returns how the trajectory ended, as text."""
+
+        if self.outcome == CYCLE:
+            return f'enters a cycle of length {self.cycle_length} after {len(self) - self.cycle_length} steps'
+        if self.outcome == CAPPED:
+            return f'has not reached 1 after {len(self)} steps (the step cap)'
+        return f'reaches 1 in {len(self)} steps'
+
+# ----------------------------------------------------------------------------------------------
+
+def map_trajectory(n, cmap) -> MapTrajectory:
+    """Computes the trajectory of a seed under a generalized map.
+
+    Args:
+        n (int): The starting integer (must be >= 1).
+        cmap (CollatzMap): The map.
+
+    Returns:
+        MapTrajectory: The sequence, stopped at 1, at the end of the first turn of a cycle, or
+            after cmap.max_steps steps.
+    """
+
+    seed = n
+    values = array('Q')
+    rules, modulus = cmap.rules, cmap.modulus
+    outcome = CONVERGED
+    cycle_length = 0
+
+    # Brent's cycle detection: the tortoise jumps to the current value every power of 2 steps
+    tortoise = n
+    power = lam = 1
+
+    start = timer()
+
+    while n != 1:
+        if len(values) >= cmap.max_steps:
+            outcome = CAPPED
+            break
+
+        a, b, d = rules[n % modulus]
+        n = (a*n + b) // d
+        values = _compact_append(values, n)
+
+        if n == tortoise:
+            outcome = CYCLE
+            cycle_length = lam
+            break
+
+        if power == lam:
+            tortoise = n
+            power *= 2
+            lam = 0
+        lam += 1
+
+    if outcome == CYCLE:
+        # Cut the trajectory at the first value that repeats (mu), one full turn later
+        def value(i):
+            return seed if i == 0 else values[i - 1]
+
+        mu = 0
+        while value(mu) != value(mu + cycle_length):
+            mu += 1
+        values = values[:mu + cycle_length]
+
+    end = timer()
+    return MapTrajectory(seed, values, end - start, cmap, outcome, cycle_length)
+
+# ----------------------------------------------------------------------------------------------
+
+def map_stopping_time(x, cmap, max_steps=None) -> tuple:
+    """Computes the number of steps and the peak value of one seed under a generalized map, without storing its trajectory.
+
+    Args:
+        x (int): The starting value (must be >= 1).
+        cmap (CollatzMap): The map.
+        max_steps (int, optional): The step cap. Defaults to cmap.max_steps.
+
+    Returns:
+        tuple : (steps, peak) where steps is UNRESOLVED if x enters a cycle or hits the cap.  The
+            peak is the largest value seen, which for a cycle includes every value of the cycle.
+    """
+
+    rules, modulus = cmap.rules, cmap.modulus
+    max_steps = cmap.max_steps if max_steps is None else max_steps
+    steps = 0
+    peak = x
+    tortoise = x
+    power = lam = 1
+
+    while x != 1:
+        if steps >= max_steps:
+            return UNRESOLVED, peak
+
+        a, b, d = rules[x % modulus]
+        x = (a*x + b) // d
+        steps += 1
+        if x > peak:
+            peak = x
+
+        if x == tortoise:
+            return UNRESOLVED, peak
+
+        if power == lam:
+            tortoise = x
+            power *= 2
+            lam = 0
+        lam += 1
+
+    return steps, peak
+
+# ----------------------------------------------------------------------------------------------
+
+def _map_stopping_times(start, stop, cmap) -> tuple:
+    """stopping_times for a generalized map.
+
+    As for 3n+1, a trajectory is only followed until it drops below its seed (when that seed is in
+    the range), then the result of the smaller seed is reused.  A seed whose trajectory reaches an
+    UNRESOLVED seed is UNRESOLVED too.
+    """
+
+    rules, modulus, max_steps = cmap.rules, cmap.modulus, cmap.max_steps
+    steps = array('I')
+    peaks = array('Q')
+
+    for n in range(start, stop):
+        x = n
+        s = 0
+        peak = n
+        tortoise = n
+        power = lam = 1
+
+        while x != 1:
+            if s >= max_steps:
+                s = UNRESOLVED
+                break
+
+            a, b, d = rules[x % modulus]
+            x = (a*x + b) // d
+            s += 1
+            if x > peak:
+                peak = x
+
+            if start <= x < n:
+                known_steps = steps[x - start]
+                peak = max(peak, peaks[x - start])
+                s = UNRESOLVED if known_steps == UNRESOLVED or s + known_steps > max_steps else s + known_steps
+                break
+
+            if x == tortoise:
+                s = UNRESOLVED
+                break
+
+            if power == lam:
+                tortoise = x
+                power *= 2
+                lam = 0
+            lam += 1
+
+        steps.append(s)
+        peaks = _compact_append(peaks, peak)
+
+    return steps, peaks
+
+# ----------------------------------------------------------------------------------------------
+
+def _summarize(start, steps, peaks) -> dict:
+    """Reduces the per-seed results of a range scan to its totals and record holders.
+
+    Args:
+        start (int): The first seed the results belong to.
+        steps (array): Number of steps for each seed.
+        peaks (array or list): Peak value for each seed.
+
+    Returns:
+        dict: The summary of the range (see scan_range).
+    """
+
+    max_peak = max(peaks)
+    unresolved = steps.count(UNRESOLVED)
+
+    # Seeds of a generalized map that never reach 1 have no step count
+    resolved = steps if not unresolved else array('I', (s for s in steps if s != UNRESOLVED))
+    max_steps = max(resolved, default=0)
+
+    return {'start': start,
+            'stop': start + len(steps),
+            'total_steps': sum(resolved),
+            'max_steps': max_steps,
+            'max_steps_seed': start + steps.index(max_steps) if resolved else None,
+            'max_peak': max_peak,
+            'max_peak_seed': start + peaks.index(max_peak),
+            'unresolved': unresolved}
+
+# ----------------------------------------------------------------------------------------------
+
+# The (steps, peaks) table of the seeds below the table stop of a scan_pool, as memoryviews over a
+# file mapped by each of its worker processes
+_scan_table = None
+
+def _table_columns(mm, size) -> tuple:
+    """Returns zero-copy (steps, peaks) memoryviews over a mapped table of size seeds."""
+
+    view = memoryview(mm)
+    peaks = view[:8*size].cast('Q')
+    steps = view[8*size:12*size].cast('I')
+
+    return steps, peaks
+
+# ----------------------------------------------------------------------------------------------
+
+def _init_scan_worker(path, size):
+    """Process pool initializer: maps the table file of a scan_pool."""
+
+    global _scan_table
+
+    if path:
+        import mmap
+
+        with open(path, 'r+b') as f:
+            _scan_table = _table_columns(mmap.mmap(f.fileno(), 0), size)
+
+# ----------------------------------------------------------------------------------------------
+
+def scan_table():
+    """Returns the (steps, peaks) table shared by the workers of a scan_pool, None outside of them."""
+
+    return _scan_table
+
+# ----------------------------------------------------------------------------------------------
+
+def _fill_scan_table(args):
+    """Process pool worker: computes one chunk of a round of the shared table.
+
+    Args:
+        args (tuple): (start, stop, built) of the chunk, the seeds 1..built being in the table.
+    """
+
+    start, stop, built = args
+    steps, peaks = _scan_table
+    chunk_steps, chunk_peaks = stopping_times(start, stop, (steps[:built], peaks[:built]))
+
+    steps[start - 1:stop - 1] = chunk_steps
+    peaks[start - 1:stop - 1] = chunk_peaks
+
+# ----------------------------------------------------------------------------------------------
+
+@contextmanager
+def scan_pool(workers, table_stop, known=None):
+    """Starts a pool of worker processes sharing the stopping times of the seeds below table_stop.
+
+    The table is a temporary file mapped by every worker, starting with the seeds of known (or
+    of the table below LOW_MEMO_LIMIT) and filled in rounds by the pool itself:
+    each round computes the seeds up to SCAN_ROUND_GROWTH times further than the part already
+    built, split between the workers, with that part as its memo.  A trajectory leaving its
+    chunk so never falls far before it finishes on the table, and the chunks of a sharded scan
+    do nearly the same work as a single process.  Tasks read the table with scan_table().
+
+    Args:
+        workers (int): Number of worker processes.
+        table_stop (int): One past the last seed of the table, at most 1 for no table.
+        known (tuple, optional): (steps, peaks) sequences already computed for the seeds
+            1, 2, ..., len(steps), copied to the table. Defaults to None.
+
+    Yields:
+        tuple : (pool, table) with the ProcessPoolExecutor and the (steps, peaks) memoryviews of
+            the complete table (None without a table), valid inside the with block only.
+    """
+
+    # Process pools are slow to import, single process scans and the CLI never load them
+    from concurrent.futures import ProcessPoolExecutor
+
+    if table_stop <= 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_scan_worker, initargs=(None, 0)) as pool:
+            yield pool, None
+        return
+
+    import mmap
+    import tempfile
+
+    size = table_stop - 1
+    fd, path = tempfile.mkstemp(suffix='.cctable')
+
+    try:
+        with os.fdopen(fd, 'r+b') as f:
+            f.truncate(12*size)
+            mm = mmap.mmap(f.fileno(), 0)
+
+        steps, peaks = _table_columns(mm, size)
+
+        try:
+            low_steps, low_peaks = known if known is not None and len(known[0]) >= LOW_MEMO_LIMIT - 1 else _low_table()
+            built = min(len(low_steps), size)
+            steps[:built] = low_steps[:built]
+            peaks[:built] = low_peaks[:built]
+
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_scan_worker, initargs=(path, size)) as pool:
+                while built < size:
+                    round_stop = min(int((built + 1) * SCAN_ROUND_GROWTH), table_stop)
+                    task_size = -(-(round_stop - built - 1) // workers)
+                    tasks = [(a, min(a + task_size, round_stop), built) for a in range(built + 1, round_stop, task_size)]
+                    list(pool.map(_fill_scan_table, tasks))
+                    built = round_stop - 1
+
+                yield pool, (steps, peaks)
+        finally:
+            steps.release()
+            peaks.release()
+            mm.close()
+    finally:
+        os.remove(path)
+
+# ----------------------------------------------------------------------------------------------
+
+def _scan_chunk(args, known=None) -> tuple:
+    """Process pool worker: scans one chunk of seeds.
+
+    Args:
+        args (tuple): (start, stop, keep_arrays, cmap) of the chunk.
+        known (tuple, optional): (steps, peaks) of the seeds 1, 2, ..., len(steps) for the
+            trajectories leaving the chunk. Defaults to the table of the scan_pool, if any.
+
+    Returns:
+        tuple : (summary, steps, peaks) where steps and peaks are None unless keep_arrays is set.
+    """
+
+    start, stop, keep_arrays, cmap = args
+    steps, peaks = stopping_times(start, stop, known=_scan_table if known is None else known, cmap=cmap)
+    summary = _summarize(start, steps, peaks)
+
+    if not keep_arrays:
+        return summary, None, None
+
+    return summary, steps, peaks
+
+# ----------------------------------------------------------------------------------------------
+
+def _merge_summaries(summaries) -> dict:
+    """Merges chunk summaries (in seed order) into a summary of the whole range."""
+
+    merged = dict(summaries[0])
+
+    for summary in summaries[1:]:
+        merged['stop'] = summary['stop']
+        merged['total_steps'] += summary['total_steps']
+        merged['unresolved'] += summary['unresolved']
+
+        # Strict comparisons keep the smallest seed as the record holder
+        if summary['max_steps'] > merged['max_steps'] or merged['max_steps_seed'] is None:
+            merged['max_steps'] = summary['max_steps']
+            merged['max_steps_seed'] = summary['max_steps_seed']
+
+        if summary['max_peak'] > merged['max_peak']:
+            merged['max_peak'] = summary['max_peak']
+            merged['max_peak_seed'] = summary['max_peak_seed']
+
+    return merged
+
+# ----------------------------------------------------------------------------------------------
+
+def scan_range(start, stop, workers=1, chunk_size=None, keep_arrays=False, cmap=None, known=None) -> dict:
+    """Scans every seed in [start, stop), optionally sharded across a pool of worker processes.
+
+    The range is split into contiguous chunks that are scanned independently with stopping_times.
+    Workers only send back a small summary per chunk (plus the compact step/peak arrays when
+    keep_arrays is set), never the trajectories themselves.
+
+    When the range starts below SCAN_MEMO_LIMIT and is split, the seeds below it (or below stop)
+    are tabulated first, by the workers (see scan_pool), and the chunks finish the trajectories
+    that fall below them on that table.  Without it every such trajectory would be followed down
+    to LOW_MEMO_LIMIT, which makes the chunks together several times slower than a single one.
+
+    A known table (e.g. a stopping-time index, see index_cc) answers the seeds it holds without
+    computing them, is the memo of a single process and is copied to the table of the workers.
+
+    Args:
+        start (int): The first seed of the range (must be >= 1).
+        stop (int): One past the last seed of the range.
+        workers (int, optional): Number of worker processes, None for one per CPU. Defaults to 1.
+        chunk_size (int, optional): Seeds per chunk. Defaults to the whole range for a single worker,
+            otherwise an even split into 8 chunks per worker.
+        keep_arrays (bool, optional): Whether to return the per-seed arrays. Defaults to False.
+        cmap (CollatzMap, optional): A generalized map to follow instead of 3n+1. Defaults to None.
+        known (tuple, optional): (steps, peaks) sequences already computed for the seeds
+            1, 2, ..., len(steps), ignored for a generalized map. Defaults to None.
+
+    Returns:
+        dict: 'start', 'stop', 'total_steps', 'max_steps', 'max_steps_seed', 'max_peak',
+              'max_peak_seed', 'unresolved' (seeds that never reach 1, always 0 for 3n+1) and
+              'processing_time' (in seconds).  Steps totals and records leave out the unresolved
+              seeds.  When keep_arrays is set, 'steps' and 'peaks' hold the per-seed arrays for
+              the whole range.
+
+    Raises:
+        ValueError: If start is less than 1 or the range is empty.
+    """
+
+    if start < 1:
+        raise ValueError(f"Seeds must be positive integers, got start={start}.")
+    if stop <= start:
+        raise ValueError(f"Empty range [{start}, {stop}).")
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    begin = timer()
+
+    standard = cmap is None or cmap.is_standard
+    if not standard:
+        known = None
+
+    # The table also holds the seeds below start, so it is only worth it for ranges starting low
+    split = workers > 1 or (chunk_size and chunk_size < stop - start)
+    table_stop = min(stop, SCAN_MEMO_LIMIT)
+    if not split or not standard or (start >= table_stop and known is None):
+        table_stop = 1
+
+    def plan(table):
+        """Results of the seeds of the range held by the table, and the chunks of the others."""
+
+        held = min(len(table[0]) + 1, stop) if table else start
+        first = max(start, held)
+        results = []
+
+        if held > start:
+            steps = array('I', table[0][start - 1:held - 1].tobytes())
+            peaks = array('Q', table[1][start - 1:held - 1].tobytes())
+            results.append((_summarize(start, steps, peaks), steps, peaks))
+
+        # A single process keeps the whole range in one chunk so nothing is lost from the memo
+        size = chunk_size or max(stop - first if workers == 1 else -(-(stop - first) // (8*workers)), 1)
+
+        return results, [(a, min(a + size, stop), keep_arrays, cmap) for a in range(first, stop, size)]
+
+    if workers == 1:
+        if known is None and table_stop > 1:
+            known = stopping_times(1, table_stop)
+        results, chunks = plan(known)
+        results += [_scan_chunk(chunk, known) for chunk in chunks]
+    else:
+        with scan_pool(workers, table_stop, known) as (pool, table):
+            # The workers only share the table, the known seeds beyond it are still read here
+            results, chunks = plan(known if known is not None and len(known[0]) + 1 > table_stop else table)
+            results += pool.map(_scan_chunk, chunks)
+
+    summary = _merge_summaries([result[0] for result in results])
+    summary['processing_time'] = timer() - begin
+
+    if keep_arrays:
+        steps = array('I')
+        peaks = array('Q')
+        for _, chunk_steps, chunk_peaks in results:
+            steps.extend(chunk_steps)
+            if isinstance(peaks, array) and isinstance(chunk_peaks, array):
+                peaks.extend(chunk_peaks)
+            else:
+                peaks = list(peaks) + list(chunk_peaks)
+        summary['steps'] = steps
+        summary['peaks'] = peaks
+
+    return summary
+
+# ----------------------------------------------------------------------------------------------
+
+def _load_checkpoint(path, start, stop):
+    """Reads the state of an interrupted record search, None if there is nothing to resume.
+
+    Raises:
+        ValueError: If the checkpoint belongs to a search over another range.
+    """
+
+    if not path or not os.path.exists(path):
+        return None
+
+    import json
+
+    with open(path) as f:
+        state = json.load(f)
+
+    if (state['start'], state['stop']) != (start, stop):
+        raise ValueError(f"{path} is the checkpoint of [{state['start']}, {state['stop']}), not [{start}, {stop}).")
+
+    return state
+
+# ----------------------------------------------------------------------------------------------
+
+def _save_checkpoint(path, state):
+    """Writes the state of a record search atomically (a crash leaves the previous checkpoint intact)."""
+
+    import json
+
+    tmp_path = path + '.tmp'
+
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp_path, path)
+
+# ----------------------------------------------------------------------------------------------
+
+def find_records(start, stop, checkpoint=None, checkpoint_seconds=CHECKPOINT_SECONDS,
+                 memo_limit=RECORDS_MEMO_LIMIT, progress=None, known=None) -> dict:
+    """Finds the delay records and path records among the seeds in [start, stop).
+
+    A delay record is a seed with more steps than every smaller seed of the range, a path record
+    a seed whose peak value is higher than that of every smaller seed of the range (start at 1
+    for the classical records).  Seeds are streamed through with O(1) state each; only the
+    records, and a table of the seeds below memo_limit, are kept.  Seeds that cannot be records
+    are skipped without being computed:
+        - n = 2 (mod 3), n > 2: m = (2n - 1)/3 is a smaller odd seed with m -> 2n -> n, so m has
+          2 more steps and at least the same peak.
+        - Even n: steps(n) = steps(n/2) + 1, so n can only be a delay record if n/2 is one.
+        - Even n > 2: the peak of n - 1 (odd) is at least 3(n - 1) + 1 > n, and the peak of n
+          is otherwise that of n/2, so n is never a path record.
+    Each rule only applies when its smaller witness seed is itself in the range.
+
+    The state is written to the checkpoint file every checkpoint_seconds and on KeyboardInterrupt,
+    and a search started again with the same range and checkpoint resumes where it stopped.
+
+    Args:
+        start (int): The first seed of the range (must be >= 1).
+        stop (int): One past the last seed of the range.
+        checkpoint (str, optional): Path of the JSON checkpoint file. Defaults to None (no checkpoints).
+        checkpoint_seconds (float, optional): Seconds between checkpoints. Defaults to CHECKPOINT_SECONDS.
+        memo_limit (int, optional): Seeds below this limit are tabulated up front. Defaults to RECORDS_MEMO_LIMIT.
+        progress (callable, optional): Called with the current results after every block of seeds.
+        known (tuple, optional): (steps, peaks) sequences already computed for the seeds
+            1, 2, ..., len(steps), e.g. a stopping-time index (see index_cc), used instead of the
+            table of the seeds below memo_limit when it is at least as long. Defaults to None.
+
+    Returns:
+        dict: 'start', 'stop', 'next' (first seed not searched yet, equal to stop when done),
+              'delay_records' ([seed, steps] pairs), 'path_records' ([seed, peak] pairs),
+              'computed' and 'sieved' (seeds computed and skipped so far), 'processing_time'
+              (seconds, over all runs) and 'seeds_per_second' (of this run).
+
+    Raises:
+        ValueError: If start is less than 1, or the checkpoint belongs to another range.
+    """
+
+    if start < 1:
+        raise ValueError(f"Seeds must be positive integers, got start={start}.")
+
+    state = _load_checkpoint(checkpoint, start, stop) or {
+        'start': start, 'stop': stop, 'next': start, 'delay_records': [], 'path_records': [],
+        'computed': 0, 'sieved': 0, 'processing_time': 0.0}
+
+    delay_records = state['delay_records']
+    path_records = state['path_records']
+    record_steps = dict(map(tuple, delay_records))
+    max_steps = delay_records[-1][1] if delay_records else -1
+    max_peak = path_records[-1][1] if path_records else 0
+    computed = state['computed']
+    sieved = state['sieved']
+    first = state['next']
+
+    # Memo of the seeds below memo_limit, for trajectories to finish on
+    if known is not None and len(known[0]) + 1 >= min(memo_limit, stop):
+        memo, memo_stop = known, len(known[0]) + 1
+    else:
+        memo_stop = max(min(memo_limit, stop), 2)
+        memo = stopping_times(1, memo_stop)
+
+    # The sieves need their witness seeds in the range
+    sieve_mod3 = max((3*start + 2) // 2, 3)
+    sieve_half = 2*start
+    sieve_path = max(start + 1, 4)
+
+    begin = timer()
+    last_checkpoint = begin
+    n = first
+
+    try:
+        while n < stop:
+            block_stop = min(n + RECORDS_BLOCK_SIZE, stop)
+
+            for n in range(n, block_stop):
+                if n % 3 == 2 and n >= sieve_mod3:
+                    sieved += 1
+                    continue
+
+                if not n & 1 and n >= sieve_half and n >= sieve_path:
+                    # Only the delay record test is left, and it needs no computation
+                    half_steps = record_steps.get(n >> 1)
+                    if half_steps is not None and half_steps + 1 > max_steps:
+                        max_steps = half_steps + 1
+                        delay_records.append([n, max_steps])
+                        record_steps[n] = max_steps
+                    sieved += 1
+                    continue
+
+                if n < memo_stop:
+                    s = memo[0][n - 1]
+                    peak = memo[1][n - 1]
+                else:
+                    s, peak = stopping_time(n, memo)
+
+                computed += 1
+
+                if s > max_steps:
+                    max_steps = s
+                    delay_records.append([n, s])
+                    record_steps[n] = s
+
+                if peak > max_peak:
+                    max_peak = peak
+                    path_records.append([n, peak])
+
+            n = block_stop
+            state.update(next=n, computed=computed, sieved=sieved)
+
+            now = timer()
+            if checkpoint and now - last_checkpoint >= checkpoint_seconds:
+                state['processing_time'] += now - last_checkpoint
+                last_checkpoint = now
+                _save_checkpoint(checkpoint, state)
+
+            if progress:
+                progress(state)
+
+    except KeyboardInterrupt:
+        if checkpoint:
+            state['processing_time'] += timer() - last_checkpoint
+            _save_checkpoint(checkpoint, state)
+        raise
+
+    end = timer()
+    state['processing_time'] += end - last_checkpoint
+
+    if checkpoint:
+        _save_checkpoint(checkpoint, state)
+
+    state['seeds_per_second'] = (stop - first) / (end - begin) if end > begin else 0.0
+
+    return state
+
+# ----------------------------------------------------------------------------------------------
+
+def parse_args(argv=None) -> 'argparse.Namespace':
+    """Parses the command line arguments.
+
+    Args:
+        argv (list, optional): Arguments to parse. Defaults to sys.argv.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Computes the Collatz Conjecture.')
+    parser.add_argument('--range', nargs=2, type=int, metavar=('START', 'STOP'),
+                        help='Scan every seed in [START, STOP) instead of asking for a single number.')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of worker processes for --range (0 for one per CPU). Defaults to 1.')
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help='Seeds per chunk for --range. Defaults to 8 chunks per worker.')
+    parser.add_argument('--records', action='store_true',
+                        help='Search --range for delay and path records instead of scanning it.')
+    parser.add_argument('--checkpoint', default=None,
+                        help='Checkpoint file of --records, to resume an interrupted search. Defaults to None.')
+    parser.add_argument('--index', default=None,
+                        help='Stopping-time index file (see index_cc.py) read by --range instead of computing '
+                             'the seeds it holds. Defaults to None.')
+    parser.add_argument('--map', default=None,
+                        help="Generalized map to follow instead of 3n+1, e.g. '5n+1' or '1,0,2; 3,1,1' "
+                             "(one 'a,b,d' rule (a*n+b)/d per residue mod the number of rules). Defaults to 3n+1.")
+    parser.add_argument('--max-steps', type=int, default=DEFAULT_MAP_MAX_STEPS,
+                        help=f'Step cap of --map trajectories. Defaults to {DEFAULT_MAP_MAX_STEPS}.')
+
+    args = parser.parse_args(argv)
+
+    if args.map:
+        try:
+            args.map = CollatzMap.parse(args.map, args.max_steps)
+        except ValueError as e:
+            parser.error(str(e))
+
+        if args.records and not args.map.is_standard:
+            parser.error('--records only searches the 3n+1 map')
+
+    return args
+
+# ----------------------------------------------------------------------------------------------
+
 if __name__ == '__main__':
 
-    n = get_number()
-    n = check_number(n)
-    
-    print(f'Starting number: {n}\n')
+    args = parse_args()
+
+    if args.index:
+        # index_cc is only loaded when asked for
+        from index_cc import open_known
+        known_table = open_known(args.index)
+    else:
+        known_table = nullcontext()
+
+    if args.range and args.records:
+        with known_table as known:
+            records = find_records(args.range[0], args.range[1], args.checkpoint, known=known,
+                                   progress=lambda state: print(f"Searched up to {state['next']}", end='\r'))
+
+        print(f"\nSeeds: [{records['start']}, {records['stop']}), {records['computed']} computed, "
+              f"{records['sieved']} sieved, {records['seeds_per_second']:.0f} seeds/s.")
+        print('Delay records (seed: steps):')
+        for seed, steps in records['delay_records']:
+            print(f'  {seed}: {steps}')
+        print('Path records (seed: peak):')
+        for seed, peak in records['path_records']:
+            print(f'  {seed}: {peak}')
+
+    elif args.range:
+        with known_table as known:
+            summary = scan_range(args.range[0], args.range[1], args.workers or None, args.chunk_size,
+                                 cmap=args.map, known=known)
+
+        print(f"Seeds: [{summary['start']}, {summary['stop']}) in {summary['processing_time']:.3f} s.")
+        print(f"Most steps: {summary['max_steps']} (seed {summary['max_steps_seed']})")
+        print(f"Highest peak: {summary['max_peak']} (seed {summary['max_peak_seed']})")
+        if summary['unresolved']:
+            print(f"Never reach 1 (cycle or step cap): {summary['unresolved']} seeds")
+
+    elif args.map and not args.map.is_standard:
+        n = check_number(get_number())
+        trajectory = map_trajectory(n, args.map)
+
+        print(f'Starting number: {n}, map: {args.map}\n')
+        print(f'{n} {trajectory.describe()}, in {trajectory.processing_time*1e6:.3f} us.')
+
+    else:
+        n = get_number()
+        n = check_number(n)
+
+        print(f'Starting number: {n}\n')
 
-    step_num, conjecture, processing_time = do_cc(n)
+        step_num, conjecture, processing_time = do_cc(n)
 
-    print(f'Steps: {len(step_num)} in {processing_time*1e6:.3f} us.')
\ No newline at end of file
+        print(f'Steps: {len(step_num)} in {processing_time*1e6:.3f} us.')
\ No newline at end of file
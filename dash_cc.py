@@ -1,6 +1,9 @@
 """An interactive Collatz Conjecture module using Dash."""
 
-import pandas as pd
+import os
+import re
+import sys
+from functools import lru_cache
 import dash
 from dash import dcc
 from dash import html
@@ -9,7 +12,11 @@ from dash.exceptions import PreventUpdate
 from dash.dependencies import Input, Output, State
 import dash_bootstrap_components as dbc
 import dash_daq as daq
-from plot_cc import plot_line 
+from plot_cc import plot_line, plot_distribution, plot_overlay, plot_values, line_trace, MAX_PLOT_POINTS
+from cache_cc import LRUCache, DEFAULT_MAX_BYTES
+from jobs_cc import JobManager, JobLimitError, DEFAULT_MAX_JOBS, DEFAULT_TIMEOUT, RUNNING, DONE, TIMEOUT
+from metrics_cc import Metrics, install as install_metrics
+from api_cc import create_api
 import collatz_conjecture as cc
 
 COLOR_MODE_DASH = {'font_color': ('black', 'white'),
@@ -21,13 +28,67 @@ app = dash.Dash(__name__, assets_folder='assets', title='Collatz Conjecture', up
 app.config.suppress_callback_exceptions = True  # Dynamic layout
 
 # TODO: Fill in a header HTML
-# TODO: Step 1-2 not getting plotted
 
 server = app.server
 
-# Hold CC stats for table display
-cc_stats = []
-df_cc_stats = pd.DataFrame({'Starting Number': [0], 'Processing time (us)': [0], '# Steps': [0]})
+# Computed trajectories (parity encoded, see parity_cc) and figures, shared by the threads of this server process
+cc_cache = LRUCache(int(os.environ.get('CC_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)))
+
+# Seeds with more bits than this are computed by background jobs, at most CC_MAX_JOBS at once
+BACKGROUND_MIN_BITS = int(os.environ.get('CC_BACKGROUND_MIN_BITS', 4096))
+JOB_POLL_MS = 500
+cc_jobs = JobManager(int(os.environ.get('CC_MAX_JOBS', DEFAULT_MAX_JOBS)),
+                     float(os.environ.get('CC_JOB_TIMEOUT', DEFAULT_TIMEOUT)))
+
+# Callback and hot-path latencies, served at /metrics (see metrics_cc.install for profiling)
+cc_metrics = Metrics()
+install_metrics(server, cc_metrics)
+
+# ------------------------------------------------------------------------
+
+def scrape_metrics():
+    """Reads the cache and job gauges when /metrics is scraped.
+    :return: (list) (name, type, help, value) of each metric"""
+
+    stats = cc_cache.stats()
+
+    return [('cc_cache_hits_total', 'counter', 'Cache lookups that found a value.', stats['hits']),
+            ('cc_cache_misses_total', 'counter', 'Cache lookups that found nothing.', stats['misses']),
+            ('cc_cache_evictions_total', 'counter', 'Entries evicted to stay within the memory budget.', stats['evictions']),
+            ('cc_cache_hit_rate', 'gauge', 'Fraction of cache lookups that found a value.', stats['hit_rate']),
+            ('cc_cache_entries', 'gauge', 'Entries in the cache.', stats['entries']),
+            ('cc_cache_bytes', 'gauge', 'Estimated memory used by the cache.', stats['bytes']),
+            ('cc_jobs_running', 'gauge', 'Background jobs running.', cc_jobs.running())]
+
+cc_metrics.add_collector(scrape_metrics)
+
+# Longest seed accepted in the input box (Python limits int/str conversions to 4300 digits by default)
+MAX_SEED_DIGITS = 100000
+
+def allow_long_seeds():
+    """Raises the int/str conversion limit of the interpreter to MAX_SEED_DIGITS.
+    The limit is process-wide, so importing this module leaves it alone unless CC_ALLOW_LONG_SEEDS is set."""
+
+    if hasattr(sys, 'set_int_max_str_digits'):
+        sys.set_int_max_str_digits(MAX_SEED_DIGITS)
+
+# `python dash_cc.py` always raises the limit, other servers (e.g. gunicorn) when CC_ALLOW_LONG_SEEDS is set
+if os.environ.get('CC_ALLOW_LONG_SEEDS', '').lower() in ('1', 'true', 'yes'):
+    allow_long_seeds()
+
+# CC stats are kept per browser session (in the 'cc-stats' store), newest MAX_STATS_ROWS rows only
+STATS_COLUMNS = ['Starting Number', 'Map', 'Processing time (us)', '# Steps']
+MAX_STATS_ROWS = 1000
+STATS_PAGE_SIZE = 10
+
+# Points appended per animation frame in chunked plotting mode
+DEFAULT_BATCH_SIZE = 5
+
+# Most seeds overlaid on the '/overlay' page
+MAX_OVERLAY_SEEDS = 50
+
+# Precomputed distribution tiles of the '/distribution' page, built with tiles_cc.py
+TILES_PATH = os.environ.get('CC_TILES', 'cc_tiles.npz')
 
 # ------------------------------------------------------------------------
 
@@ -35,27 +96,38 @@ app.layout = html.Div([
     dcc.Location(id='url'),
     dcc.Store(id='viewport-container', data={}, storage_type='session'),
     dcc.Store(id='dark-mode-value', data=True, storage_type='session'),
+    dcc.Store(id='cc-stats', data=[], storage_type='session'),
     html.Div(id='page-content')
 ])
 
 # ------------------------------------------------------------------------
 
 @app.callback(Output('page-content', 'children'),
-              [Input('url', 'pathname'), Input('dark-mode-value', 'data'), Input('viewport-container', 'data')])
-def display_page(pathname, dark_mode, screen_size):
+              [Input('url', 'pathname'), Input('dark-mode-value', 'data'), Input('viewport-container', 'data')],
+              State('cc-stats', 'data'))
+@cc_metrics.callback('display_page')
+def display_page(pathname, dark_mode, screen_size, stats_rows):
     """CALLBACK: Updates the page content based on the URL.
     TRIGGER: Upon page loading and when the URL changes
     :param: pathname (str) The URL in the browser
     :param: dark_mode (bool) Whether the plot is done in dark mode or not
     :param: screen_size (dict) Dictionary of 'height' and 'width' the screen size
+    :param: stats_rows (list) The CC stats rows of this browser session
     :return: dash HTML layout based on the URL."""
 
     if pathname == '/':
-        return main_layout(dark_mode)
+        return main_layout(dark_mode, stats_rows or [])
+
+    if pathname == '/distribution':
+        return distribution_layout(dark_mode)
+
+    if pathname == '/overlay':
+        return overlay_layout(dark_mode)
 
 # ------------------------------------------------------------------------
 
 @app.callback(Output('dark-mode-value', 'data'), [Input('dark-mode-switch', 'value')])
+@cc_metrics.callback('dark_mode_setting')
 def dark_mode_setting(dark_mode):
     """CALLBACK: Updates the global value of dark mode based on changes in the switch.
     TRIGGER: Upon page loading and toggling the dark mode switch.
@@ -66,6 +138,7 @@ def dark_mode_setting(dark_mode):
 # ------------------------------------------------------------------------
 
 @app.callback(Output('main', 'style'), [Input('dark-mode-switch', 'value')])
+@cc_metrics.callback('update_layout')
 def update_layout(dark_mode):
     """CALLBACK: Updates layout based on the dark mode toggle switch selected.
     TRIGGER: Upon page loading and when selecting the toggle for dark mode
@@ -77,55 +150,554 @@ def update_layout(dark_mode):
 
 # ------------------------------------------------------------------------
 
-@app.callback(
-        [Output('line-cc', 'figure'), Output('table', 'data')],
-        [Input('dark-mode-switch', 'value'), Input('input-num-cc', 'value')],
-        State('table', 'data'), State('table', 'columns'))
-def update_table(dark_mode, n, rows, columns):
-    """CALLBACK: Updates the line chart based on the dark mode and input number provided.
-    TRIGGER: Upon page load, toggling the dark mode switch, or changing starting input number.
+def get_zoom_range(relayout_data):
+    """Extracts the step window of a zoom/pan of the line chart.
+    :param: relayout_data (dict) The relayoutData of the line chart
+    :return: (tuple) (x0, x1) of the zoomed window, or None when zoomed back out
+    :raises: PreventUpdate when the relayout is not a change of the x-axis range"""
+
+    if not relayout_data:
+        raise PreventUpdate
+
+    if 'xaxis.range[0]' in relayout_data and 'xaxis.range[1]' in relayout_data:
+        return relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']
+
+    if 'xaxis.range' in relayout_data:
+        return tuple(relayout_data['xaxis.range'])
+
+    if relayout_data.get('xaxis.autorange'):
+        return None
+
+    raise PreventUpdate
+
+# ------------------------------------------------------------------------
+
+def parse_seed(n):
+    """Converts the seed typed in the input box to an integer.
+    :param: n (str) The content of the input box
+    :return: (int) The seed
+    :raises: PreventUpdate if the input is empty or not a positive integer,
+             ValueError if it has more digits than the interpreter converts (see allow_long_seeds)"""
+
+    text = str(n).strip()
+
+    try:
+        n = int(text)
+    except ValueError:
+        if text.isascii() and text.isdigit():
+            limit = sys.get_int_max_str_digits()
+            raise ValueError(f"This server accepts numbers of at most {limit:,} digits, this one has {len(text):,}.")
+        raise PreventUpdate
+
+    if n < 1:
+        raise PreventUpdate
+
+    return n
+
+# ------------------------------------------------------------------------
+
+def parse_map(spec):
+    """Converts the map typed in the map box to a generalized map.
+    :param: spec (str) The content of the map box, e.g. '5n+1'
+    :return: (cc.CollatzMap) The map, None for 3n+1 (which keeps the optimized code paths and cache keys)
+    :raises: ValueError if the map is not valid"""
+
+    if not spec or not spec.strip():
+        return None
+
+    cmap = cc.CollatzMap.parse(spec)
+
+    return None if cmap.is_standard else cmap
+
+# ------------------------------------------------------------------------
+
+def map_key(cmap):
+    """Suffix of the cache keys of a map, empty for 3n+1.
+    :param: cmap (cc.CollatzMap) The map, None for 3n+1
+    :return: (tuple)"""
+
+    return () if cmap is None else (cmap,)
+
+# ------------------------------------------------------------------------
+
+def get_trajectory(n, cmap=None):
+    """Returns the trajectory of a seed from the cache, computing it on a miss.
+    Seeds above BACKGROUND_MIN_BITS are never computed here, they are left to a background job.
+    :param: n (int) Starting seed for collatz-conjecture
+    :param: cmap (cc.CollatzMap) A generalized map to follow, None for 3n+1
+    :return: (parity_cc.ParityTrajectory) The encoded trajectory, None for a huge seed that is not cached"""
+
+    key = ('trajectory', n) + map_key(cmap)
+
+    if n.bit_length() > BACKGROUND_MIN_BITS:
+        return cc_cache.get(key)
+
+    return cc_cache.get_or_compute(key, lambda: compute_trajectory(n, cmap))
+
+# ------------------------------------------------------------------------
+
+@cc_metrics.timed('compute')
+def compute_trajectory(n, cmap=None):
+    """Computes the parity encoded trajectory of a seed, timed as the 'compute' stage.
+    :param: n (int) Starting seed for collatz-conjecture
+    :param: cmap (cc.CollatzMap) A generalized map to follow, None for 3n+1
+    :return: (parity_cc.ParityTrajectory) The encoded trajectory"""
+
+    import parity_cc
+
+    if cmap is None:
+        return parity_cc.compute(n)
+
+    return parity_cc.encode(cc.do_cc_compact(n, cmap))
+
+# The HTTP API (/api/seeds, /api/range) shares the compute path and cache of the UI
+server.register_blueprint(create_api(get_trajectory))
+
+# ------------------------------------------------------------------------
+
+@cc_metrics.timed('figure')
+def build_figure(trajectory, dark_mode, animate=True):
+    """Builds the line chart figure for a new seed.
+    :param: trajectory (parity_cc.ParityTrajectory) The encoded trajectory
     :param: dark_mode (bool) Whether the plot is done in dark mode or not
+    :param: animate (bool) Whether the figure starts at step 1 and is animated in the browser,
+            otherwise the whole (decimated) sequence is shown at once
+    :return: (go.Figure)"""
+
+    n = trajectory.seed
+    title = figure_title(trajectory)
+
+    if not animate:
+        x, y = sequence_points(trajectory)
+        fig = plot_line(x, y, trajectory.processing_time, False, True, dark_mode, title=title)
+        fig.update_layout(meta={'animate': False})
+        return fig
+
+    # The animation only needs the layout, the browser computes the points: nothing is decoded
+    fig = plot_line([1], [0], trajectory.processing_time, False, True, dark_mode, title=title)
+
+    # Start with step 1 at input n, in a trace chosen for the whole sequence (WebGL for long ones)
+    # Seeds beyond 64 bits are drawn as (rounded) floats, like the rest of their trajectory
+    y = [n] if n.bit_length() <= 64 else [float(n) if n.bit_length() <= 1023 else None]
+    fig.data = []
+    fig.add_trace(line_trace([1], y, len(trajectory) + 1, name='CC', connectgaps=True))
+
+    # The clientside playback replays the steps of the seed, with the rules of a generalized map.
+    # It computes a*n + b before dividing by d, which can pass 2^53 while every value stays below
+    rules = trajectory.cmap.rules if trajectory.cmap is not None else ((3, 1, 1),)
+    largest = max(a for a, _, _ in rules) * trajectory.peak + max(b for _, b, _ in rules)
+    meta = {'seed': str(n), 'animate': True, 'steps': len(trajectory), 'big': largest >= 2**53,
+            'max_points': MAX_PLOT_POINTS}
+    if trajectory.cmap is not None:
+        meta['map'] = trajectory.cmap.to_meta()
+    fig.update_layout(meta=meta)
+
+    return fig
+
+# ------------------------------------------------------------------------
+
+def figure_title(trajectory):
+    """The title of the line chart, naming the map of a generalized trajectory.
+    :param: trajectory (parity_cc.ParityTrajectory) The encoded trajectory
+    :return: (str)"""
+
+    if trajectory.cmap is not None:
+        return f'Collatz Conjecture ({trajectory.cmap})'
+
+    return 'Collatz Conjecture'
+
+# ------------------------------------------------------------------------
+
+def sequence_points(trajectory, x_range=None):
+    """The points of the line chart, which shows the seed at step 1, the value after step 1 at step 2, etc.
+    Only the steps of a zoomed window are decoded, and the plot profile of a background job result is
+    used instead of decoding the whole sequence.
+    :param: trajectory (parity_cc.ParityTrajectory) The encoded trajectory
+    :param: x_range (tuple) (x0, x1) step window of a zoom, None for the whole sequence
+    :return: (tuple) x and y NumPy arrays"""
+
+    import numpy as np
+
+    first, last = 0, len(trajectory) + 1
+
+    # One point beyond each edge, so the line reaches the edges of the window
+    if x_range is not None:
+        first = min(max(int(float(x_range[0])) - 2, 0), last)
+        last = min(max(int(float(x_range[1])) + 1, first), last)
+
+    if trajectory.profile is not None:
+        y = np.frombuffer(trajectory.profile, dtype=np.float64)[first:last]
+    else:
+        y = plot_values(trajectory.sequence(first, last))
+
+    return np.arange(first + 1, first + 1 + len(y)), y
+
+# ------------------------------------------------------------------------
+
+def append_stats_row(rows, trajectory):
+    """Appends the stats of a trajectory to the session stats, dropping the oldest rows beyond MAX_STATS_ROWS.
+    :param: rows (list) The CC stats rows of this browser session
+    :param: trajectory (parity_cc.ParityTrajectory) The encoded trajectory
+    :return: (list) The updated rows"""
+
+    # Seeds beyond 2^53 are shown as text so the browser does not round them
+    n = trajectory.seed
+    seed = n if n.bit_length() <= 53 else str(n)
+    cmap = '3n+1' if trajectory.cmap is None else str(trajectory.cmap)
+    row = dict(zip(STATS_COLUMNS, [seed, cmap, "{:.2f}".format(trajectory.processing_time*1e6), len(trajectory)]))
+
+    rows = (rows or []) + [row]
+    return rows[-MAX_STATS_ROWS:]
+
+# ------------------------------------------------------------------------
+
+def job_progress_text(status):
+    """Describes the progress of a background job.
+    :param: status (dict) The job status from JobManager.status
+    :return: (str) The progress message"""
+
+    digits = int(status['bits'] * 0.30103) + 1
+
+    return (f"Computing in the background: step {status['step']:,}, "
+            f"current value has about {digits:,} digits ({status['elapsed']:.1f} s)")
+
+# ------------------------------------------------------------------------
+
+def start_job(n, job_id):
+    """Starts the background job of a huge seed, cancelling the previous job of the session.
+    :param: n (int) Starting seed for collatz-conjecture
+    :param: job_id (int) The previous job of this session, if any
+    :return: outputs of update_table"""
+
+    cc_jobs.cancel(job_id)
+
+    try:
+        job_id = cc_jobs.submit(n)
+    except JobLimitError:
+        return dash.no_update, dash.no_update, None, True, "The server is busy with other large numbers, try again later."
+
+    return dash.no_update, dash.no_update, job_id, False, job_progress_text(cc_jobs.status(job_id))
+
+# ------------------------------------------------------------------------
+
+def poll_job(n, job_id, dark_mode, rows):
+    """Reports the progress of the background job of a session, and shows its result when done.
     :param: n (int) Starting seed for collatz-conjecture
-    :rows: n (int) A link to the table data
-    :columns: n (int) A link to the table columns
-    :return: (go.Figure), df.to_dict('records')"""
+    :param: job_id (int) The job of this session
+    :param: dark_mode (bool) Whether the plot is done in dark mode or not
+    :param: rows (list) The CC stats rows of this browser session
+    :return: outputs of update_table"""
+
+    try:
+        status = cc_jobs.status(job_id)
+    except KeyError:
+        return dash.no_update, dash.no_update, None, True, "The computation was lost, enter the number again."
+
+    if status['seed'] != n:
+        cc_jobs.cancel(job_id)
+        return dash.no_update, dash.no_update, None, True, ""
+
+    if status['state'] == RUNNING:
+        return dash.no_update, dash.no_update, dash.no_update, False, job_progress_text(status)
+
+    if status['state'] != DONE:
+        cc_jobs.cancel(job_id)
+        reason = "took too long" if status['state'] == TIMEOUT else "failed"
+        return dash.no_update, dash.no_update, None, True, f"The computation {reason} and was stopped."
+
+    trajectory = cc_jobs.result(job_id)
+    cc_cache.put(('trajectory', n), trajectory)
+    fig = cc_cache.get_or_compute(('figure', n, dark_mode), lambda: build_figure(trajectory, dark_mode, False))
 
-    global cc_stats
+    return fig, append_stats_row(rows, trajectory), None, True, ""
+
+# ------------------------------------------------------------------------
+
+@app.callback(
+        [Output('line-cc', 'figure'), Output('cc-stats', 'data'),
+         Output('job-id', 'data'), Output('job-poll', 'disabled'), Output('job-progress', 'children')],
+        [Input('dark-mode-switch', 'value'), Input('input-num-cc', 'value'), Input('line-cc', 'relayoutData'),
+         Input('job-poll', 'n_intervals'), Input('input-map', 'value')],
+        State('cc-stats', 'data'), State('job-id', 'data'))
+@cc_metrics.callback('update_table')
+def update_table(dark_mode, n, relayout_data, n_intervals, map_spec, rows, job_id):
+    """CALLBACK: Updates the line chart based on the dark mode, input number and map provided.
+    TRIGGER: Upon page load, toggling the dark mode switch, changing starting input number or map, zooming the chart,
+    or polling the background job of a huge seed.
+    :param: dark_mode (bool) Whether the plot is done in dark mode or not
+    :param: n (str) Starting seed for collatz-conjecture
+    :param: relayout_data (dict) Zoom/pan of the line chart
+    :param: n_intervals (int) Number of polls of the background job
+    :param: map_spec (str) The map to follow, e.g. '3n+1' or '5n+1'
+    :param: rows (list) The CC stats rows of this browser session
+    :param: job_id (int) The background job of this session, if any
+    :return: (go.Figure), (list) the updated CC stats rows, job id, whether polling is disabled, job progress"""
 
     if not n:
         raise PreventUpdate
 
-    n = cc.check_number(n)
+    try:
+        n = parse_seed(n)
+    except ValueError as e:
+        return dash.no_update, dash.no_update, dash.no_update, dash.no_update, str(e)
+
+    triggered = dash.callback_context.triggered_id
+    new_seed = triggered in ('input-num-cc', 'input-map')
+
+    try:
+        cmap = parse_map(map_spec)
+    except ValueError as e:
+        return dash.no_update, dash.no_update, dash.no_update, dash.no_update, str(e)
+
+    # Background jobs only follow 3n+1, generalized maps are step capped instead
+    if cmap is not None and n.bit_length() > BACKGROUND_MIN_BITS:
+        cc_jobs.cancel(job_id)
+        return (dash.no_update, dash.no_update, None, True,
+                f"Numbers over {BACKGROUND_MIN_BITS} bits can only be followed with the 3n+1 map.")
+
+    if triggered == 'job-poll':
+        if job_id is None:
+            raise PreventUpdate
+        return poll_job(n, job_id, dark_mode, rows)
+
+    trajectory = get_trajectory(n, cmap)
+
+    # Huge seeds are computed in a worker process while the page polls for progress
+    if trajectory is None:
+        if new_seed or job_id is None:
+            return start_job(n, job_id)
+        raise PreventUpdate
+
+    # A new seed abandons the job of the previous one
+    if new_seed and job_id is not None:
+        cc_jobs.cancel(job_id)
+        job_id = None
 
-    # Extract python processing time
-    # JS processing time (in the clientside_callback below) is not computed
-    step_num, conjecture, processing_time = cc.do_cc(n)
+    animate = n.bit_length() <= BACKGROUND_MIN_BITS
 
-    # CC stats for table population
-    cc_stats.append([n, "{:.2f}".format(processing_time*1e6), len(step_num)])
-    df_cc_stats = pd.DataFrame(cc_stats, columns=['Starting Number', 'Processing time (us)', '# Steps'])
+    # How a generalized trajectory ended (reached 1, entered a cycle or hit the step cap)
+    message = f"{n} {trajectory.describe()} with the map {cmap}." if cmap is not None else ""
 
-    # Just get a basic figure object then wipe out the data when a new input number comes in
-    fig = plot_line(step_num, conjecture, processing_time, False, True, dark_mode)
+    # Zooming reloads the visible window, decimated on its own to MAX_PLOT_POINTS (and stops the animation)
+    if triggered == 'line-cc':
+        x_range = get_zoom_range(relayout_data)
+        with cc_metrics.timed('figure'):
+            x, y = sequence_points(trajectory, x_range)
+            fig = plot_line(x, y, trajectory.processing_time, False, True, dark_mode,
+                            x_range=x_range, title=figure_title(trajectory))
 
-    # Clear the data when a new number comes in
-    # Start with step 1 at input n
-    fig.data[0]['x'] = [1] 
-    fig.data[0]['y'] = [n] 
+        fig.update_layout(meta={'animate': False})
+        if x_range is not None:
+            fig.update_xaxes(range=x_range, autorange=False)
 
-    return fig, df_cc_stats.to_dict('records')
+        return fig, dash.no_update, job_id, True, message
+
+    # Toggling dark mode or re-entering a seed reuses the cached figure
+    fig = cc_cache.get_or_compute(('figure', n, dark_mode) + map_key(cmap),
+                                  lambda: build_figure(trajectory, dark_mode, animate))
+
+    # CC stats for table population, only a new seed or map adds a row
+    if not new_seed:
+        return fig, dash.no_update, job_id, True, message
+
+    return fig, append_stats_row(rows, trajectory), job_id, True, message
 
 # ------------------------------------------------------------------------
 
-def get_table_container(df_cc_stats, dark_mode):
-    """Provides an HTML container for centering a statistics table for each stats dataframe.
-    :param: df_cc_stats (pandas.df) Stats data frame
+@app.callback([Output('overlay-cc', 'figure'), Output('overlay-info', 'children')],
+              [Input('overlay-seeds', 'value')],
+              State('dark-mode-value', 'data'))
+@cc_metrics.callback('update_overlay')
+def update_overlay(seeds_text, dark_mode):
+    """CALLBACK: Overlays the trajectories of several seeds, their shared tails being computed and drawn once.
+    TRIGGER: Upon page load and when the list of seeds changes.
+    :param: seeds_text (str) Seeds separated by commas or spaces
+    :param: dark_mode (bool) Whether the plot is done in dark mode or not
+    :return: (go.Figure), (str) a summary of the merged trajectories"""
+
+    if not seeds_text:
+        raise PreventUpdate
+
+    try:
+        seeds = tuple(dict.fromkeys(int(n) for n in re.split(r'[\s,;]+', seeds_text.strip()) if n))
+    except ValueError:
+        return dash.no_update, "Enter positive integers separated by commas or spaces."
+
+    if not seeds or min(seeds) < 1:
+        return dash.no_update, "Enter positive integers separated by commas or spaces."
+    if len(seeds) > MAX_OVERLAY_SEEDS:
+        return dash.no_update, f"At most {MAX_OVERLAY_SEEDS} numbers can be compared at once."
+    if max(seeds).bit_length() > BACKGROUND_MIN_BITS:
+        return dash.no_update, f"Numbers over {BACKGROUND_MIN_BITS} bits can only be plotted on their own."
+
+    merged = cc_cache.get_or_compute(('merged', seeds), lambda: merge_seeds(seeds))
+
+    fig = cc_cache.get_or_compute(('overlay', seeds, dark_mode), lambda: build_overlay_figure(merged, dark_mode))
+
+    total = sum(merged.steps) + len(merged)
+    return fig, (f"{len(merged)} numbers, {total:,} values in their sequences, of which {merged.stored:,} "
+                 f"are distinct: the shared tails are computed and plotted once.")
+
+# ------------------------------------------------------------------------
+
+@cc_metrics.timed('compute')
+def merge_seeds(seeds):
+    """Computes the merged trajectories of several seeds, timed as the 'compute' stage.
+    :param: seeds (tuple) Starting seeds for collatz-conjecture
+    :return: (cc.MergedTrajectories) The merge tree of their trajectories"""
+
+    return cc.merge_trajectories(seeds)
+
+# ------------------------------------------------------------------------
+
+@cc_metrics.timed('figure')
+def build_overlay_figure(merged, dark_mode):
+    """Builds the overlay figure of merged trajectories, timed as the 'figure' stage.
+    :param: merged (cc.MergedTrajectories) The merge tree of the trajectories
+    :param: dark_mode (bool) Whether the plot is done in dark mode or not
+    :return: (go.Figure)"""
+
+    return plot_overlay(merged, dark_mode)
+
+# ------------------------------------------------------------------------
+
+def overlay_layout(dark_mode):
+    """Returns the layout of the page comparing several seeds.
+    :param: dark_mode (bool) Whether the plot is done in dark mode or not
+    :return: dash HTML layout"""
+
+    style = {'fontFamily': 'Arial', 'fontSize': 18, 'color': COLOR_MODE_DASH['font_color'][dark_mode],
+             'border': '4px solid skyblue', 'background-color': COLOR_MODE_DASH['bg_color'][dark_mode]}
+
+    layout = html.Div([
+        html.Div(dcc.Link('Back to the Collatz Conjecture', href='/'), id='nav-links'),
+        html.Hr(),
+        html.Div([
+                "Enter the numbers to compare, separated by commas: ",
+                dcc.Input(id='overlay-seeds', type='text', value='27, 54, 97, 1023', debounce=True,
+                          style={'width': '50%'}),
+                ], id='overlay-seeds-div'),
+        html.Div(id='overlay-info'),
+        html.Hr(),
+        dcc.Graph(id='overlay-cc', responsive='auto'),
+    ], id='overlay', style=style)
+
+    return layout
+
+# ------------------------------------------------------------------------
+
+@lru_cache(maxsize=1)
+def get_tiles():
+    """Loads the distribution tiles once per server process.
+    :return: (DistributionTiles) The tiles, None if TILES_PATH has not been built"""
+
+    if not os.path.exists(TILES_PATH):
+        return None
+
+    from tiles_cc import DistributionTiles
+
+    return DistributionTiles(TILES_PATH)
+
+# ------------------------------------------------------------------------
+
+@app.callback(
+        [Output('dist-heatmap', 'figure'), Output('dist-histogram', 'figure'), Output('dist-info', 'children')],
+        [Input('dist-metric', 'value'), Input('dist-start', 'value'), Input('dist-stop', 'value'),
+         Input('dist-heatmap', 'relayoutData')],
+        State('dark-mode-value', 'data'))
+@cc_metrics.callback('update_distribution')
+def update_distribution(metric, start, stop, relayout_data, dark_mode):
+    """CALLBACK: Updates the distribution heatmap and histogram from the precomputed tiles.
+    TRIGGER: Upon page load, changing the metric or the seed range, or zooming the heatmap.
+    :param: metric (str) 'steps' or 'peaks'
+    :param: start (int) First seed of the range
+    :param: stop (int) Last seed of the range
+    :param: relayout_data (dict) Zoom/pan of the heatmap
+    :param: dark_mode (bool) Whether the plot is done in dark mode or not
+    :return: (go.Figure) heatmap, (go.Figure) histogram, (str) the seeds covered by the tiles"""
+
+    tiles = get_tiles()
+    if tiles is None:
+        return dash.no_update, dash.no_update, f"No distribution tiles found, build them with: python tiles_cc.py 100000000 --output {TILES_PATH}"
+
+    start, stop = start or 1, (stop or tiles.capacity) + 1
+
+    # Zooming the heatmap queries the visible seeds at a finer level
+    if dash.callback_context.triggered_id == 'dist-heatmap':
+        x_range = get_zoom_range(relayout_data)
+        if x_range is not None:
+            start, stop = max(int(x_range[0]), 1), int(x_range[1]) + 1
+
+    query = tiles.query(metric, start, stop)
+
+    with cc_metrics.timed('figure'):
+        heatmap, histogram = plot_distribution(query, metric, dark_mode)
+
+    return heatmap, histogram, f"Tiles cover seeds 1 to {tiles.capacity:,}."
+
+# ------------------------------------------------------------------------
+
+def distribution_layout(dark_mode):
+    """Returns the layout of the stopping-time distribution page.
+    :param: dark_mode (bool) Whether the plot is done in dark mode or not
+    :return: dash HTML layout"""
+
+    style = {'fontFamily': 'Arial', 'fontSize': 18, 'color': COLOR_MODE_DASH['font_color'][dark_mode],
+             'border': '4px solid skyblue', 'background-color': COLOR_MODE_DASH['bg_color'][dark_mode]}
+
+    layout = html.Div([
+        html.Div(dcc.Link('Back to the Collatz Conjecture', href='/'), id='nav-links'),
+        html.Hr(),
+        html.Div([
+                "Distribution of: ",
+                dcc.RadioItems(id='dist-metric',
+                               options=[{'label': 'Number of steps', 'value': 'steps'},
+                                        {'label': 'Peak value', 'value': 'peaks'}],
+                               value='steps', inline=True,
+                               inputStyle={'margin-left': '10px', 'margin-right': '5px'}),
+                ], id='dist-metric-div'),
+        html.Div([
+                "Seeds from: ",
+                dcc.Input(id='dist-start', type='number', value=1, min=1, step=1, debounce=True),
+                " to: ",
+                dcc.Input(id='dist-stop', type='number', min=1, step=1, debounce=True),
+                ], id='dist-range-div'),
+        html.Div(id='dist-info'),
+        html.Hr(),
+        dcc.Graph(id='dist-heatmap', responsive='auto'),
+        dcc.Graph(id='dist-histogram', responsive='auto'),
+    ], id='distribution', style=style)
+
+    return layout
+
+# ------------------------------------------------------------------------
+
+@app.callback(Output('stats-download', 'data'), Input('stats-download-button', 'n_clicks'),
+              State('cc-stats', 'data'), prevent_initial_call=True)
+@cc_metrics.callback('download_stats')
+def download_stats(n_clicks, rows):
+    """CALLBACK: Sends the CC stats of the browser session as a CSV file.
+    TRIGGER: When the download button is clicked.
+    :param: n_clicks (int) Number of clicks of the button
+    :param: rows (list) The CC stats rows of this browser session
+    :return: (dict) The file for the dcc.Download component"""
+
+    from export_cc import stats_csv
+
+    return dcc.send_string(stats_csv(rows or [], STATS_COLUMNS), 'cc_stats.csv')
+
+# ------------------------------------------------------------------------
+
+def get_table_container(stats_rows, dark_mode):
+    """Provides an HTML container for centering a statistics table for the session stats.
+    :param: stats_rows (list) The CC stats rows of this browser session
     :param: dark_mode (bool) Whether the plot is done in dark mode or not
     :return dbc.Container containing the HTML code for displaying the table."""
 
     stats_table = html.Div(
         [
-            dash_table.DataTable(data=df_cc_stats.to_dict('records'), id='table',
+            dash_table.DataTable(data=stats_rows, id='table',
+                                 page_action='native', page_size=STATS_PAGE_SIZE,
                                  style_header={
                                      'fontWeight': 'bold',
                                      'color': COLOR_MODE_DASH['font_color'][dark_mode]
@@ -141,7 +713,7 @@ def get_table_container(df_cc_stats, dark_mode):
                                 #  fill_width=False,
                                 #  style_table={'overflowX': 'auto'},
                                 #  style_as_list_view=True,
-                                 columns=[{"name": i, "id": i} for i in df_cc_stats.columns],
+                                 columns=[{"name": i, "id": i} for i in STATS_COLUMNS],
                                  ),
         ],
     )
@@ -167,9 +739,10 @@ def get_table_container(df_cc_stats, dark_mode):
 
 # ------------------------------------------------------------------------
 
-def main_layout(dark_mode):
+def main_layout(dark_mode, stats_rows):
     """Returns the main/default (index) layout of the page.
     :param: dark_mode (bool) Whether the plot is done in dark mode or not
+    :param: stats_rows (list) The CC stats rows of this browser session
     :return: dash HTML layout"""
 
     layout = html.Div([
@@ -188,26 +761,50 @@ def main_layout(dark_mode):
                                  size=50,
                                  color='orange'),
                 html.Hr(),
+                html.Div([dcc.Link('Compare several numbers', href='/overlay'), " | ",
+                          dcc.Link('Stopping-time distribution', href='/distribution')], id='nav-links'),
+                html.Hr(),
                 html.Div([
                         "Enter integer number to start the Collatz-Conjecture: ",
-                        dcc.Input(id='input-num-cc', type='number', min=1, step=1, debounce=True),
+                        dcc.Input(id='input-num-cc', type='text', inputMode='numeric', pattern='[0-9]*', debounce=True),
+                        html.Div(id='job-progress'),
                         ], id='cc-div'),
+                html.Div([
+                        "Map: ",
+                        dcc.Input(id='input-map', type='text', value='3n+1', debounce=True),
+                        " (e.g. 5n+1, or one 'a,b,d' rule (a*n+b)/d per residue: '1,0,3; 4,2,3; 4,1,3')",
+                        ], id='map-div'),
                 html.Hr(),
+                html.Div([
+                        "Plotting mode: ",
+                        dcc.RadioItems(id='playback-mode',
+                                       options=[{'label': 'Step by step', 'value': 'step'},
+                                                {'label': 'Chunked', 'value': 'chunked'}],
+                                       value='chunked', inline=True,
+                                       inputStyle={'margin-left': '10px', 'margin-right': '5px'}),
+                        ], id='playback-mode-div'),
                 html.Div([
                         "Plotting speed 25-1000 (ms): ",
                         dcc.Input(id='input-interval-ms', type='number', value=250, min=25, max=1000, step=1, debounce=True),
-                        ], id='plotting-speed-div')
+                        ], id='plotting-speed-div'),
+                html.Div([
+                        "Points per frame (chunked): ",
+                        dcc.Input(id='input-batch-size', type='number', value=DEFAULT_BATCH_SIZE, min=1, step=1, debounce=True),
+                        ], id='batch-size-div')
             ], id='page-settings'
         ),
         html.Hr(),
         dcc.Graph(id="line-cc",
                   responsive='auto',
                   figure=plot_line([0], [0], 0, False, True, dark_mode)),
-        dcc.Interval(id='interval', disabled=True, interval=250, max_intervals=10000),
-        dcc.Store(id='current-num', data=0),
-        dcc.Store(id='step-num', data=1),
+        dcc.Store(id='playback', data={}),
+        dcc.Store(id='job-id', data=None),
+        dcc.Interval(id='job-poll', interval=JOB_POLL_MS, disabled=True),
         html.Hr(),
-        get_table_container(df_cc_stats, dark_mode),
+        get_table_container(stats_rows, dark_mode),
+        html.Div([html.Button('Download table (CSV)', id='stats-download-button'),
+                  dcc.Download(id='stats-download')],
+                 id='stats-download-div', style={'textAlign': 'center', 'margin-top': '10px'}),
         html.Hr(),
         html.Footer(
             [
@@ -227,6 +824,21 @@ def main_layout(dark_mode):
 
 # ------------------------------------------------------------------------
 
+"""CALLBACK: A client callback to show the session CC stats in the table.
+TRIGGER: When a row is added to the cc-stats store.
+The rows stay in the browser, the server only ever sees the capped session list."""
+app.clientside_callback(
+    """
+    function(rows) {
+        return rows;
+    }
+    """,
+    Output('table', 'data'),
+    Input('cc-stats', 'data')
+)
+
+# ------------------------------------------------------------------------
+
 """CALLBACK: A client callback to execute JS in a browser session to get the screen width and height.
 TRIGGER: Upon page loading.
 Results are put in the Store() viewport-container data property."""
@@ -245,77 +857,145 @@ app.clientside_callback(
 # ------------------------------------------------------------------------
 
 '''
-A clientside callback to pass the interval speed to the interval object.
-TRIGGER: Upon filling the input-interval-ms box.
+A clientside callback to play the CC in the browser.
+The sequence is computed once when a new figure arrives from update_table, then appended to
+the chart directly with Plotly.extendTraces, without a Dash callback per point:
+- 'step' mode: one point every input-interval-ms milliseconds (the original look).
+- 'chunked' mode: input-batch-size points per animation frame (requestAnimationFrame).
+Sequences longer than the max_points of the figure are played decimated like the static chart.
+A new figure (new seed, dark mode toggle, zoom) cancels the playback still running.
+TRIGGER: When the line chart figure is replaced.
 '''
 app.clientside_callback(
     """
-    function intervalSpeed(interval_speed) {
-    
-        return interval_speed;
-    }
-    """,
-    Output('interval', 'interval'),
-    Input('input-interval-ms', 'value'),
-    prevent_initial_call=True
-)
+    function playCollatzConjecture(figure, mode, interval_ms, batch_size) {
 
-# ------------------------------------------------------------------------
+        // Stop any playback still running for a previous figure
+        if (window.ccPlayback) {
+            window.ccPlayback.cancelled = true;
+        }
 
-'''
-A faster clientside callback to do the CC for one step at a time.
-The interval object calls this at the speed provided from the callback from
-the previous function.
-TRIGGER: When an input is provided.  Then it:
-- Appends the data to the plot
-- Disables the interval if we've hit the end
-- Keeps track fo the current number and step number in their dcc.Store objects.
-'''
-app.clientside_callback(
-    """
-    function singleCollatzConjecture(input_n, n, step_num, n_intervals) {
-    
-        // Very first number comes in
-        if (n == null || n === 0) {
-            n = input_n;
+        var meta = (figure && figure.layout && figure.layout.meta) || {};
+        if (!meta.animate) {
+            return window.dash_clientside.no_update;
         }
 
-        // A new number comes in
-        if(n === 1) {
-            n = input_n;
-            step_num = 1;
+        var playback = {cancelled: false};
+        window.ccPlayback = playback;
+
+        // Compute the whole sequence once, with Numbers while they are exact and with BigInt
+        // from the first value (or a*n + b before its division) beyond 2^53, whatever the seed.
+        // The map rules (a, b, d) by residue come from the server (3n+1 by default), as does
+        // the number of steps, so cycles and step caps end exactly where the server stopped.
+        var big = meta.big || !Number.isSafeInteger(Number(meta.seed));
+        var num = big ? BigInt : Number;
+        var map = meta.map || {modulus: 2, rules: [[1, 0, 2], [3, 1, 1]]};
+        var modulus = num(map.modulus);
+        var rules = map.rules.map(function(rule) { return rule.map(num); });
+        var n = num(meta.seed);
+        var xs = [];
+        var ys = [];
+
+        while (xs.length < meta.steps) {
+            var rule = rules[Number(n % modulus)];
+            var an_b = rule[0] * n + rule[1];
+
+            // n is still exact here, carry on from it with BigInt
+            if (!big && !Number.isSafeInteger(an_b)) {
+                big = true;
+                modulus = BigInt(modulus);
+                rules = rules.map(function(rule) { return rule.map(BigInt); });
+                n = BigInt(n);
+                rule = rules[Number(n % modulus)];
+                an_b = rule[0] * n + rule[1];
+            }
+
+            n = an_b / rule[2];
+            xs.push(xs.length + 2);  // Step 1 is the seed
+            ys.push(Number(n));
         }
 
-        step_num += 1;
+        // Beyond max_points, only the first and last points and the minimum and the maximum of
+        // each bucket of steps are played (in their order), as plot_cc.decimate does for the
+        // static chart
+        var maxPoints = meta.max_points || xs.length;
+        if (xs.length > maxPoints) {
+            var size = Math.ceil(xs.length / Math.max(Math.floor((maxPoints - 2) / 2), 1));
+            var keep = [0];
+
+            for (var first = 0; first < xs.length; first += size) {
+                var low = first;
+                var high = first;
+                for (var i = first + 1; i < Math.min(first + size, xs.length); i++) {
+                    if (ys[i] < ys[low]) {
+                        low = i;
+                    }
+                    if (ys[i] > ys[high]) {
+                        high = i;
+                    }
+                }
+                [Math.min(low, high), Math.max(low, high)].forEach(function(i) {
+                    if (i > keep[keep.length - 1]) {
+                        keep.push(i);
+                    }
+                });
+            }
+
+            if (keep[keep.length - 1] !== xs.length - 1) {
+                keep.push(xs.length - 1);
+            }
+
+            xs = keep.map(function(i) { return xs[i]; });
+            ys = keep.map(function(i) { return ys[i]; });
+        }
 
-        if (n % 2 === 0) {
-            n /= 2;
+        var batch = mode === 'step' ? 1 : Math.max(1, Math.floor(batch_size) || 1);
+        var next = 0;
+
+        function playNext() {
+            if (playback.cancelled || next >= xs.length) {
+                return;
+            }
+
+            var gd = document.querySelector('#line-cc .js-plotly-plot');
+            var end = Math.min(next + batch, xs.length);
+            Plotly.extendTraces(gd, {x: [xs.slice(next, end)], y: [ys.slice(next, end)]}, [0]);
+            next = end;
+
+            if (mode === 'step') {
+                setTimeout(playNext, Math.max(25, interval_ms || 250));
             } else {
-            n = 3 * n + 1;
+                window.requestAnimationFrame(playNext);
+            }
         }
 
-        // Stop the interval when 1 his hit
-        disable_interval = n === 1 ? true : false;
+        // Start once the chart shows the new figure, i.e. only the seed at step 1
+        function waitForFigure() {
+            if (playback.cancelled) {
+                return;
+            }
 
-        // TODO: Figure out why step # 2 is not plotted
-        //console.log(step_num);
-        //console.log(n);
+            var gd = document.querySelector('#line-cc .js-plotly-plot');
+            var ready = gd && gd.layout && gd.layout.meta && gd.layout.meta.seed === meta.seed
+                        && gd.data && gd.data[0] && gd.data[0].x.length === 1;
 
-        return [[{x: [[step_num]], y: [[n]]}], disable_interval, n, step_num];
+            window.requestAnimationFrame(ready ? playNext : waitForFigure);
+        }
+
+        waitForFigure();
 
-}
+        return {seed: meta.seed, steps: meta.steps};
+    }
     """,
-    Output('line-cc', 'extendData'),
-    Output('interval', 'disabled'),
-    Output('current-num', 'data'),
-    Output('step-num', 'data'),
-    Input('input-num-cc', 'value'),
-    Input('current-num', 'data'),
-    Input('step-num', 'data'),
-    Input('interval', 'n_intervals'),  # This is needed to keep the interval going
+    Output('playback', 'data'),
+    Input('line-cc', 'figure'),
+    State('playback-mode', 'value'),
+    State('input-interval-ms', 'value'),
+    State('input-batch-size', 'value'),
     prevent_initial_call=True
 )
 # ------------------------------------------------------------------------
 
 if __name__ == '__main__':
+    allow_long_seeds()
     app.run_server()
\ No newline at end of file
@@ -0,0 +1,350 @@
+"""Exports Collatz Conjecture results to columnar files (Parquet, Arrow IPC or CSV) in bounded chunks.
+
+Results are produced and written chunk by chunk (at most chunk_rows rows at a time), so exports
+of any size never hold more than one chunk in memory.  Integers use the most compact fixed-width
+dtype of their column.  Values that do not fit (big-int seeds, peaks and trajectory values) are
+left null in their column and stored in a '<column>_blob' binary column instead, as unsigned
+big-endian bytes (decode with int.from_bytes(blob, 'big')).  CSV files have no dtypes, so they
+hold every integer in decimal and have no blob columns.
+
+Trajectories can also be exported in their compact parity encoding (see parity_cc), one row per
+trajectory with its seed, number of steps and 'parity' bits (binary, or hex in CSV files).
+
+Parquet and Arrow need pyarrow (pip install pyarrow), CSV only needs the standard library.
+
+Usage:
+    python export_cc.py range 1 100000000 scan.parquet
+    python export_cc.py trajectory 27 97 871 trajectories.arrow
+    python export_cc.py trajectory --parity 27 97 871 trajectories.parquet
+"""
+
+import argparse
+import csv
+import io
+import os
+from array import array
+from timeit import default_timer as timer
+import numpy as np
+import collatz_conjecture as cc
+import parity_cc
+
+DEFAULT_CHUNK_ROWS = 1 << 20
+
+# Columns of each export: name, dtype, and whether values that do not fit go to a blob column
+RANGE_COLUMNS = (('seed', np.uint64, True),
+                 ('steps', np.uint32, False),
+                 ('peak', np.uint64, True))
+
+TRAJECTORY_COLUMNS = (('seed', np.uint64, True),
+                      ('step', np.uint32, False),
+                      ('value', np.int64, True))
+
+# Binary columns have the dtype bytes
+PARITY_COLUMNS = (('seed', np.uint64, True),
+                  ('steps', np.uint32, False),
+                  ('parity', bytes, False))
+
+FORMATS = {'.parquet': 'parquet', '.arrow': 'arrow', '.feather': 'arrow', '.csv': 'csv'}
+
+# ----------------------------------------------------------------------------------------------
+
+def int_column(values, dtype) -> tuple:
+    """Converts integers to a fixed-width column, with the values that do not fit as blobs.
+
+    Args:
+        values (array or list): The integers, an array('Q'), array('I') or a list of (big) ints.
+        dtype (np.dtype): The dtype of the column.
+
+    Returns:
+        tuple : (column, nulls, blobs)
+            - column : NumPy array of the values, 0 where they do not fit.
+            - nulls : boolean mask of the values that do not fit, None if they all fit.
+            - blobs : list of the unsigned big-endian bytes of the values that do not fit (None
+                      elsewhere), None if they all fit.
+    """
+
+    limit = np.iinfo(dtype).max
+
+    if isinstance(values, array):
+        column = np.frombuffer(values, dtype=np.uint64 if values.typecode == 'Q' else np.uint32) if len(values) else np.empty(0, dtype)
+        nulls = column > limit
+        if not nulls.any():
+            return column.astype(dtype, copy=False), None, None
+        values = values.tolist()
+    else:
+        nulls = np.fromiter((v > limit for v in values), dtype=bool, count=len(values))
+        if not nulls.any():
+            return np.array(values, dtype=dtype), None, None
+
+    column = np.array([0 if null else v for v, null in zip(values, nulls)], dtype=dtype)
+    blobs = [v.to_bytes((v.bit_length() + 7) // 8, 'big') if null else None for v, null in zip(values, nulls)]
+
+    return column, nulls, blobs
+
+# ----------------------------------------------------------------------------------------------
+
+def range_chunks(start, stop, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Yields the steps and peaks of every seed in [start, stop), chunk_rows seeds at a time.
+
+    The chunks are computed with cc.iter_stopping_times, each one reusing the results of the
+    chunks before it.
+
+    Args:
+        start (int): The first seed of the range (must be >= 1).
+        stop (int): One past the last seed of the range.
+        chunk_rows (int, optional): Seeds per chunk. Defaults to DEFAULT_CHUNK_ROWS.
+
+    Yields:
+        dict: {column: (column, nulls, blobs)} for the columns of RANGE_COLUMNS (see int_column).
+    """
+
+    for chunk_start, steps, peaks in cc.iter_stopping_times(start, stop, chunk_rows):
+        chunk_stop = chunk_start + len(steps)
+
+        yield {'seed': int_column(range(chunk_start, chunk_stop) if chunk_stop > 2**64 else
+                                  array('Q', range(chunk_start, chunk_stop)), np.uint64),
+               'steps': int_column(steps, np.uint32),
+               'peak': int_column(peaks, np.uint64)}
+
+# ----------------------------------------------------------------------------------------------
+
+def trajectory_chunks(seeds, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Yields the values of the trajectories of seeds, one row per step, chunk_rows rows at a time.
+
+    Trajectories are computed lazily with cc.iter_cc_chunks, so only one chunk of values is in
+    memory at a time however long they are.
+
+    Args:
+        seeds (iterable): Positive integer seeds.
+        chunk_rows (int, optional): Rows per chunk. Defaults to DEFAULT_CHUNK_ROWS.
+
+    Yields:
+        dict: {column: (column, nulls, blobs)} for the columns of TRAJECTORY_COLUMNS (see int_column).
+    """
+
+    for n in seeds:
+        seed = int_column([n], np.uint64)
+
+        for first_step, values in cc.iter_cc_chunks(n, chunk_rows):
+            rows = len(values)
+
+            yield {'seed': (np.repeat(seed[0], rows),
+                            None if seed[1] is None else np.repeat(seed[1], rows),
+                            None if seed[2] is None else seed[2] * rows),
+                   'step': (np.arange(first_step, first_step + rows, dtype=np.uint32), None, None),
+                   'value': int_column(values, np.int64)}
+
+# ----------------------------------------------------------------------------------------------
+
+def parity_chunks(trajectories, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Yields the parity encoding of trajectories, one row per trajectory, chunk_rows rows at a time.
+
+    Args:
+        trajectories (iterable): parity_cc.ParityTrajectory objects, e.g. from parity_cc.compute.
+            They can be produced lazily, only one chunk of them needs to be in memory at a time.
+        chunk_rows (int, optional): Rows per chunk. Defaults to DEFAULT_CHUNK_ROWS.
+
+    Yields:
+        dict: {column: (column, nulls, blobs)} for the columns of PARITY_COLUMNS (see int_column).
+    """
+
+    chunk = []
+
+    for trajectory in trajectories:
+        chunk.append(trajectory)
+
+        if len(chunk) == chunk_rows:
+            yield _parity_chunk(chunk)
+            chunk = []
+
+    if chunk:
+        yield _parity_chunk(chunk)
+
+# ----------------------------------------------------------------------------------------------
+
+def _parity_chunk(trajectories) -> dict:
+    """Returns the chunk of rows of some encoded trajectories."""
+
+    return {'seed': int_column([t.seed for t in trajectories], np.uint64),
+            'steps': int_column(array('I', (t.steps for t in trajectories)), np.uint32),
+            'parity': ([t.symbols for t in trajectories], None, None)}
+
+# ----------------------------------------------------------------------------------------------
+
+class CsvWriter:
+    """Writes chunks to a CSV file, big ints in decimal."""
+
+    def __init__(self, path, columns):
+        self.columns = columns
+        self._file = open(path, 'w', newline='')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow([name for name, _, _ in columns])
+
+    def write(self, chunk):
+        """Writes one chunk of rows."""
+
+        self._writer.writerows(zip(*([v.hex() for v in chunk[name][0]] if dtype is bytes else _decimal(chunk[name])
+                                     for name, dtype, _ in self.columns)))
+
+    def close(self):
+        self._file.close()
+
+# ----------------------------------------------------------------------------------------------
+
+def _decimal(column) -> list:
+    """Returns the values of a chunk column as Python ints, big ints restored from their blobs."""
+
+    values, nulls, blobs = column
+    values = values.tolist()
+
+    if nulls is not None:
+        for i in np.flatnonzero(nulls):
+            values[i] = int.from_bytes(blobs[i], 'big')
+
+    return values
+
+# ----------------------------------------------------------------------------------------------
+
+class ArrowWriter:
+    """Writes chunks to a Parquet file (one row group per chunk) or an Arrow IPC file (one record batch per chunk)."""
+
+    def __init__(self, path, columns, fmt):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError(f"Writing {fmt} files needs pyarrow (pip install pyarrow), or export to .csv.")
+
+        self._pa = pa
+        self.columns = columns
+
+        fields = []
+        for name, dtype, big in columns:
+            fields.append(pa.field(name, pa.binary() if dtype is bytes else pa.from_numpy_dtype(dtype)))
+            if big:
+                fields.append(pa.field(f'{name}_blob', pa.binary()))
+        self.schema = pa.schema(fields)
+
+        if fmt == 'parquet':
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(path, self.schema)
+        else:
+            self._writer = pa.ipc.new_file(path, self.schema)
+
+    def write(self, chunk):
+        """Writes one chunk of rows."""
+
+        pa = self._pa
+        arrays = []
+
+        for name, dtype, big in self.columns:
+            values, nulls, blobs = chunk[name]
+            arrays.append(pa.array(values, type=pa.binary()) if dtype is bytes else pa.array(values, mask=nulls))
+            if big:
+                arrays.append(pa.array(blobs if blobs is not None else [None] * len(values), type=pa.binary()))
+
+        batch = pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+        if hasattr(self._writer, 'write_batch'):
+            self._writer.write_batch(batch)
+        else:
+            self._writer.write(batch)
+
+    def close(self):
+        self._writer.close()
+
+# ----------------------------------------------------------------------------------------------
+
+def export(path, chunks, columns, progress=None) -> int:
+    """Writes chunks of results to a file, in the format given by its extension.
+
+    Args:
+        path (str): Path of the file, ending with .parquet, .arrow, .feather or .csv.
+        chunks (iterable): Chunks from range_chunks, trajectory_chunks or parity_chunks.
+        columns (tuple): RANGE_COLUMNS, TRAJECTORY_COLUMNS or PARITY_COLUMNS, matching the chunks.
+        progress (callable, optional): Called with the number of rows written after every chunk.
+
+    Returns:
+        int: The number of rows written.
+
+    Raises:
+        ValueError: If the extension is not a supported format.
+        ImportError: If the format needs pyarrow and it is not installed.
+    """
+
+    fmt = FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"Unsupported export format for {path}, use one of {', '.join(FORMATS)}.")
+
+    writer = CsvWriter(path, columns) if fmt == 'csv' else ArrowWriter(path, columns, fmt)
+    rows = 0
+
+    try:
+        for chunk in chunks:
+            writer.write(chunk)
+            rows += len(chunk[columns[0][0]][0])
+            if progress:
+                progress(rows)
+    finally:
+        writer.close()
+
+    return rows
+
+# ----------------------------------------------------------------------------------------------
+
+def stats_csv(rows, columns) -> str:
+    """Returns the session stats rows of the Dash app as CSV text.
+
+    Args:
+        rows (list): The stats rows (dicts).
+        columns (list): The column names, in order.
+
+    Returns:
+        str: The CSV text, with a header row.
+    """
+
+    text = io.StringIO()
+    writer = csv.DictWriter(text, fieldnames=columns, extrasaction='ignore')
+    writer.writeheader()
+    writer.writerows(rows)
+
+    return text.getvalue()
+
+# ----------------------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Exports Collatz Conjecture results to Parquet, Arrow or CSV files.')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS,
+                        help=f'Rows per chunk. Defaults to {DEFAULT_CHUNK_ROWS}.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    range_parser = subparsers.add_parser('range', help='Steps and peak of every seed of a range.')
+    range_parser.add_argument('start', type=int, help='First seed.')
+    range_parser.add_argument('stop', type=int, help='One past the last seed.')
+    range_parser.add_argument('path', help='Output file (.parquet, .arrow, .feather or .csv).')
+
+    trajectory_parser = subparsers.add_parser('trajectory', help='Every value of the trajectories of seeds.')
+    trajectory_parser.add_argument('--parity', action='store_true',
+                                   help='One row per trajectory with its parity encoding, instead of one row per step.')
+    trajectory_parser.add_argument('seeds', type=int, nargs='+', help='Seeds.')
+    trajectory_parser.add_argument('path', help='Output file (.parquet, .arrow, .feather or .csv).')
+
+    args = parser.parse_args()
+
+    if args.command == 'trajectory' and min(args.seeds) < 1:
+        parser.error('seeds must be positive integers')
+
+    def show_progress(rows):
+        print(f'Wrote {rows} rows', end='\r')
+
+    begin = timer()
+
+    if args.command == 'range':
+        rows = export(args.path, range_chunks(args.start, args.stop, args.chunk_rows), RANGE_COLUMNS, show_progress)
+    elif args.parity:
+        trajectories = (parity_cc.compute(n) for n in args.seeds)
+        rows = export(args.path, parity_chunks(trajectories, args.chunk_rows), PARITY_COLUMNS, show_progress)
+    else:
+        rows = export(args.path, trajectory_chunks(args.seeds, args.chunk_rows), TRAJECTORY_COLUMNS, show_progress)
+
+    print(f'\nWrote {rows} rows to {args.path} in {timer() - begin:.3f} s.')
@@ -0,0 +1,327 @@
+"""A persistent, memory-mapped index of Collatz Conjecture stopping times and peak values.
+
+File layout (little-endian):
+    - A 64 byte header: magic, format version, capacity N, number of seeds built so far and a
+      CRC32 checksum of each column over the built seeds.
+    - The steps column: N uint32 values, the number of steps for seeds 1..N.
+    - The peaks column: N uint64 values, the peak value for seeds 1..N (saturated at 2^64-1).
+
+The range scans and record searches of collatz_conjecture (--index), the /api/range route of the
+Dash server (CC_INDEX) and cc.iter_stopping_times read the seeds an index holds straight from the
+map (see open_known), and finish the trajectories of the other seeds on it.
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from contextlib import contextmanager
+from timeit import default_timer as timer
+import collatz_conjecture as cc
+
+MAGIC = b'CCIX'
+INDEX_VERSION = 1
+
+# magic, version, flags, capacity, built, steps_crc, peaks_crc
+HEADER = struct.Struct('<4sHHQQII')
+HEADER_SIZE = 64
+
+PEAK_SATURATED = 2**64 - 1
+
+# Every seed below this one (the first path record whose peak exceeds 2^64) has an exact peak
+EXACT_PEAKS_LIMIT = 12327829503
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# ----------------------------------------------------------------------------------------------
+
+class IndexCorruptedError(ValueError):
+    """Raised when an index file is stale (other format version) or fails its checksum."""
+
+# ----------------------------------------------------------------------------------------------
+
+def _file_size(capacity) -> int:
+    """Returns the size in bytes of an index file holding capacity seeds."""
+
+    return HEADER_SIZE + 12*capacity
+
+# ----------------------------------------------------------------------------------------------
+
+def _columns(mm, capacity) -> tuple:
+    """Returns zero-copy (steps, peaks) memoryviews over the columns of a mapped index file."""
+
+    view = memoryview(mm)
+    steps_end = HEADER_SIZE + 4*capacity
+    steps = view[HEADER_SIZE:steps_end].cast('I')
+    peaks = view[steps_end:steps_end + 8*capacity].cast('Q')
+
+    return steps, peaks
+
+# ----------------------------------------------------------------------------------------------
+
+def _check_platform():
+    """Raises an error on platforms where the native layout differs from the file layout."""
+
+    if sys.byteorder != 'little' or array('I').itemsize != 4 or array('Q').itemsize != 8:
+        raise OSError("Index files can only be mapped on little-endian platforms with 32/64 bit arrays.")
+
+# ----------------------------------------------------------------------------------------------
+
+class StoppingTimeIndex:
+    """Read access to an index file through a memory map.
+
+    Lookups and range queries return values or memoryview slices straight from the map, nothing
+    is copied or parsed up front.  Use as a context manager or call close() when done.
+    """
+
+    def __init__(self, path, verify=True):
+        """Opens and maps an index file.
+
+        Args:
+            path (str): Path of the index file.
+            verify (bool, optional): Whether to check the column checksums. Defaults to True.
+
+        Raises:
+            IndexCorruptedError: If the file is not an index, has another version or fails its checksum.
+        """
+
+        _check_platform()
+
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            self.capacity, self.built, steps_crc, peaks_crc = _read_header(self._mm)
+            self.steps, self.peaks = _columns(self._mm, self.capacity)
+
+            if verify and (zlib.crc32(self.steps[:self.built]) != steps_crc
+                           or zlib.crc32(self.peaks[:self.built]) != peaks_crc):
+                raise IndexCorruptedError(f"{path}: checksum mismatch, the index is corrupted.")
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __contains__(self, n):
+        return 1 <= n <= self.built
+
+    def close(self):
+        """Releases the memory map and the file."""
+
+        for view in ('steps', 'peaks'):
+            if getattr(self, view, None) is not None:
+                getattr(self, view).release()
+                setattr(self, view, None)
+
+        self._mm.close()
+        self._file.close()
+
+    def lookup(self, n) -> tuple:
+        """Returns the (steps, peak) of seed n.
+
+        Args:
+            n (int): The seed (1 <= n <= built).
+
+        Returns:
+            tuple : (steps, peak) where peak is PEAK_SATURATED if it does not fit in 64 bits.
+
+        Raises:
+            KeyError: If the seed is not in the index.
+        """
+
+        if n not in self:
+            raise KeyError(f"Seed {n} is not in the index (1 to {self.built}).")
+
+        return self.steps[n - 1], self.peaks[n - 1]
+
+    def query(self, start, stop) -> tuple:
+        """Returns zero-copy views of the steps and peaks of every seed in [start, stop).
+
+        Args:
+            start (int): The first seed of the range.
+            stop (int): One past the last seed of the range.
+
+        Returns:
+            tuple : (steps, peaks) memoryviews of the uint32 steps and uint64 peaks.  They must be
+                    released (or dropped) before the index is closed.
+
+        Raises:
+            KeyError: If part of the range is not in the index.
+        """
+
+        if start < 1 or stop - 1 > self.built:
+            raise KeyError(f"Seeds [{start}, {stop}) are not all in the index (1 to {self.built}).")
+
+        return self.steps[start - 1:stop - 1], self.peaks[start - 1:stop - 1]
+
+    def known(self) -> tuple:
+        """Returns zero-copy views of the steps and peaks of the seeds 1, 2, ..., as a known table.
+
+        The table can be passed as the known argument of cc.stopping_times, cc.iter_stopping_times,
+        cc.scan_range and cc.find_records.  It stops below EXACT_PEAKS_LIMIT, so that no saturated
+        peak is ever taken for an exact one.
+
+        Returns:
+            tuple : (steps, peaks) memoryviews, to be released (or dropped) before the index is closed.
+        """
+
+        size = min(self.built, EXACT_PEAKS_LIMIT - 1)
+
+        return self.steps[:size], self.peaks[:size]
+
+# ----------------------------------------------------------------------------------------------
+
+@contextmanager
+def open_known(path):
+    """Opens an index file as a known table (see StoppingTimeIndex.known), closed on exit.
+
+    Usage:
+        with open_known('cc.idx') as known:
+            summary = cc.scan_range(1, 10**9, known=known)
+    """
+
+    with StoppingTimeIndex(path) as index:
+        steps, peaks = index.known()
+
+        try:
+            yield steps, peaks
+        finally:
+            steps.release()
+            peaks.release()
+
+# ----------------------------------------------------------------------------------------------
+
+def _read_header(mm) -> tuple:
+    """Parses and validates the header of a mapped index file.
+
+    Returns:
+        tuple : (capacity, built, steps_crc, peaks_crc)
+
+    Raises:
+        IndexCorruptedError: If the header is not valid or has another format version.
+    """
+
+    if len(mm) < HEADER_SIZE:
+        raise IndexCorruptedError("File is too small to be an index.")
+
+    magic, version, _, capacity, built, steps_crc, peaks_crc = HEADER.unpack_from(mm)
+
+    if magic != MAGIC:
+        raise IndexCorruptedError("File is not a stopping-time index.")
+    if version != INDEX_VERSION:
+        raise IndexCorruptedError(f"Index format version {version} is stale, expected {INDEX_VERSION}.")
+    if built > capacity or len(mm) != _file_size(capacity):
+        raise IndexCorruptedError("Index header does not match the file size.")
+
+    return capacity, built, steps_crc, peaks_crc
+
+# ----------------------------------------------------------------------------------------------
+
+def build_index(path, capacity, chunk_size=DEFAULT_CHUNK_SIZE, progress=None) -> int:
+    """Builds the index for seeds 1..capacity, resuming from an existing partial file.
+
+    Seeds are computed in chunks with cc.stopping_times, using the part of the index already
+    written as its memo.  The header (seed count and checksums) is rewritten and flushed after
+    every chunk, so an interrupted build resumes from the last completed chunk.
+
+    Args:
+        path (str): Path of the index file, created if it does not exist.
+        capacity (int): Number of seeds the index holds.
+        chunk_size (int, optional): Seeds computed between checkpoints. Defaults to DEFAULT_CHUNK_SIZE.
+        progress (callable, optional): Called with the number of seeds built after every chunk.
+
+    Returns:
+        int: The number of seeds built.
+
+    Raises:
+        IndexCorruptedError: If the existing file is stale or corrupted.
+        ValueError: If the existing file was created with another capacity.
+    """
+
+    _check_platform()
+
+    if not os.path.exists(path):
+        with open(path, 'wb') as f:
+            f.truncate(_file_size(capacity))
+            f.write(HEADER.pack(MAGIC, INDEX_VERSION, 0, capacity, 0, 0, 0))
+
+    with open(path, 'r+b') as f, mmap.mmap(f.fileno(), 0) as mm:
+        file_capacity, built, steps_crc, peaks_crc = _read_header(mm)
+        if file_capacity != capacity:
+            raise ValueError(f"{path} holds {file_capacity} seeds, not {capacity}.")
+
+        steps, peaks = _columns(mm, capacity)
+
+        try:
+            if zlib.crc32(steps[:built]) != steps_crc or zlib.crc32(peaks[:built]) != peaks_crc:
+                raise IndexCorruptedError(f"{path}: checksum mismatch, delete the file to rebuild it.")
+
+            while built < capacity:
+                start = built + 1
+                stop = min(start + chunk_size, capacity + 1)
+
+                chunk_steps, chunk_peaks = cc.stopping_times(start, stop, (steps[:built], peaks[:built]))
+                if not isinstance(chunk_peaks, array):
+                    chunk_peaks = array('Q', (min(p, PEAK_SATURATED) for p in chunk_peaks))
+
+                steps[built:stop - 1] = chunk_steps
+                peaks[built:stop - 1] = chunk_peaks
+                steps_crc = zlib.crc32(steps[built:stop - 1], steps_crc)
+                peaks_crc = zlib.crc32(peaks[built:stop - 1], peaks_crc)
+                built = stop - 1
+
+                # Data first, then the header that declares it
+                mm.flush()
+                HEADER.pack_into(mm, 0, MAGIC, INDEX_VERSION, 0, capacity, built, steps_crc, peaks_crc)
+                mm.flush(0, mmap.PAGESIZE)
+
+                if progress:
+                    progress(built)
+        finally:
+            steps.release()
+            peaks.release()
+
+    return built
+
+# ----------------------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Builds or queries a stopping-time index file.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='Build (or resume building) an index.')
+    build_parser.add_argument('path', help='Path of the index file.')
+    build_parser.add_argument('capacity', type=int, help='Number of seeds to index.')
+    build_parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                              help=f'Seeds per checkpoint. Defaults to {DEFAULT_CHUNK_SIZE}.')
+
+    query_parser = subparsers.add_parser('query', help='Look up seeds in an index.')
+    query_parser.add_argument('path', help='Path of the index file.')
+    query_parser.add_argument('start', type=int, help='First seed.')
+    query_parser.add_argument('stop', type=int, nargs='?', help='One past the last seed. Defaults to start + 1.')
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        begin = timer()
+        built = build_index(args.path, args.capacity, args.chunk_size,
+                            lambda built: print(f'Built {built}/{args.capacity} seeds', end='\r'))
+        print(f'\nBuilt {built} seeds in {timer() - begin:.3f} s.')
+
+    else:
+        with StoppingTimeIndex(args.path) as index:
+            stop = args.stop or args.start + 1
+            steps, peaks = index.query(args.start, stop)
+            with steps, peaks:
+                for n, s, p in zip(range(args.start, stop), steps, peaks):
+                    print(f'{n}: {s} steps, peak {p}')
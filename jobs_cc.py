@@ -0,0 +1,212 @@
+"""Runs Collatz Conjecture computations for huge seeds as background jobs in worker processes."""
+
+import itertools
+import multiprocessing as mp
+import queue
+import threading
+from timeit import default_timer as timer
+import collatz_conjecture as cc
+
+# Default limits of a job manager
+DEFAULT_MAX_JOBS = 4
+DEFAULT_TIMEOUT = 120.0
+
+# Steps between two progress updates of a worker
+PROGRESS_EVERY = 1024
+
+# Job states
+RUNNING = 'running'
+DONE = 'done'
+TIMEOUT = 'timeout'
+FAILED = 'failed'
+
+# ----------------------------------------------------------------------------------------------
+
+class JobLimitError(RuntimeError):
+    """Raised when a job is submitted while the maximum number of jobs are already running."""
+
+# ----------------------------------------------------------------------------------------------
+
+def _run_job(n, progress, results):
+    """Worker process: computes the trajectory of n, publishing its progress along the way.
+
+    The trajectory is encoded as it is computed (see parity_cc.ParityWriter), so the worker never
+    holds the values of a huge trajectory and only sends back its compact encoding.
+
+    Args:
+        n (int): The starting integer for the Collatz sequence.
+        progress (mp.Array): Shared (step, bit length of the current value) of the job.
+        results (mp.Queue): Receives the finished parity_cc.ParityTrajectory, with its plot profile.
+    """
+
+    from parity_cc import ParityWriter
+
+    writer = ParityWriter(n, keep_profile=True)
+
+    for step, value in cc.iter_cc(n):
+        # Only a 3n+1 step goes up
+        writer.add(int(value > n), value)
+        n = value
+
+        if step % PROGRESS_EVERY == 0:
+            progress[0] = step
+            progress[1] = n.bit_length()
+
+    progress[0] = writer.steps
+    progress[1] = 1
+
+    results.put(writer.finish())
+
+# ----------------------------------------------------------------------------------------------
+
+class JobManager:
+    """Starts, tracks and cancels background trajectory computations.
+
+    Each job runs in its own worker process so that it can be cancelled (terminated) at any time.
+    At most max_jobs run at once and each one is terminated after timeout seconds.  The manager is
+    thread-safe; finished results are kept until collected with result() or until they expire.
+    """
+
+    def __init__(self, max_jobs=DEFAULT_MAX_JOBS, timeout=DEFAULT_TIMEOUT):
+        """
+        Args:
+            max_jobs (int, optional): Maximum number of jobs running at once. Defaults to DEFAULT_MAX_JOBS.
+            timeout (float, optional): Seconds before a job is terminated, and before an uncollected
+                result is dropped. Defaults to DEFAULT_TIMEOUT.
+        """
+
+        self.max_jobs = max_jobs
+        self.timeout = timeout
+        # The server is multi-threaded: a forked worker could inherit a lock held by another thread,
+        # so workers are forked from a clean single-threaded server process, or spawned
+        if 'forkserver' in mp.get_all_start_methods():
+            self._context = mp.get_context('forkserver')
+            self._context.set_forkserver_preload(['jobs_cc'])
+        else:
+            self._context = mp.get_context('spawn')
+        self._ids = itertools.count(1)
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, n) -> int:
+        """Starts computing the trajectory of n in a worker process.
+
+        Args:
+            n (int): The starting integer for the Collatz sequence.
+
+        Returns:
+            int: The job id.
+
+        Raises:
+            JobLimitError: If max_jobs jobs are already running.
+        """
+
+        with self._lock:
+            self._reap()
+
+            if sum(job['state'] == RUNNING for job in self._jobs.values()) >= self.max_jobs:
+                raise JobLimitError(f"{self.max_jobs} jobs are already running.")
+
+            progress = self._context.Array('Q', 2, lock=False)
+            results = self._context.Queue(maxsize=1)
+            process = self._context.Process(target=_run_job, args=(n, progress, results), daemon=True)
+            process.start()
+
+            job_id = next(self._ids)
+            self._jobs[job_id] = {'seed': n, 'state': RUNNING, 'process': process, 'progress': progress,
+                                  'results': results, 'result': None, 'started': timer(), 'finished': None,
+                                  'error': None}
+
+        return job_id
+
+    def status(self, job_id) -> dict:
+        """Returns the state and progress of a job.
+
+        Args:
+            job_id (int): The job id.
+
+        Returns:
+            dict: 'seed', 'state' (running, done, timeout or failed), 'step' (steps done so
+                  far), 'bits' (bit length of the current value), 'elapsed' (seconds) and 'error'.
+
+        Raises:
+            KeyError: If the job does not exist (or was collected, cancelled or expired).
+        """
+
+        with self._lock:
+            self._reap()
+            job = self._jobs[job_id]
+
+            return {'seed': job['seed'], 'state': job['state'], 'step': job['progress'][0],
+                    'bits': job['progress'][1] or job['seed'].bit_length(),
+                    'elapsed': (job['finished'] or timer()) - job['started'], 'error': job['error']}
+
+    def result(self, job_id) -> 'ParityTrajectory':
+        """Collects the trajectory of a finished job, removing the job.
+
+        Args:
+            job_id (int): The job id.
+
+        Returns:
+            ParityTrajectory: The encoded trajectory, None if the job is not done (it is then kept).
+
+        Raises:
+            KeyError: If the job does not exist.
+        """
+
+        with self._lock:
+            self._reap()
+            job = self._jobs[job_id]
+
+            if job['state'] != DONE:
+                return None
+
+            del self._jobs[job_id]
+            return job['result']
+
+    def cancel(self, job_id):
+        """Terminates a job (if still running) and removes it.  Unknown ids are ignored."""
+
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+
+        if job is not None and job['state'] == RUNNING:
+            job['process'].terminate()
+            job['process'].join()
+
+    def running(self) -> int:
+        """Returns the number of jobs currently running."""
+
+        with self._lock:
+            self._reap()
+            return sum(job['state'] == RUNNING for job in self._jobs.values())
+
+    def _reap(self):
+        """Collects finished results, terminates timed-out jobs and drops expired ones (lock held)."""
+
+        now = timer()
+
+        for job_id, job in list(self._jobs.items()):
+            expired = now - (job['finished'] or job['started']) > self.timeout
+
+            if job['state'] == RUNNING:
+                # The result must be taken off the queue before the worker can exit
+                try:
+                    job['result'] = job['results'].get_nowait()
+                    job['state'] = DONE
+                    job['finished'] = now
+                    job['process'].join()
+                except queue.Empty:
+                    if expired:
+                        job['process'].terminate()
+                        job['process'].join()
+                        job['state'] = TIMEOUT
+                        job['finished'] = now
+                    elif not job['process'].is_alive() and job['results'].empty():
+                        job['state'] = FAILED
+                        job['error'] = f"Worker exited with code {job['process'].exitcode}."
+                        job['finished'] = now
+
+            # Results (and errors) nobody came back for are dropped after another timeout
+            elif expired:
+                del self._jobs[job_id]
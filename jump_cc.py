@@ -0,0 +1,181 @@
+"""Advances Collatz Conjecture trajectories k steps at a time with precomputed jump tables."""
+
+import argparse
+from array import array
+from functools import lru_cache
+from timeit import default_timer as timer
+import collatz_conjecture as cc
+
+# A table holds 9 bytes per residue, i.e. 9 MiB at the largest k
+DEFAULT_K = 16
+MAX_K = 20
+
+# ----------------------------------------------------------------------------------------------
+
+@lru_cache(maxsize=4)
+def build_jump_table(k=DEFAULT_K) -> tuple:
+    """Builds the jump table for k steps of the shortcut map T(n) = n/2 or (3n+1)/2.
+
+    Writing n = 2^k * a + r with 0 <= r < 2^k, the first k applications of T only depend on r:
+    T^k(n) = 3^c[r] * a + d[r], where c[r] is the number of odd values met on the way.  The
+    table for k is built from the one for k-1, so building it costs O(2^k).  Tables are cached.
+
+    Args:
+        k (int, optional): Number of shortcut steps per jump (1 to MAX_K). Defaults to DEFAULT_K.
+
+    Returns:
+        tuple : (k, odd_counts, addends, powers)
+            - odd_counts : bytearray of c[r] for every residue r.
+            - addends : array('Q') of d[r] for every residue r.
+            - powers : list of 3^c for c in 0..k.
+
+    Raises:
+        ValueError: If k is outside 1 to MAX_K.
+    """
+
+    if not 1 <= k <= MAX_K:
+        raise ValueError(f"Jump size k must be between 1 and {MAX_K}, got {k}.")
+
+    powers = [3**c for c in range(k + 1)]
+    odd_counts = bytearray([0])
+    addends = array('Q', [0])
+
+    for j in range(k):
+        # Residue r + b*2^j reaches 2*3^c*a + (3^c*b + d) after j steps, then takes one more step
+        new_counts = bytearray(2 << j)
+        new_addends = array('Q', bytes(16 << j))
+
+        for b in (0, 1):
+            offset = b << j
+            for r in range(1 << j):
+                c = odd_counts[r]
+                e = powers[c]*b + addends[r]
+                if e & 1:
+                    new_counts[offset + r] = c + 1
+                    new_addends[offset + r] = (3*e + 1) >> 1
+                else:
+                    new_counts[offset + r] = c
+                    new_addends[offset + r] = e >> 1
+
+        odd_counts, addends = new_counts, new_addends
+
+    return k, odd_counts, addends, powers
+
+# ----------------------------------------------------------------------------------------------
+
+def jump_steps(n, k=DEFAULT_K) -> int:
+    """Computes the number of steps for n to reach 1, jumping k shortcut steps at a time.
+
+    A jump of k shortcut steps with c odd values is k + c steps as counted by cc.do_cc.  Jumps are
+    only taken while n >= 2^k, which guarantees the trajectory cannot reach 1 mid-jump.
+
+    Args:
+        n (int): The starting number (must be >= 1).
+        k (int, optional): Number of shortcut steps per jump. Defaults to DEFAULT_K.
+
+    Returns:
+        int: The number of steps, identical to len(cc.do_cc(n)[0]).
+    """
+
+    k, odd_counts, addends, powers = build_jump_table(k)
+    mask = (1 << k) - 1
+    steps = 0
+
+    while n > mask:
+        r = n & mask
+        c = odd_counts[r]
+        n = (n >> k) * powers[c] + addends[r]
+        steps += k + c
+
+    return steps + cc.stopping_time(n)[0]
+
+# ----------------------------------------------------------------------------------------------
+
+def jump_stopping_times(start, stop, k=DEFAULT_K) -> array:
+    """Computes the number of steps for every seed in [start, stop) with jumps and memoization.
+
+    Like cc.stopping_times, each trajectory is followed until it drops below its seed and the
+    already known result of the seed it lands on is reused.  Peak values are not available since
+    the intermediate values of a jump are never computed.
+
+    Args:
+        start (int): The first seed of the range (must be >= 1).
+        stop (int): One past the last seed of the range.
+        k (int, optional): Number of shortcut steps per jump. Defaults to DEFAULT_K.
+
+    Returns:
+        array('I'): Number of steps for each seed, identical to cc.stopping_times(start, stop)[0].
+
+    Raises:
+        ValueError: If start is less than 1.
+    """
+
+    if start < 1:
+        raise ValueError(f"Seeds must be positive integers, got start={start}.")
+
+    k, odd_counts, addends, powers = build_jump_table(k)
+    mask = (1 << k) - 1
+    steps = array('I')
+
+    for n in range(start, stop):
+        x = n
+        s = 0
+
+        while x >= n and x != 1:
+            if x > mask:
+                r = x & mask
+                c = odd_counts[r]
+                x = (x >> k) * powers[c] + addends[r]
+                s += k + c
+            elif x & 1:
+                x = (3*x + 1) >> 1
+                s += 2
+            else:
+                x >>= 1
+                s += 1
+
+        if x < n:
+            s += steps[x - start] if x >= start else jump_steps(x, k)
+
+        steps.append(s)
+
+    return steps
+
+# ----------------------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmarks jump tables against the step-by-step engine.')
+    parser.add_argument('-k', type=int, default=DEFAULT_K, help=f'Shortcut steps per jump. Defaults to {DEFAULT_K}.')
+    parser.add_argument('--digits', type=int, default=500, help='Digits of the big seed. Defaults to 500.')
+    parser.add_argument('--seeds', type=int, default=1000000, help='Seeds in the range scan. Defaults to 1000000.')
+    args = parser.parse_args()
+
+    begin = timer()
+    build_jump_table(args.k)
+    print(f'Table for k={args.k}: {timer() - begin:.3f} s')
+
+    n = 10**(args.digits - 1) + 7
+
+    # Warm up the table of small seeds both paths finish with
+    cc.stopping_time(1)
+
+    begin = timer()
+    expected = cc.stopping_time(n)[0]
+    step_time = timer() - begin
+
+    begin = timer()
+    assert jump_steps(n, args.k) == expected
+    jump_time = timer() - begin
+
+    print(f'{args.digits}-digit seed ({expected} steps): {step_time*1e3:.3f} ms stepping, {jump_time*1e3:.3f} ms jumping')
+
+    begin = timer()
+    expected = cc.stopping_times(1, args.seeds)[0]
+    step_time = timer() - begin
+
+    begin = timer()
+    assert jump_stopping_times(1, args.seeds, args.k) == expected
+    jump_time = timer() - begin
+
+    print(f'Range scan of {args.seeds} seeds: {step_time:.3f} s stepping, {jump_time:.3f} s jumping')
@@ -0,0 +1,294 @@
+"""Low-overhead latency and request metrics for the Dash server, served in the Prometheus text format.
+
+Usage with the Flask server of a Dash app:
+    metrics = Metrics()
+    install(app.server, metrics)
+
+    @app.callback(...)
+    @metrics.callback('my_callback')
+    def my_callback(...):
+        with metrics.timed('compute'):
+            ...
+
+    @metrics.timed('figure')    # timed() also works as a decorator
+    def build(...):
+        ...
+"""
+
+import bisect
+import cProfile
+import functools
+import itertools
+import os
+import threading
+from contextlib import contextmanager
+from timeit import default_timer as timer
+import flask
+from dash.exceptions import PreventUpdate
+
+# Upper bounds (in seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Path of the Dash callback endpoint, whose time outside the callback is mostly JSON serialization
+DASH_UPDATE_PATH = '/_dash-update-component'
+
+PROFILE_HEADER = 'X-CC-Profile'
+
+# ----------------------------------------------------------------------------------------------
+
+class Histogram:
+    """Cumulative latency histogram of one metric, one series per label value."""
+
+    def __init__(self, name, help, label, buckets=DEFAULT_BUCKETS):
+        """
+        Args:
+            name (str): Metric name.
+            help (str): Description of the metric.
+            label (str): Name of the label distinguishing the series.
+            buckets (tuple, optional): Sorted upper bounds of the buckets. Defaults to DEFAULT_BUCKETS.
+        """
+
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, label_value):
+        """Records one observation."""
+
+        i = bisect.bisect_left(self.buckets, value)
+
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                # Per-bucket counts (the last one is +Inf), then the sum
+                series = self._series[label_value] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    def render(self) -> list:
+        """Returns the lines of the metric in the Prometheus text format."""
+
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+
+        for key, values in sorted(series.items()):
+            label = f'{self.label}="{_escape(key)}"'
+            count = 0
+            for bound, n in zip(self.buckets + ('+Inf',), values):
+                count += n
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_sum{{{label}}} {values[-1]}')
+            lines.append(f'{self.name}_count{{{label}}} {count}')
+
+        return lines
+
+# ----------------------------------------------------------------------------------------------
+
+class Counter:
+    """Monotonic counter of one metric, one series per combination of label values."""
+
+    def __init__(self, name, help, labels):
+        """
+        Args:
+            name (str): Metric name.
+            help (str): Description of the metric.
+            labels (tuple): Names of the labels distinguishing the series.
+        """
+
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        """Adds amount to the series of the given label values."""
+
+        with self._lock:
+            self._series[label_values] = self._series.get(label_values, 0) + amount
+
+    def render(self) -> list:
+        """Returns the lines of the metric in the Prometheus text format."""
+
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+
+        with self._lock:
+            series = dict(self._series)
+
+        for key, value in sorted(series.items()):
+            labels = ','.join(f'{label}="{_escape(v)}"' for label, v in zip(self.labels, key))
+            lines.append(f'{self.name}{{{labels}}} {value}')
+
+        return lines
+
+# ----------------------------------------------------------------------------------------------
+
+def _escape(value) -> str:
+    """Escapes a label value for the Prometheus text format."""
+
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+# ----------------------------------------------------------------------------------------------
+
+class Metrics:
+    """The metrics of one server process: callback requests and latencies, and per-stage latencies.
+
+    Gauges that are cheap to read at scrape time (cache size, running jobs...) are not recorded
+    continuously, they are provided by collectors called when /metrics is rendered.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        Args:
+            buckets (tuple, optional): Upper bounds of the latency buckets. Defaults to DEFAULT_BUCKETS.
+        """
+
+        self.requests = Counter('cc_callback_requests_total', 'Dash callback calls by outcome.',
+                                ('callback', 'outcome'))
+        self.callback_seconds = Histogram('cc_callback_seconds', 'Time spent in Dash callbacks.',
+                                          'callback', buckets)
+        self.stage_seconds = Histogram('cc_stage_seconds', 'Time spent in each stage of the hot path.',
+                                       'stage', buckets)
+        self.response_bytes = Counter('cc_response_bytes_total', 'Bytes of JSON sent by Dash callbacks.',
+                                      ('callback',))
+        self._collectors = []
+
+    @contextmanager
+    def timed(self, stage):
+        """Context manager (or decorator) recording the duration of its block under a stage name."""
+
+        start = timer()
+        try:
+            yield
+        finally:
+            self.stage_seconds.observe(timer() - start, stage)
+
+    def callback(self, name):
+        """Decorator counting and timing the calls of a Dash callback.
+
+        Calls ending in PreventUpdate are counted as 'prevented', other exceptions as 'error'.
+        """
+
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                outcome = 'ok'
+                start = timer()
+                try:
+                    return func(*args, **kwargs)
+                except PreventUpdate:
+                    outcome = 'prevented'
+                    raise
+                except Exception:
+                    outcome = 'error'
+                    raise
+                finally:
+                    elapsed = timer() - start
+                    self.callback_seconds.observe(elapsed, name)
+                    self.requests.inc(name, outcome)
+
+                    # Lets the request hooks attribute the rest of the request to serialization
+                    if flask.has_request_context():
+                        flask.g.cc_callback = (name, elapsed)
+
+            return wrapper
+
+        return decorator
+
+    def add_collector(self, collector):
+        """Registers a function returning (name, type, help, value) tuples of gauges or counters read at scrape time."""
+
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Returns every metric in the Prometheus text exposition format."""
+
+        lines = []
+
+        for metric in (self.requests, self.callback_seconds, self.stage_seconds, self.response_bytes):
+            lines += metric.render()
+
+        for collector in self._collectors:
+            for name, kind, help, value in collector():
+                lines += [f'# HELP {name} {help}', f'# TYPE {name} {kind}', f'{name} {value}']
+
+        return '\n'.join(lines) + '\n'
+
+# ----------------------------------------------------------------------------------------------
+
+def install(server, metrics, profile_dir=None, profile_every=0):
+    """Adds the /metrics route and the request hooks (serialization time, profiling) to a Flask server.
+
+    Profiling is off unless profile_dir is set (CC_PROFILE_DIR).  Then a request is profiled with
+    cProfile when it carries the X-CC-Profile header, or one request in profile_every
+    (CC_PROFILE_EVERY) is sampled.  Each profile is dumped to profile_dir as a .prof file, for
+    pstats or snakeviz, and its name is returned in the X-CC-Profile response header.  Only one
+    request is profiled at a time (a second cProfile profiler cannot be enabled while one is active),
+    requests arriving meanwhile are served without profiling.
+
+    Args:
+        server (flask.Flask): The Flask server of the Dash app.
+        metrics (Metrics): The metrics to serve.
+        profile_dir (str, optional): Directory of the profiles. Defaults to CC_PROFILE_DIR or None.
+        profile_every (int, optional): Profile one request in this many. Defaults to CC_PROFILE_EVERY or 0 (never).
+    """
+
+    profile_dir = profile_dir or os.environ.get('CC_PROFILE_DIR')
+    profile_every = profile_every or int(os.environ.get('CC_PROFILE_EVERY', 0))
+    requests = itertools.count(1)
+    profiles = itertools.count(1)
+    profiling = threading.Lock()
+
+    if profile_dir:
+        os.makedirs(profile_dir, exist_ok=True)
+
+    @server.route('/metrics')
+    def serve_metrics():
+        return flask.Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+    @server.before_request
+    def start_request():
+        flask.g.cc_start = timer()
+
+        wanted = profile_dir and (PROFILE_HEADER in flask.request.headers
+                                  or (profile_every and next(requests) % profile_every == 0))
+
+        if wanted and profiling.acquire(blocking=False):
+            flask.g.cc_profiler = cProfile.Profile()
+            try:
+                flask.g.cc_profiler.enable()
+            except ValueError:
+                # Another profiler (not started here) is already active
+                del flask.g.cc_profiler
+                profiling.release()
+
+    @server.after_request
+    def finish_request(response):
+        profiler = flask.g.pop('cc_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            profiling.release()
+            filename = f'{os.getpid()}-{next(profiles)}{flask.request.path.replace("/", "_")}.prof'
+            profiler.dump_stats(os.path.join(profile_dir, filename))
+            response.headers[PROFILE_HEADER] = filename
+
+        callback = flask.g.pop('cc_callback', None)
+        if callback is not None and flask.request.path == DASH_UPDATE_PATH and response.status_code == 200:
+            name, elapsed = callback
+            metrics.stage_seconds.observe(max(timer() - flask.g.get('cc_start', timer()) - elapsed, 0.0), 'serialize')
+            metrics.response_bytes.inc(name, amount=response.calculate_content_length() or 0)
+
+        return response
+
+    @server.teardown_request
+    def stop_profiler(error):
+        # after_request is skipped when a request fails without a response, the profiler is dropped
+        profiler = flask.g.pop('cc_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            profiling.release()
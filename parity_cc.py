@@ -0,0 +1,327 @@
+"""Compact encoding of Collatz Conjecture trajectories: the seed and one parity bit per step.
+
+A trajectory is fully determined by its seed and the rule applied at each step (the parity of the
+value for 3n+1, its residue for a generalized map).  A ParityTrajectory stores only these symbols,
+packed 1 bit per step for 3n+1 (least significant bit first, step i in bit i), plus the value
+every CHECKPOINT_STEPS steps so that any range of steps can be decoded without starting from the
+seed.  Long or big-int trajectories shrink by one to two orders of magnitude compared to their
+values (8 bytes per step, or a Python int per step beyond 64 bits).
+"""
+
+import base64
+import sys
+from array import array
+from timeit import default_timer as timer
+import numpy as np
+import collatz_conjecture as cc
+
+# Steps between two checkpoint values, i.e. the most steps decoded before reaching a requested range
+CHECKPOINT_STEPS = 1 << 12
+
+# ----------------------------------------------------------------------------------------------
+
+def symbol_width(cmap) -> int:
+    """Returns the bits per step of a map: 1 for 3n+1, enough for every residue otherwise."""
+
+    return 1 if cmap is None else max((cmap.modulus - 1).bit_length(), 1)
+
+# ----------------------------------------------------------------------------------------------
+
+class ParityTrajectory:
+    """A trajectory encoded as its seed, the symbols of its steps and periodic checkpoints.
+
+    Attributes:
+        seed (int): The starting integer.
+        steps (int): The number of steps.
+        symbols (bytes): The rule of each step (the residue of the value it is applied to),
+            width bits per step, least significant bit first.
+        width (int): Bits per step.
+        checkpoints (list): The value after every CHECKPOINT_STEPS steps, starting with the seed.
+        peak (int): The largest value of the trajectory, including the seed.
+        cmap (cc.CollatzMap): The generalized map followed, None for 3n+1.
+        outcome (str): cc.CONVERGED, cc.CYCLE or cc.CAPPED, as for cc.MapTrajectory.
+        cycle_length (int): The length of the cycle, 0 unless outcome is cc.CYCLE.
+        processing_time (float): The time taken (in seconds) to compute the sequence.
+        profile (array): Every value of the sequence (seed first) as a float for plotting, inf
+            beyond 1023 bits.  Only kept by background jobs, None otherwise.
+    """
+
+    __slots__ = ('seed', 'steps', 'symbols', 'width', 'checkpoints', 'peak', 'cmap', 'outcome',
+                 'cycle_length', 'processing_time', 'profile')
+
+    def __init__(self, seed, steps, symbols, checkpoints, peak, cmap=None, outcome=cc.CONVERGED,
+                 cycle_length=0, processing_time=0.0, profile=None):
+        self.seed = seed
+        self.steps = steps
+        self.symbols = symbols
+        self.width = symbol_width(cmap)
+        self.checkpoints = checkpoints
+        self.peak = peak
+        self.cmap = cmap
+        self.outcome = outcome
+        self.cycle_length = cycle_length
+        self.processing_time = processing_time
+        self.profile = profile
+
+    def __len__(self):
+        return self.steps
+
+    # Same outcome text as a decoded cc.MapTrajectory
+    describe = cc.MapTrajectory.describe
+
+    @property
+    def nbytes(self) -> int:
+        """The memory used by the encoded trajectory, in bytes."""
+
+        size = sys.getsizeof(self.symbols) + sys.getsizeof(self.checkpoints)
+        size += sum(sys.getsizeof(v) for v in self.checkpoints)
+        if self.profile is not None:
+            size += sys.getsizeof(self.profile)
+
+        return size
+
+    def _symbols(self, start, stop) -> list:
+        """Unpacks the symbols of steps [start, stop)."""
+
+        if stop <= start:
+            return []
+
+        w = self.width
+        first, last = start*w // 8, -(-stop*w // 8)
+        bits = np.unpackbits(np.frombuffer(self.symbols, dtype=np.uint8, count=last - first, offset=first),
+                             bitorder='little')[start*w - first*8:stop*w - first*8]
+
+        if w == 1:
+            return bits.tolist()
+
+        return (bits.reshape(-1, w).astype(np.int64) << np.arange(w)).sum(axis=1).tolist()
+
+    def sequence(self, start=0, stop=None):
+        """Decodes the values of the sequence with indices [start, stop), the seed being index 0.
+
+        Decoding starts from the last checkpoint at or before start, so it costs at most
+        CHECKPOINT_STEPS steps more than the range itself.
+
+        Args:
+            start (int, optional): The first index. Defaults to 0.
+            stop (int, optional): One past the last index. Defaults to steps + 1.
+
+        Returns:
+            array or list: The values, an array('Q') or a list when one exceeds 64 bits.
+        """
+
+        stop = self.steps + 1 if stop is None else min(stop, self.steps + 1)
+        start = max(start, 0)
+        if stop <= start:
+            return array('Q')
+
+        i = start // CHECKPOINT_STEPS * CHECKPOINT_STEPS
+        n = self.checkpoints[i // CHECKPOINT_STEPS]
+        values = [n] if i == start else []
+
+        if self.cmap is None:
+            for odd in self._symbols(i, stop - 1):
+                n = 3*n + 1 if odd else n >> 1
+                i += 1
+                if i >= start:
+                    values.append(n)
+        else:
+            rules = self.cmap.rules
+            for r in self._symbols(i, stop - 1):
+                a, b, d = rules[r]
+                n = (a*n + b) // d
+                i += 1
+                if i >= start:
+                    values.append(n)
+
+        try:
+            return array('Q', values)
+        except OverflowError:
+            return values
+
+    def decode(self, start=0, stop=None):
+        """Decodes the values after steps start + 1 .. stop, i.e. Trajectory.values[start:stop]."""
+
+        return self.sequence(start + 1, self.steps + 1 if stop is None else stop + 1)
+
+    def trajectory(self) -> cc.Trajectory:
+        """Decodes the whole trajectory.
+
+        Returns:
+            cc.Trajectory: The trajectory (a cc.MapTrajectory for a generalized map).
+        """
+
+        values = self.decode()
+
+        if self.cmap is None:
+            return cc.Trajectory(self.seed, values, self.processing_time)
+
+        return cc.MapTrajectory(self.seed, values, self.processing_time, self.cmap, self.outcome, self.cycle_length)
+
+    def to_json(self) -> dict:
+        """Returns the encoding as JSON data for network transfer (without the checkpoints).
+
+        The seed and the base64 symbols are enough to decode the trajectory anywhere.
+        """
+
+        data = {'seed': self.seed, 'steps': self.steps, 'width': self.width,
+                'parity': base64.b64encode(self.symbols).decode('ascii')}
+        if self.cmap is not None:
+            data['map'] = self.cmap.to_meta()
+
+        return data
+
+# ----------------------------------------------------------------------------------------------
+
+def encode(trajectory) -> ParityTrajectory:
+    """Encodes a computed trajectory.
+
+    Args:
+        trajectory (cc.Trajectory): The trajectory, or a cc.MapTrajectory.
+
+    Returns:
+        ParityTrajectory: The encoded trajectory.
+    """
+
+    seed, values = trajectory.seed, trajectory.values
+    cmap = trajectory.cmap if isinstance(trajectory, cc.MapTrajectory) else None
+    modulus = 2 if cmap is None else cmap.modulus
+    width = symbol_width(cmap)
+
+    # Maps can have any number of rules, residues must not wrap around in a too narrow dtype
+    dtype = np.min_scalar_type(modulus - 1)
+
+    # The symbol of a step is the residue of the value it is applied to: the seed, then every value but the last
+    if isinstance(values, array) and seed < 2**64:
+        before = np.concatenate([np.array([seed], dtype=np.uint64), np.frombuffer(values, dtype=np.uint64)[:-1]]) \
+                 if len(values) else np.empty(0, dtype=np.uint64)
+        symbols = (before % np.uint64(modulus)).astype(dtype)
+        peak = max(seed, int(before.max(initial=0)), values[-1] if len(values) else 0)
+    else:
+        before = [seed] + list(values[:-1]) if len(values) else []
+        symbols = np.array([v % modulus for v in before], dtype=dtype)
+        peak = max(seed, max(values, default=0))
+
+    if width > 1:
+        symbols = ((symbols[:, None] >> np.arange(width, dtype=dtype)) & 1).astype(np.uint8).ravel()
+
+    checkpoints = [seed] + list(values[CHECKPOINT_STEPS - 1::CHECKPOINT_STEPS])
+
+    outcome, cycle_length = (trajectory.outcome, trajectory.cycle_length) if cmap is not None else (cc.CONVERGED, 0)
+
+    return ParityTrajectory(seed, len(values), np.packbits(symbols, bitorder='little').tobytes(), checkpoints,
+                            peak, cmap, outcome, cycle_length, trajectory.processing_time)
+
+# ----------------------------------------------------------------------------------------------
+
+class ParityWriter:
+    """Encodes a 3n+1 trajectory one step at a time while it is computed, without keeping its values.
+
+    Usage:
+        writer = ParityWriter(n)
+        while n != 1:
+            odd = n & 1
+            n = 3*n + 1 if odd else n >> 1
+            writer.add(odd, n)
+        encoded = writer.finish()
+    """
+
+    def __init__(self, seed, keep_profile=False):
+        """
+        Args:
+            seed (int): The starting integer.
+            keep_profile (bool, optional): Whether to keep the float values for plotting (see
+                ParityTrajectory.profile). Defaults to False.
+        """
+
+        self.seed = seed
+        self.steps = 0
+        self.peak = seed
+        self.checkpoints = [seed]
+        self.profile = array('d', [_plot_float(seed)]) if keep_profile else None
+        self._symbols = bytearray()
+        self._byte = 0
+        self._start = timer()
+
+    def add(self, odd, value):
+        """Records one step.
+
+        Args:
+            odd (int): 1 if the step was 3n+1, 0 if it was a halving.
+            value (int): The value after the step.
+        """
+
+        self._byte |= odd << (self.steps & 7)
+        self.steps += 1
+
+        if not self.steps & 7:
+            self._symbols.append(self._byte)
+            self._byte = 0
+        if value > self.peak:
+            self.peak = value
+        if not self.steps % CHECKPOINT_STEPS:
+            self.checkpoints.append(value)
+        if self.profile is not None:
+            self.profile.append(_plot_float(value))
+
+    def finish(self) -> ParityTrajectory:
+        """Returns the encoded trajectory, timed from the creation of the writer."""
+
+        symbols = self._symbols + (bytes([self._byte]) if self.steps & 7 else b'')
+
+        return ParityTrajectory(self.seed, self.steps, bytes(symbols), self.checkpoints, self.peak,
+                                processing_time=timer() - self._start, profile=self.profile)
+
+# ----------------------------------------------------------------------------------------------
+
+def _plot_float(value) -> float:
+    """The value as a float for plotting, inf beyond the float range."""
+
+    return float(value) if value.bit_length() <= 1023 else float('inf')
+
+# ----------------------------------------------------------------------------------------------
+
+def compute(n) -> ParityTrajectory:
+    """Computes the 3n+1 trajectory of a seed directly into its encoding, without keeping its values.
+
+    Same encoding as ParityWriter (without a plot profile), with the step loop inlined.
+
+    Args:
+        n (int): The starting integer for the Collatz sequence.
+
+    Returns:
+        ParityTrajectory: The encoded trajectory.
+    """
+
+    seed = n
+    symbols = bytearray()
+    byte = 0
+    steps = 0
+    peak = n
+    checkpoints = [n]
+
+    start = timer()
+
+    while n != 1:
+        if n & 1:
+            n = 3*n + 1
+            byte |= 1 << (steps & 7)
+            # Only 3n+1 steps can reach a new peak
+            if n > peak:
+                peak = n
+        else:
+            n >>= 1
+        steps += 1
+
+        # CHECKPOINT_STEPS is a multiple of 8
+        if not steps & 7:
+            symbols.append(byte)
+            byte = 0
+            if not steps % CHECKPOINT_STEPS:
+                checkpoints.append(n)
+
+    if steps & 7:
+        symbols.append(byte)
+
+    end = timer()
+    return ParityTrajectory(seed, steps, bytes(symbols), checkpoints, peak, processing_time=end - start)
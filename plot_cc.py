@@ -1,9 +1,6 @@
 """Plots the sequence of the Collatz Conjecture"""
 
-import plotly.offline as pyo
-import plotly.graph_objs as go
-import plotly.io as pio
-from plotly.subplots import make_subplots
+from array import array
 import collatz_conjecture as cc
 # from PlotlyHexagonTheme import plotly_hexagon_theme
 
@@ -17,39 +14,261 @@ COLOR_MODE = {'title': ('black', 'white'),
               'range_bgcolor': ('lawngreen', 'navy'),
               'range_border_color': ('black', 'orange')}
 
+# Offline animation limits
+MAX_FRAMES = 200
+FRAME_DURATION_MS = 250
+ANIMATION_MODES = ('player', 'frames')
+
+# Replays the trace of an offline plot: the data is taken out of the figure and appended back
+# {batch} points every {duration} ms, so the page holds every point exactly once
+PLAYER_SCRIPT = """
+var gd = document.getElementById('{plot_id}');
+var x = Array.from(gd.data[0].x);
+var y = Array.from(gd.data[0].y);
+var next = 1;
+
+function playNextBatch() {
+    if (next >= x.length) {
+        return;
+    }
+    var end = Math.min(next + {batch}, x.length);
+    Plotly.extendTraces(gd, {x: [x.slice(next, end)], y: [y.slice(next, end)]}, [0]);
+    next = end;
+    setTimeout(playNextBatch, {duration});
+}
+
+Plotly.restyle(gd, {x: [x.slice(0, 1)], y: [y.slice(0, 1)]}).then(playNextBatch);
+"""
+
+# Level of detail: points sent per trace, and the size of a sequence (before decimation) above
+# which its trace is drawn with WebGL
+MAX_PLOT_POINTS = 4000
+WEBGL_THRESHOLD = 10000
+
+# NumPy and plotly.graph_objs dominate the import time: they are only loaded by the functions that
+# build plots, so that importing this module (e.g. from the CLI) stays cheap
+
+# Axis titles of the distribution metrics
+DISTRIBUTION_LABELS = {'steps': '# Steps', 'peaks': 'Peak value (bits)'}
+
 # ----------------------------------------------------------------------------------------
 
-def plot_line(x, y, processing_time, plot_offline=True, autorange=False, dark_mode=True) -> go.Figure:
+def decimate(x, y, max_points=MAX_PLOT_POINTS, x_range=None) -> tuple:
+    """
+    Reduces a sequence to at most max_points points while keeping its extrema.
+
+    The points are split into max_points/2 buckets and the minimum and maximum of each bucket
+    are kept (in their original order), together with the first and last point.  The peak value
+    is therefore always exact.
+
+    Args:
+        x (array-like): The x values, in increasing order.
+        y (array-like): The y values.
+        max_points (int, optional): Maximum number of points to keep, None to keep every point.
+            Defaults to MAX_PLOT_POINTS.
+        x_range (tuple, optional): (x0, x1) window to crop to before decimating, one point beyond
+            each edge is kept so the line reaches the edges. Defaults to None.
+
+    Returns:
+        tuple: (x, y) NumPy arrays of the kept points.
+    """
+
+    import numpy as np
+
+    x = np.asarray(x)
+    y = np.asarray(y)
+
+    if x_range is not None:
+        first = max(np.searchsorted(x, x_range[0], side='left') - 1, 0)
+        last = min(np.searchsorted(x, x_range[1], side='right') + 1, len(x))
+        x, y = x[first:last], y[first:last]
+
+    if max_points is None or len(x) <= max_points:
+        return x, y
+
+    size = -(-len(y) // max((max_points - 2) // 2, 1))
+    pad = -len(y) % size
+
+    # Padding repeats the last value, argmin/argmax return the first (real) occurrence
+    buckets = np.concatenate([y, np.repeat(y[-1:], pad)]).reshape(-1, size)
+    offsets = np.arange(0, len(y) + pad, size)
+    keep = np.unique(np.concatenate([buckets.argmin(axis=1) + offsets,
+                                     buckets.argmax(axis=1) + offsets,
+                                     [0, len(y) - 1]]))
+
+    return x[keep], y[keep]
+
+# ----------------------------------------------------------------------------------------
+
+def line_trace(x, y, length=None, **kwargs):
+    """
+    Returns a line trace for the given points, drawn with WebGL above WEBGL_THRESHOLD points.
+
+    Args:
+        x (array-like): The x values.
+        y (array-like): The y values.
+        length (int, optional): Number of points of the sequence before it was decimated, which
+            decides the trace type. Defaults to len(x).
+        **kwargs: Other trace properties.
+
+    Returns:
+        go.Scatter or go.Scattergl: The trace.
+    """
+
+    import plotly.graph_objs as go
+
+    trace_type = go.Scattergl if (len(x) if length is None else length) > WEBGL_THRESHOLD else go.Scatter
+
+    return trace_type(x=x, y=y, mode='lines', **kwargs)
+
+# ----------------------------------------------------------------------------------------
+
+def frame_ends(length, max_frames, init=1) -> list:
+    """
+    Returns the number of points shown in each animation frame.
+
+    Args:
+        length (int): Number of points in the sequence.
+        max_frames (int): Maximum number of frames.
+        init (int, optional): Number of points shown before the first frame. Defaults to 1.
+
+    Returns:
+        list: Increasing point counts, ending with length.  One point per frame for short
+              sequences, evenly spaced batches otherwise.
+    """
+
+    if length <= max_frames:
+        return list(range(init, length + 1))
+
+    return [init + (length - init) * i // max_frames for i in range(1, max_frames + 1)]
+
+# ----------------------------------------------------------------------------------------
+
+def add_stats_annotations(fig, processing_time, num_steps):
+    """
+    Shows the processing time and number of steps in the top right corner of a figure.
+
+    Args:
+        fig (go.Figure): The figure to annotate.
+        processing_time (float): The time it took to process the sequence.
+        num_steps (int): The number of steps in the sequence.
+    """
+
+    fig.add_annotation(xref='paper', yref='paper', x=0.9, y=0.9, showarrow=False, text=f'<b>Processing Time:</b> {processing_time*1e6:.3f} us')
+    fig.add_annotation(xref='paper', yref='paper', x=0.9, y=0.8, showarrow=False, text=f'<b>Number Steps:</b> {num_steps}')
+
+# ----------------------------------------------------------------------------------------
+
+def as_plot_data(x, y=None) -> tuple:
+    """
+    Normalizes the data accepted by plot_line into x and y sequences.
+
+    Args:
+        x (list, cc.Trajectory or iterable): List of x values, a compact trajectory, or the
+            output of cc.iter_cc / cc.iter_cc_chunks (with y left as None).
+        y (list, optional): List of y values when x is a list. Defaults to None.
+
+    Returns:
+        tuple: (x, y).  Compact trajectories become NumPy views of their array (no copy), or
+               float arrays when their values exceed 64 bits.
+    """
+
+    if y is not None:
+        return x, y
+
+    if not isinstance(x, cc.Trajectory):
+        x = cc.Trajectory.collect(x)
+
+    import numpy as np
+
+    values = plot_values(x.values)
+
+    return np.arange(1, len(values) + 1), values
+
+# ----------------------------------------------------------------------------------------
+
+def plot_values(values) -> 'np.ndarray':
+    """
+    Converts compact trajectory values to a NumPy array that can be plotted.
+
+    Args:
+        values (array or list): An array('Q') or a list of (possibly big) ints.
+
+    Returns:
+        np.ndarray: A view of the array (no copy), or floats when values exceed 64 bits.
+    """
+
+    import numpy as np
+
+    if isinstance(values, array):
+        return np.frombuffer(values, dtype=np.uint64) if len(values) else np.empty(0, dtype=np.uint64)
+
+    # Values beyond 64 bits can only be drawn as (rounded) floats
+    return np.array([float(v) if v.bit_length() <= 1023 else np.inf for v in values])
+
+# ----------------------------------------------------------------------------------------
+
+def plot_line(x, y, processing_time, plot_offline=True, autorange=False, dark_mode=True,
+              animation='player', max_frames=MAX_FRAMES, frame_duration=FRAME_DURATION_MS,
+              max_points=MAX_PLOT_POINTS, x_range=None, filename='cc.html', title='Collatz Conjecture') -> 'go.Figure':
     """
     Generates a plot of the Collatz Conjecture sequence.
 
     Args:
-        x (list): List of x values.
-        y (list): List of y values.
+        x (list, cc.Trajectory or iterable): List of x values, or a trajectory (see as_plot_data).
+        y (list): List of y values, None when x is a trajectory.
         processing_time (float): The time it took to process the sequence.
         plot_offline (bool, optional): Whether to display the plot offline. Defaults to True.
         autorange (bool, optional): Whether to enable automatic scaling of the y-axis. Defaults to False.
+        dark_mode (bool, optional): Whether the plot is done in dark mode. Defaults to True.
+        animation (str, optional): Offline animation mode. Defaults to 'player'.
+            - 'player': the trace is written once and a script in the page appends it in batches.
+            - 'frames': Plotly animation frames behind a "Play" button.
+        max_frames (int, optional): Maximum number of animation frames, longer sequences are
+            animated several points per frame. Defaults to MAX_FRAMES.
+        frame_duration (int, optional): Time between frames in milliseconds. Defaults to FRAME_DURATION_MS.
+        max_points (int, optional): Maximum number of points sent to the plot (see decimate),
+            None to send every point. Defaults to MAX_PLOT_POINTS.
+        x_range (tuple, optional): (x0, x1) step window to crop to, e.g. a zoom.  The window is
+            decimated to max_points like a whole sequence. Defaults to None.
+        filename (str, optional): HTML file written (and opened) in offline mode, None to only
+            build the figure. Defaults to 'cc.html'.
+        title (str, optional): The title of the plot, e.g. naming a generalized map. Defaults to 'Collatz Conjecture'.
 
     Returns:
         go.Figure: A figure object representing the plot.
 
     Raises:
-        None
+        ValueError: If animation is not one of ANIMATION_MODES.
 
     """
 
-    if not x or not y:
+    if animation not in ANIMATION_MODES:
+        raise ValueError(f"Unknown animation mode {animation!r}, choose from {', '.join(ANIMATION_MODES)}.")
+
+    import plotly.graph_objs as go
+
+    x, y = as_plot_data(x, y)
+
+    if len(x) == 0 or len(y) == 0:
         return None
-    
+
+    num_steps = len(x)
+
+    # The trace type follows the size of the (cropped) sequence, before decimation hides it
+    x, y = decimate(x, y, None, x_range)
+    length = len(x)
+    x, y = decimate(x, y, max_points)
+
     # Plot layout
-    layout = go.Layout(title={'text': f'Collatz Conjecture',
+    layout = go.Layout(title={'text': title,
                'x': 0.5,
                'y': 0.95,
                'xanchor': 'center',
                'yanchor': 'top'},
                xaxis_title={'text': "Step #"},
                yaxis_title={'text': "Value"},
-               yaxis=dict(range=[0, max(y)], autorange=autorange),
+               yaxis=dict(range=[0, y.max()], autorange=autorange),
                font=dict(
                          size=20,
                          color=COLOR_MODE['title'][dark_mode]
@@ -59,27 +278,29 @@ def plot_line(x, y, processing_time, plot_offline=True, autorange=False, dark_mo
                 )
 
     # Offline plotting animation
-    if plot_offline:
+    if plot_offline and animation == 'player':
+        # The whole trace is written to the page once and replayed by PLAYER_SCRIPT
+        traces = line_trace(x, y, length, name='CC', connectgaps=True)
+        fig = go.Figure(data=traces, layout=layout)
+        add_stats_annotations(fig, processing_time, num_steps)
+
+    elif plot_offline:
         init = 1
         traces = go.Scatter(x=x[:init], y=y[:init], mode='lines', name='CC', connectgaps=True)
         fig = go.Figure(data=traces, layout=layout)
+        add_stats_annotations(fig, processing_time, num_steps)
 
-        # Show processing time and steps
-        fig.add_annotation(xref='paper', yref='paper', x=0.9, y=0.9, showarrow=False, text=f'<b>Processing Time:</b> {processing_time*1e6:.3f} us')
-        fig.add_annotation(xref='paper', yref='paper', x=0.9, y=0.8, showarrow=False, text=f'<b>Number Steps:</b> {len(x)}')
-
-        # Animate plotting
-        fig.update(frames=[go.Frame(data=[go.Scatter(x=x[:k], y=y[:k])]) for k in range(init, len(x)+1)])
+        # Animate plotting, with at most max_frames frames
+        fig.update(frames=[go.Frame(data=[go.Scatter(x=x[:k], y=y[:k])]) for k in frame_ends(len(x), max_frames, init)])
 
         # Add "play" button to start animation
-        # TODO: Control animation speed on page load, not with "play" button
         fig.update_layout(
         updatemenus=[
             dict(
                 buttons=list([
                     dict(label="Play",
                             method="animate",
-                        args=[None, {"frame": {"duration": 250},
+                        args=[None, {"frame": {"duration": frame_duration},
                                      "fromcurrent": True,
                                      "transition": {"duration": 0}
                                     }
@@ -92,16 +313,13 @@ def plot_line(x, y, processing_time, plot_offline=True, autorange=False, dark_mo
     )
 
         # In milliseconds
-        fig.layout.updatemenus[0].buttons[0].args[1]["frame"]["duration"] = 250
         fig.layout.updatemenus[0].buttons[0].args[1]["frame"]["transition"] = 100
 
     # Dash server plotting, just return the plot without animation 
     # (animation will be done by a clientside callback in dash)
     else:
-        traces = go.Scatter(x=x, y=y, mode='lines', name='CC', connectgaps=True)
+        traces = line_trace(x, y, length, name='CC', connectgaps=True)
         fig = go.Figure(data=traces, layout=layout)
-        fig.data[0]['x'] = []
-        fig.data[0]['y'] = []
 
     fig.update_xaxes(showgrid=False, gridwidth=5, gridcolor='White', showspikes=True,
                      spikecolor=COLOR_MODE['spikecolor'][dark_mode], spikesnap="cursor", spikemode="across",
@@ -117,17 +335,129 @@ def plot_line(x, y, processing_time, plot_offline=True, autorange=False, dark_mo
                      spikecolor=COLOR_MODE['spikecolor'][dark_mode], spikethickness=2)
 
 
-    if plot_offline:
-        pyo.plot(fig, filename='cc.html')
+    # Writing HTML needs plotly.offline/plotly.io, which are slow to import: only load them here
+    if plot_offline and filename and animation == 'player':
+        import plotly.io as pio
+        batch = -(-len(x) // max_frames)
+        post_script = PLAYER_SCRIPT.replace('{batch}', str(batch)).replace('{duration}', str(frame_duration))
+        pio.write_html(fig, file=filename, post_script=post_script, auto_open=True)
+    elif plot_offline and filename:
+        import plotly.offline as pyo
+        pyo.plot(fig, filename=filename)
+
+    return fig
+
+# ----------------------------------------------------------------------------------------
+
+def plot_overlay(merged, dark_mode=True, max_points=MAX_PLOT_POINTS) -> 'go.Figure':
+    """
+    Generates a plot of several Collatz Conjecture sequences overlaid against their steps to 1.
+
+    With the steps left to reach 1 on the x-axis, trajectories that have merged coincide, so
+    each segment of the merge tree is drawn once, in the trace of the seed that reached it
+    first, joined to the segment it runs into.
+
+    Args:
+        merged (cc.MergedTrajectories): The merged trajectories (see cc.merge_trajectories).
+        dark_mode (bool, optional): Whether the plot is done in dark mode. Defaults to True.
+        max_points (int, optional): Maximum number of points per trace (see decimate). Defaults to MAX_PLOT_POINTS.
+
+    Returns:
+        go.Figure: A figure object representing the plot.
+    """
+
+    import numpy as np
+    import plotly.graph_objs as go
+
+    traces = []
+
+    for i, seed in enumerate(merged.seeds):
+        segment = merged.segments[i]
+        join = merged.joins[i]
+
+        # A seed met by an earlier trajectory is only marked on it
+        if not segment:
+            traces.append(go.Scatter(x=[merged.steps[i]], y=plot_values([seed]), mode='markers', name=str(seed)))
+            continue
+
+        # The segment ends on the value it joins, so the lines connect
+        values = plot_values(segment)
+        if join is not None:
+            values = np.append(values, plot_values(merged.segments[join[0]][join[1]:join[1] + 1]))
+
+        positions, decimated = decimate(np.arange(len(values)), values, max_points)
+        traces.append(line_trace(merged.steps[i] - positions, decimated, len(values), name=str(seed)))
+
+    layout = go.Layout(title={'text': 'Collatz Conjecture overlay', 'x': 0.5, 'y': 0.95,
+                              'xanchor': 'center', 'yanchor': 'top'},
+                       xaxis_title={'text': 'Steps to 1'},
+                       yaxis_title={'text': 'Value'},
+                       xaxis=dict(autorange='reversed'),
+                       font=dict(size=20, color=COLOR_MODE['title'][dark_mode]),
+                       paper_bgcolor=COLOR_MODE['paper_bgcolor'][dark_mode],
+                       plot_bgcolor=COLOR_MODE['plot_bgcolor'][dark_mode],
+                       hovermode='closest')
+
+    fig = go.Figure(data=traces, layout=layout)
+    add_stats_annotations(fig, merged.processing_time, sum(merged.steps))
+
+    fig.update_xaxes(showgrid=False, showspikes=True, spikecolor=COLOR_MODE['spikecolor'][dark_mode],
+                     spikesnap="cursor", spikemode="across", spikethickness=2)
+    fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='White')
 
     return fig
 
+# ----------------------------------------------------------------------------------------
+
+def plot_distribution(query, metric, dark_mode=True) -> tuple:
+    """
+    Generates the heatmap and histogram of a precomputed distribution (see tiles_cc).
+
+    Args:
+        query (dict): The result of tiles_cc.DistributionTiles.query.
+        metric (str): 'steps' or 'peaks'.
+        dark_mode (bool, optional): Whether the plot is done in dark mode. Defaults to True.
+
+    Returns:
+        tuple: (heatmap, histogram) figures.  The heatmap shows the counts of each bin (y) per
+               row of seeds (x), the histogram the counts of the whole range.
+    """
+
+    import numpy as np
+    import plotly.graph_objs as go
+
+    label = DISTRIBUTION_LABELS[metric]
+    seeds = query['seeds']
+    counts = query['counts']
+
+    # Empty top bins are left out
+    used = np.flatnonzero(query['histogram'])
+    top = used[-1] + 1 if len(used) else 1
+    bins = query['bins'][:top]
+
+    layout = dict(font=dict(size=16, color=COLOR_MODE['title'][dark_mode]),
+                  paper_bgcolor=COLOR_MODE['paper_bgcolor'][dark_mode],
+                  plot_bgcolor=COLOR_MODE['plot_bgcolor'][dark_mode])
+
+    heatmap = go.Figure(go.Heatmap(x=seeds, y=bins, z=counts[:, :top].T, colorscale='Viridis',
+                                   colorbar={'title': {'text': 'Seeds'}},
+                                   hovertemplate=f'Seeds from %{{x}}<br>{label} %{{y}}<br>%{{z}} seeds<extra></extra>'))
+    heatmap.update_layout(title={'text': f'{label} by seed ({query["block"]:,} seeds per column)', 'x': 0.5},
+                          xaxis_title={'text': 'Starting number'}, yaxis_title={'text': label}, **layout)
+
+    histogram = go.Figure(go.Bar(x=bins, y=query['histogram'][:top], marker_color='orange',
+                                 hovertemplate=f'{label} %{{x}}<br>%{{y}} seeds<extra></extra>'))
+    histogram.update_layout(title={'text': f'{label} of seeds {seeds[0]:,} to {query["stop"] - 1:,}', 'x': 0.5},
+                            xaxis_title={'text': label}, yaxis_title={'text': 'Seeds'}, bargap=0, **layout)
+
+    return heatmap, histogram
+
 # ----------------------------------------------------------------------------------------------
 
 if __name__ == '__main__':
 
     n = cc.get_number()
     n = cc.check_number(n)
-    step_num, conjecture, processing_time = cc.do_cc(n)
+    trajectory = cc.do_cc_compact(n)
 
-    plot_line(step_num, conjecture, processing_time)
\ No newline at end of file
+    plot_line(trajectory, None, trajectory.processing_time)
\ No newline at end of file
@@ -0,0 +1,121 @@
+"""Tests of the memory-bounded LRU cache (python -m pytest)."""
+
+import threading
+import pytest
+import collatz_conjecture as cc
+import cache_cc
+
+# ----------------------------------------------------------------------------------------------
+
+def _cache(max_bytes) -> cache_cc.LRUCache:
+    """A cache where every value weighs its length."""
+
+    return cache_cc.LRUCache(max_bytes, sizeof=len)
+
+# ----------------------------------------------------------------------------------------------
+
+def test_evicts_least_recently_used():
+    cache = _cache(10)
+    cache.put('a', 'xxx')
+    cache.put('b', 'xxx')
+    cache.put('c', 'xxx')
+
+    assert cache.get('a') == 'xxx'      # b is now the least recently used
+    cache.put('d', 'xxx')
+
+    assert 'b' not in cache
+    assert all(key in cache for key in 'acd')
+    assert cache.stats()['bytes'] == 9
+    assert cache.evictions == 1
+
+# ----------------------------------------------------------------------------------------------
+
+def test_stays_within_byte_budget():
+    cache = _cache(100)
+
+    for i in range(1, 200):
+        cache.put(i, 'x' * (i % 37))
+        assert cache.stats()['bytes'] <= 100
+
+    stats = cache.stats()
+    assert stats['bytes'] == sum(len(cache.get(key)) for key in range(1, 200) if key in cache)
+    assert stats['entries'] + stats['evictions'] == 199
+
+# ----------------------------------------------------------------------------------------------
+
+def test_replacing_an_entry_updates_its_size():
+    cache = _cache(10)
+    cache.put('a', 'xxxxxx')
+    cache.put('a', 'xx')
+    cache.put('b', 'xxxxxxxx')
+
+    assert cache.stats()['bytes'] == 10
+    assert cache.get('a') == 'xx'
+    assert cache.evictions == 0
+
+# ----------------------------------------------------------------------------------------------
+
+def test_value_over_budget_is_not_cached():
+    cache = _cache(10)
+    cache.put('a', 'xxx')
+    cache.put('b', 'x' * 11)
+
+    assert 'b' not in cache
+    assert cache.get('a') == 'xxx'
+    assert cache.stats()['bytes'] == 3
+
+# ----------------------------------------------------------------------------------------------
+
+def test_get_or_compute():
+    cache = _cache(100)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return 'value'
+
+    assert cache.get_or_compute('key', compute) == 'value'
+    assert cache.get_or_compute('key', compute) == 'value'
+
+    stats = cache.stats()
+    assert len(calls) == 1
+    assert (stats['hits'], stats['misses'], stats['hit_rate']) == (1, 1, 0.5)
+
+    cache.clear()
+    assert cache.get_or_compute('key', compute) == 'value'
+    assert len(calls) == 2
+
+# ----------------------------------------------------------------------------------------------
+
+def test_threads_share_one_cache():
+    cache = _cache(1000)
+
+    def worker(offset):
+        for i in range(2000):
+            cache.get_or_compute((offset + i) % 300, lambda: 'x' * 7)
+
+    threads = [threading.Thread(target=worker, args=(k*50,)) for k in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = cache.stats()
+    assert stats['bytes'] == 7*stats['entries'] <= 1000
+    assert stats['hits'] + stats['misses'] == 8*2000
+
+# ----------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize('seed', [27, 2**200 + 1], ids=['array', 'big ints'])
+def test_trajectory_sizes_are_bounded(seed):
+    trajectory = cc.do_cc_compact(seed)
+    size = cache_cc.estimate_size(trajectory)
+
+    cache = cache_cc.LRUCache(3*size)
+    for n in range(seed, seed + 10):
+        cache.put(n, cc.do_cc_compact(n))
+
+    cached = [cache.get(n) for n in range(seed, seed + 10) if n in cache]
+    assert size >= len(trajectory)
+    assert cache.evictions > 0
+    assert cache.stats()['bytes'] == sum(map(cache_cc.estimate_size, cached)) <= cache.max_bytes
@@ -0,0 +1,153 @@
+"""Tests of the range scans, record searches and generalized maps (python -m pytest)."""
+
+import json
+import pytest
+import collatz_conjecture as cc
+
+RECORDS_STOP = 10**5
+
+# ----------------------------------------------------------------------------------------------
+
+def _brute_force_records(start, stop) -> tuple:
+    """The delay and path records of [start, stop), from the stats of every seed."""
+
+    steps, peaks = cc.stopping_times(start, stop)
+    delay_records, path_records = [], []
+    max_steps, max_peak = -1, 0
+
+    for n, s, p in zip(range(start, stop), steps, peaks):
+        if s > max_steps:
+            max_steps = s
+            delay_records.append([n, s])
+        if p > max_peak:
+            max_peak = p
+            path_records.append([n, p])
+
+    return delay_records, path_records
+
+# ----------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize('start, stop, memo_limit', [(1, RECORDS_STOP, cc.RECORDS_MEMO_LIMIT),
+                                                     (1, RECORDS_STOP, 1000),
+                                                     (1000, RECORDS_STOP, 1000),
+                                                     (77031, RECORDS_STOP, 2)],
+                         ids=['memo', 'small memo', 'from 1000', 'from 77031'])
+def test_find_records_matches_brute_force(start, stop, memo_limit):
+    delay_records, path_records = _brute_force_records(start, stop)
+
+    records = cc.find_records(start, stop, memo_limit=memo_limit)
+
+    assert records['next'] == stop
+    assert records['delay_records'] == delay_records
+    assert records['path_records'] == path_records
+    assert records['computed'] + records['sieved'] == stop - start
+
+# ----------------------------------------------------------------------------------------------
+
+def test_find_records_resumes_from_checkpoint(tmp_path, monkeypatch):
+    monkeypatch.setattr(cc, 'RECORDS_BLOCK_SIZE', 4096)
+    checkpoint = str(tmp_path / 'records.json')
+    expected = cc.find_records(1, RECORDS_STOP)
+
+    blocks = []
+    def interrupt(state):
+        blocks.append(state['next'])
+        if len(blocks) == 5:
+            raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        cc.find_records(1, RECORDS_STOP, checkpoint, progress=interrupt)
+
+    with open(checkpoint) as f:
+        state = json.load(f)
+    assert state['next'] == blocks[-1] < RECORDS_STOP
+
+    records = cc.find_records(1, RECORDS_STOP, checkpoint)
+
+    assert records['next'] == RECORDS_STOP
+    assert records['delay_records'] == expected['delay_records']
+    assert records['path_records'] == expected['path_records']
+    assert records['computed'] + records['sieved'] == RECORDS_STOP - 1
+
+    with pytest.raises(ValueError):
+        cc.find_records(1, RECORDS_STOP + 1, checkpoint)
+
+# ----------------------------------------------------------------------------------------------
+
+SCAN_KEYS = ('start', 'stop', 'total_steps', 'max_steps', 'max_steps_seed', 'max_peak', 'max_peak_seed',
+             'unresolved')
+
+@pytest.mark.parametrize('start, stop', [(1, 20000),
+                                         (12345, 40000),
+                                         (cc.LOW_MEMO_LIMIT - 3000, cc.LOW_MEMO_LIMIT + 5000),
+                                         (2**64 - 2000, 2**64 + 2000)],
+                         ids=['from 1', 'from 12345', 'across LOW_MEMO_LIMIT', 'across 2^64'])
+@pytest.mark.parametrize('workers, chunk_size', [(1, 777), (2, 1000), (4, 333)], ids=['1 worker', '2 workers', '4 workers'])
+def test_scan_range_workers_match(start, stop, workers, chunk_size):
+    expected = cc.scan_range(start, stop, workers=1, keep_arrays=True)
+
+    summary = cc.scan_range(start, stop, workers, chunk_size, keep_arrays=True)
+
+    for key in SCAN_KEYS:
+        assert summary[key] == expected[key]
+    assert list(summary['steps']) == list(expected['steps'])
+    assert list(summary['peaks']) == list(expected['peaks'])
+
+# ----------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize('spec', ['', 'n^2', '3n+', '1,0,2; 3,1', '1,0,2; x,1,1', '1,0,3; 3,1,1',
+                                  '0,1,1; 3,1,1', '1,0,2; 3,1,0', '1,-2,1; 3,1,1'],
+                         ids=['empty', 'not a map', 'no constant', 'short rule', 'not a number',
+                              'not divisible', 'zero a', 'zero d', 'not positive'])
+def test_invalid_map_raises(spec):
+    with pytest.raises(ValueError):
+        cc.CollatzMap.parse(spec)
+
+def test_invalid_step_cap_raises():
+    with pytest.raises(ValueError):
+        cc.CollatzMap.parse('5n+1', max_steps=0)
+
+# ----------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize('spec, seed, cycle', [('5n+1', 13, [66, 33, 166, 83, 416, 208, 104, 52, 26, 13]),
+                                               ('3n-1', 5, [14, 7, 20, 10, 5]),
+                                               ('3n-1', 10, [5, 14, 7, 20, 10])],
+                         ids=['5n+1 from 13', '3n-1 from 5', '3n-1 from 10'])
+def test_map_cycle(spec, seed, cycle):
+    cmap = cc.CollatzMap.parse(spec)
+
+    trajectory = cc.map_trajectory(seed, cmap)
+
+    assert trajectory.outcome == cc.CYCLE
+    assert trajectory.cycle_length == len(cycle)
+    assert list(trajectory.values) == cycle
+    assert cc.map_stopping_time(seed, cmap) == (cc.UNRESOLVED, max(cycle))
+
+# ----------------------------------------------------------------------------------------------
+
+def test_map_capped_divergence():
+    # 7 is believed to diverge under 5n+1
+    cmap = cc.CollatzMap.parse('5n+1', max_steps=500)
+
+    trajectory = cc.map_trajectory(7, cmap)
+
+    assert trajectory.outcome == cc.CAPPED
+    assert len(trajectory) == 500
+    assert cc.map_stopping_time(7, cmap)[0] == cc.UNRESOLVED
+    assert cc.map_stopping_time(7, cmap, max_steps=5000)[0] == cc.UNRESOLVED
+
+# ----------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize('spec', ['5n+1', '3n-1', '1,0,3; 4,2,3; 4,1,3'], ids=['5n+1', '3n-1', 'mod 3'])
+def test_map_scan_matches_stopping_time(spec):
+    cmap = cc.CollatzMap.parse(spec, max_steps=300)
+    expected = [cc.map_stopping_time(n, cmap) for n in range(1, 1000)]
+
+    summary = cc.scan_range(1, 1000, keep_arrays=True, cmap=cmap)
+
+    # The peak of an unresolved seed depends on where its trajectory was stopped, so only the
+    # peaks of the seeds reaching 1 are compared
+    assert list(summary['steps']) == [s for s, _ in expected]
+    assert [p for p, (s, _) in zip(summary['peaks'], expected) if s != cc.UNRESOLVED] == \
+           [p for s, p in expected if s != cc.UNRESOLVED]
+    assert summary['unresolved'] == sum(s == cc.UNRESOLVED for s, _ in expected)
@@ -0,0 +1,67 @@
+"""Tests of the stopping-time index and of its readers (python -m pytest)."""
+
+import pytest
+import collatz_conjecture as cc
+import index_cc
+
+INDEX_SEEDS = 50000
+
+# ----------------------------------------------------------------------------------------------
+
+@pytest.fixture(scope='module')
+def index_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('index') / 'cc.idx')
+    index_cc.build_index(path, INDEX_SEEDS, chunk_size=12345)
+    return path
+
+# ----------------------------------------------------------------------------------------------
+
+def test_build_matches_stopping_times(index_path):
+    steps, peaks = cc.stopping_times(1, INDEX_SEEDS + 1)
+
+    with index_cc.StoppingTimeIndex(index_path) as index:
+        assert index.built == INDEX_SEEDS
+        assert index.lookup(27) == (111, 9232)
+
+        index_steps, index_peaks = index.query(1, INDEX_SEEDS + 1)
+        with index_steps, index_peaks:
+            assert list(index_steps) == list(steps)
+            assert list(index_peaks) == list(peaks)
+
+# ----------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize('start, stop, workers, chunk_size', [(1, 40000, 1, None), (1, 120000, 1, None),
+                                                              (30000, 90000, 1, 7000), (60000, 90000, 1, None),
+                                                              (20000, 80000, 2, 9000)])
+def test_scan_range_with_index(index_path, start, stop, workers, chunk_size):
+    expected = cc.scan_range(start, stop, keep_arrays=True)
+
+    with index_cc.open_known(index_path) as known:
+        summary = cc.scan_range(start, stop, workers, chunk_size, keep_arrays=True, known=known)
+
+    for key in ('max_steps', 'max_steps_seed', 'max_peak', 'max_peak_seed', 'total_steps', 'steps', 'peaks'):
+        assert summary[key] == expected[key]
+
+# ----------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize('start, stop', [(1, 30000), (1, 120000), (49990, 50010), (70000, 80000)])
+def test_iter_stopping_times_with_index(index_path, start, stop):
+    steps, peaks = cc.stopping_times(start, stop)
+
+    with index_cc.open_known(index_path) as known:
+        chunks = list(cc.iter_stopping_times(start, stop, 8192, known))
+
+    assert chunks[0][0] == start
+    assert [s for _, chunk, _ in chunks for s in chunk] == list(steps)
+    assert [p for _, _, chunk in chunks for p in chunk] == list(peaks)
+
+# ----------------------------------------------------------------------------------------------
+
+def test_find_records_with_index(index_path):
+    expected = cc.find_records(1, 100000, memo_limit=1000)
+
+    with index_cc.open_known(index_path) as known:
+        records = cc.find_records(1, 100000, memo_limit=1000, known=known)
+
+    assert records['delay_records'] == expected['delay_records']
+    assert records['path_records'] == expected['path_records']
@@ -0,0 +1,95 @@
+"""Tests of the background jobs of huge seeds, run in real worker processes (python -m pytest)."""
+
+import time
+import pytest
+import collatz_conjecture as cc
+import jobs_cc
+
+# Runs for minutes, so it is still running when cancelled or timed out
+LONG_SEED = 2**200000 - 1
+
+# ----------------------------------------------------------------------------------------------
+
+@pytest.fixture
+def manager():
+    manager = jobs_cc.JobManager(max_jobs=2, timeout=2.0)
+    yield manager
+
+    for job_id in list(manager._jobs):
+        manager.cancel(job_id)
+
+# ----------------------------------------------------------------------------------------------
+
+def _wait(manager, job_id, seconds=20.0) -> dict:
+    """Polls a job until it is no longer running, returns its status."""
+
+    deadline = time.monotonic() + seconds
+    while True:
+        status = manager.status(job_id)
+        if status['state'] != jobs_cc.RUNNING or time.monotonic() > deadline:
+            return status
+        time.sleep(0.05)
+
+# ----------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize('seed', [27, 2**5000 + 1], ids=['27', 'big seed'])
+def test_job_result(manager, seed):
+    job_id = manager.submit(seed)
+
+    status = _wait(manager, job_id)
+    trajectory = manager.result(job_id)
+    expected = cc.do_cc_compact(seed)
+
+    assert status['state'] == jobs_cc.DONE
+    assert status['step'] == len(expected)
+    assert len(trajectory) == len(expected)
+    assert trajectory.peak == max(seed, max(expected.values))
+    assert list(trajectory.decode()) == list(expected.values)
+
+    with pytest.raises(KeyError):
+        manager.status(job_id)
+
+# ----------------------------------------------------------------------------------------------
+
+def test_job_limit(manager):
+    first = manager.submit(LONG_SEED)
+    manager.submit(LONG_SEED)
+
+    with pytest.raises(jobs_cc.JobLimitError):
+        manager.submit(27)
+
+    manager.cancel(first)
+    assert manager.running() == 1
+
+    job_id = manager.submit(27)
+    assert _wait(manager, job_id)['state'] == jobs_cc.DONE
+
+# ----------------------------------------------------------------------------------------------
+
+def test_job_cancel(manager):
+    job_id = manager.submit(LONG_SEED)
+    process = manager._jobs[job_id]['process']
+
+    assert manager.result(job_id) is None
+    manager.cancel(job_id)
+
+    assert not process.is_alive()
+    assert manager.running() == 0
+    with pytest.raises(KeyError):
+        manager.status(job_id)
+
+    manager.cancel(job_id)      # unknown ids are ignored
+
+# ----------------------------------------------------------------------------------------------
+
+def test_job_timeout(manager):
+    job_id = manager.submit(LONG_SEED)
+    process = manager._jobs[job_id]['process']
+
+    status = _wait(manager, job_id)
+
+    assert status['state'] == jobs_cc.TIMEOUT
+    assert status['elapsed'] >= manager.timeout
+    assert not process.is_alive()
+    assert manager.result(job_id) is None
+    assert manager.running() == 0
@@ -0,0 +1,61 @@
+"""Round-trip tests of the parity encoding of trajectories (python -m pytest)."""
+
+import pytest
+import collatz_conjecture as cc
+import parity_cc
+
+STEP = parity_cc.CHECKPOINT_STEPS
+
+# n -> (n - r)/300 + r for n = r mod 300: residues above 255, 9 bits per step
+MOD_300 = '; '.join(f'1,{299*r},300' for r in range(300))
+
+CASES = [(27, None),
+         (2**64 + 1, None),
+         (2**9000 + 7, None),
+         (7, '1,0,3; 4,-1,3; 4,1,3'),
+         (27, '1,0,2; 5,1,2'),
+         (300**6 - 1, MOD_300)]
+CASE_IDS = ['3n+1', 'big seed', 'long', 'mod 3', '5n+1 halved', 'mod 300']
+
+# ----------------------------------------------------------------------------------------------
+
+def _trajectory(seed, spec):
+    """The trajectory of a case, as computed without encoding."""
+
+    return cc.do_cc_compact(seed) if spec is None else cc.map_trajectory(seed, cc.CollatzMap.parse(spec))
+
+# ----------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize('seed, spec', CASES, ids=CASE_IDS)
+def test_decode(seed, spec):
+    trajectory = _trajectory(seed, spec)
+    encoded = parity_cc.encode(trajectory)
+
+    assert len(encoded) == len(trajectory)
+    assert list(encoded.decode()) == list(trajectory.values)
+    assert encoded.peak == max([seed] + list(trajectory.values))
+
+# ----------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize('seed, spec', CASES, ids=CASE_IDS)
+def test_sequence_across_checkpoints(seed, spec):
+    trajectory = _trajectory(seed, spec)
+    encoded = parity_cc.encode(trajectory)
+    sequence = [seed] + list(trajectory.values)
+
+    ranges = [(0, len(sequence)), (0, 1), (len(sequence) - 1, len(sequence) + 5)]
+    for edge in range(STEP, len(sequence), STEP):
+        ranges += [(edge - 1, edge + 1), (edge, edge + 1), (edge - 5, edge), (edge + 1, edge + STEP + 3)]
+
+    for start, stop in ranges:
+        assert list(encoded.sequence(start, stop)) == sequence[start:stop]
+
+# ----------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize('seed', [27, 2**64 + 1, 2**9000 + 7])
+def test_compute_matches_encode(seed):
+    computed = parity_cc.compute(seed)
+    encoded = parity_cc.encode(cc.do_cc_compact(seed))
+
+    assert (computed.steps, computed.symbols, computed.checkpoints, computed.peak) == \
+           (encoded.steps, encoded.symbols, encoded.checkpoints, encoded.peak)
@@ -0,0 +1,83 @@
+"""Tests of the distribution tiles against the stopping times they summarize (python -m pytest)."""
+
+import numpy as np
+import pytest
+import collatz_conjecture as cc
+import tiles_cc
+
+# Not a whole number of blocks, so the last row of every level is partial
+CAPACITY = 50*tiles_cc.BASE_BLOCK + 123
+
+# ----------------------------------------------------------------------------------------------
+
+@pytest.fixture(scope='module')
+def stats():
+    steps, peaks = cc.stopping_times(1, CAPACITY + 1)
+    step_bins = np.minimum(np.array(steps, dtype=np.int64) // tiles_cc.STEP_BIN, tiles_cc.STEP_BINS - 1)
+    peak_bins = np.minimum([p.bit_length() for p in peaks], tiles_cc.PEAK_BINS - 1)
+
+    return {'steps': (step_bins, tiles_cc.STEP_BINS), 'peaks': (peak_bins, tiles_cc.PEAK_BINS)}
+
+# ----------------------------------------------------------------------------------------------
+
+@pytest.fixture(scope='module', params=[1, 2], ids=['1 worker', '2 workers'])
+def tiles(request, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('tiles') / 'cc_tiles.npz')
+
+    # Several build chunks, and for the pool some chunks beyond its table
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(tiles_cc, 'BUILD_CHUNK_SIZE', 8*tiles_cc.BASE_BLOCK)
+        patch.setattr(cc, 'SCAN_MEMO_LIMIT', 16*tiles_cc.BASE_BLOCK)
+        tiles_cc.build_tiles(path, CAPACITY, request.param)
+
+    return tiles_cc.DistributionTiles(path)
+
+# ----------------------------------------------------------------------------------------------
+
+def _expected_counts(bins, size, seeds, stop) -> np.ndarray:
+    """Counts of the bins of every row, each row holding the seeds from its first seed to the next."""
+
+    edges = list(seeds) + [stop]
+    return np.array([np.bincount(bins[a - 1:b - 1], minlength=size) for a, b in zip(edges, edges[1:])])
+
+# ----------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize('metric', tiles_cc.METRICS)
+@pytest.mark.parametrize('start, stop', [(1, None), (20000, 150000), (CAPACITY - 10, CAPACITY + 1)],
+                         ids=['all', 'middle', 'last seeds'])
+def test_query_matches_stopping_times(tiles, stats, metric, start, stop):
+    bins, size = stats[metric]
+    levels = len(tiles.levels[metric])
+    assert levels > 2
+    checked = []
+
+    for level in range(levels):
+        # Just enough columns for the rows of the range at this level
+        block = tiles.base_block * tiles.level_factor**level
+        columns = -(-((stop or CAPACITY + 1) - 1) // block) - (start - 1) // block
+
+        result = tiles.query(metric, start, stop, max_columns=columns)
+        if result['level'] != level:
+            # Several levels can give the same number of rows, the finest is chosen
+            assert result['level'] < level
+            continue
+
+        assert result['block'] == block
+        assert result['seeds'][0] <= start < result['stop']
+        assert result['stop'] == min(result['seeds'][-1] + block, CAPACITY + 1)
+
+        expected = _expected_counts(bins, size, result['seeds'], result['stop'])
+        assert np.array_equal(result['counts'], expected)
+        assert np.array_equal(result['histogram'], expected.sum(axis=0))
+        checked.append(level)
+
+    if stop is None:
+        assert checked == list(range(levels))
+
+# ----------------------------------------------------------------------------------------------
+
+def test_whole_range_histogram(tiles, stats):
+    for metric in tiles_cc.METRICS:
+        bins, size = stats[metric]
+        assert np.array_equal(tiles.query(metric)['histogram'], np.bincount(bins, minlength=size))
+        assert tiles.query(metric)['histogram'].sum() == CAPACITY
@@ -0,0 +1,249 @@
+"""Precomputed, multi-resolution histograms (tiles) of Collatz Conjecture stopping times and peaks.
+
+Seeds 1..capacity are grouped in blocks of BASE_BLOCK seeds.  For every block, the tiles hold the
+number of seeds per step-count bin and per peak bin (the bit length of the peak value).  Level 0
+has one row per block, each further level merges LEVEL_FACTOR rows of the level below, so any
+seed range is drawn from at most a few hundred rows whatever its size.  Tiles are built once
+(python tiles_cc.py CAPACITY) and saved to a .npz file.
+"""
+
+import argparse
+import os
+from timeit import default_timer as timer
+import numpy as np
+import collatz_conjecture as cc
+
+TILES_VERSION = 1
+
+# Seeds per row of level 0, and rows of a level merged into one row of the next
+BASE_BLOCK = 1 << 12
+LEVEL_FACTOR = 4
+
+# Steps per step-count bin, and number of bins (the last one also counts longer trajectories)
+STEP_BIN = 4
+STEP_BINS = 512
+
+# Peak bins are bit lengths, the last one also counts longer peaks
+PEAK_BINS = 128
+
+# Rows returned by a query at most, i.e. the horizontal resolution of a heatmap
+MAX_COLUMNS = 400
+
+# Seeds computed per task when building
+BUILD_CHUNK_SIZE = BASE_BLOCK << 8
+
+METRICS = ('steps', 'peaks')
+
+# ----------------------------------------------------------------------------------------------
+
+def bit_lengths(peaks) -> np.ndarray:
+    """Returns the exact bit length of every peak value.
+
+    Args:
+        peaks (array or list): Peak values, an array('Q') or a list when some exceed 64 bits.
+
+    Returns:
+        np.ndarray: int64 bit lengths.
+    """
+
+    if not isinstance(peaks, list):
+        values = np.frombuffer(peaks, dtype=np.uint64) if len(peaks) else np.empty(0, dtype=np.uint64)
+
+        # The float exponent is the bit length, one too high when rounding reached a power of 2
+        lengths = np.minimum(np.frexp(values.astype(np.float64))[1].astype(np.int64), 64)
+        too_high = (lengths > 0) & (np.left_shift(np.uint64(1), (lengths - 1).clip(0).astype(np.uint64)) > values)
+        return lengths - too_high
+
+    return np.array([p.bit_length() for p in peaks], dtype=np.int64)
+
+# ----------------------------------------------------------------------------------------------
+
+def _block_rows(steps, peaks) -> tuple:
+    """Computes the level 0 rows of one chunk of whole blocks from its stopping times.
+
+    Args:
+        steps (array or memoryview): Number of steps of each seed, the first seed s of the chunk
+            being such that s - 1 is a multiple of BASE_BLOCK.
+        peaks (array, memoryview or list): Peak value of each seed.
+
+    Returns:
+        tuple : (steps_rows, peaks_rows) count arrays of shape (blocks, bins).
+    """
+
+    blocks = -(-len(steps) // BASE_BLOCK)
+    block = np.arange(len(steps)) // BASE_BLOCK
+    step_bin = np.minimum(np.frombuffer(steps, dtype=np.uint32) // STEP_BIN, STEP_BINS - 1)
+    peak_bin = np.minimum(bit_lengths(peaks), PEAK_BINS - 1)
+
+    steps_rows = np.bincount(block*STEP_BINS + step_bin, minlength=blocks*STEP_BINS).reshape(blocks, STEP_BINS)
+    peaks_rows = np.bincount(block*PEAK_BINS + peak_bin, minlength=blocks*PEAK_BINS).reshape(blocks, PEAK_BINS)
+
+    return steps_rows, peaks_rows
+
+# ----------------------------------------------------------------------------------------------
+
+def _chunk_tiles(args) -> tuple:
+    """Process pool worker: computes the level 0 rows of one chunk of whole blocks.
+
+    Trajectories leaving the chunk finish on the table of the first seeds shared by the pool.
+
+    Args:
+        args (tuple): (start, stop) of the chunk, start - 1 being a multiple of BASE_BLOCK.
+
+    Returns:
+        tuple : (steps_rows, peaks_rows) count arrays of shape (blocks, bins).
+    """
+
+    start, stop = args
+    return _block_rows(*cc.stopping_times(start, stop, cc.scan_table()))
+
+# ----------------------------------------------------------------------------------------------
+
+def _levels(rows) -> list:
+    """Returns level 0 (rows) and every coarser level, down to a single row."""
+
+    levels = [rows]
+
+    while len(rows) > 1:
+        pad = -len(rows) % LEVEL_FACTOR
+        if pad:
+            rows = np.concatenate([rows, np.zeros((pad, rows.shape[1]), dtype=rows.dtype)])
+        rows = rows.reshape(-1, LEVEL_FACTOR, rows.shape[1]).sum(axis=1)
+        levels.append(rows)
+
+    return levels
+
+# ----------------------------------------------------------------------------------------------
+
+def build_tiles(path, capacity, workers=1, progress=None):
+    """Computes the tiles of seeds 1..capacity and saves them to a .npz file.
+
+    Args:
+        path (str): Path of the tiles file.
+        capacity (int): Number of seeds covered.
+        workers (int, optional): Number of worker processes, None for one per CPU. Defaults to 1.
+        progress (callable, optional): Called with the number of seeds done after every chunk.
+    """
+
+    if capacity < 1:
+        raise ValueError(f"Tiles must cover at least one seed, got {capacity}.")
+
+    steps_rows = []
+    peaks_rows = []
+
+    def collect(stop, rows):
+        steps_rows.append(rows[0])
+        peaks_rows.append(rows[1])
+        if progress:
+            progress(stop - 1)
+
+    if workers == 1:
+        # Each chunk finishes its trajectories on the chunks before it
+        for start, steps, peaks in cc.iter_stopping_times(1, capacity + 1, BUILD_CHUNK_SIZE):
+            collect(start + len(steps), _block_rows(steps, peaks))
+    else:
+        # The first whole chunks are tabulated by the pool, the others finish their trajectories on them
+        table_stop = min(capacity + 1, 1 + cc.SCAN_MEMO_LIMIT // BUILD_CHUNK_SIZE * BUILD_CHUNK_SIZE)
+        chunks = [(a, min(a + BUILD_CHUNK_SIZE, capacity + 1)) for a in range(table_stop, capacity + 1, BUILD_CHUNK_SIZE)]
+
+        with cc.scan_pool(workers, table_stop) as (pool, (steps, peaks)):
+            for a in range(1, table_stop, BUILD_CHUNK_SIZE):
+                b = min(a + BUILD_CHUNK_SIZE, table_stop)
+                collect(b, _block_rows(steps[a - 1:b - 1], peaks[a - 1:b - 1]))
+
+            for (_, stop), rows in zip(chunks, pool.map(_chunk_tiles, chunks)):
+                collect(stop, rows)
+
+    arrays = {'meta': np.array([TILES_VERSION, capacity, BASE_BLOCK, LEVEL_FACTOR, STEP_BIN], dtype=np.int64)}
+    for metric, rows in zip(METRICS, (steps_rows, peaks_rows)):
+        # Counts of a row never exceed its number of seeds
+        for level, counts in enumerate(_levels(np.concatenate(rows))):
+            dtype = np.uint16 if BASE_BLOCK * LEVEL_FACTOR**level < 2**16 else np.uint32
+            arrays[f'{metric}_{level}'] = counts.astype(dtype)
+
+    with open(path, 'wb') as f:
+        np.savez(f, **arrays)
+
+# ----------------------------------------------------------------------------------------------
+
+class DistributionTiles:
+    """Read access to a tiles file, loaded in memory once."""
+
+    def __init__(self, path):
+        """Loads a tiles file.
+
+        Args:
+            path (str): Path of the tiles file.
+
+        Raises:
+            ValueError: If the file has another format version.
+        """
+
+        with np.load(path) as data:
+            version, self.capacity, self.base_block, self.level_factor, self.step_bin = (int(v) for v in data['meta'])
+            if version != TILES_VERSION:
+                raise ValueError(f"Tiles format version {version} is stale, expected {TILES_VERSION}.")
+
+            self.levels = {metric: [] for metric in METRICS}
+            for metric in METRICS:
+                while f'{metric}_{len(self.levels[metric])}' in data:
+                    self.levels[metric].append(data[f'{metric}_{len(self.levels[metric])}'])
+
+    def bin_edges(self, metric) -> np.ndarray:
+        """Returns the lower edge of every bin of a metric (steps, or peak bit length)."""
+
+        bins = self.levels[metric][0].shape[1]
+        return np.arange(bins) * (self.step_bin if metric == 'steps' else 1)
+
+    def query(self, metric, start=1, stop=None, max_columns=MAX_COLUMNS) -> dict:
+        """Returns the counts of a metric over a seed range, at the finest level that fits max_columns.
+
+        The range is widened to whole rows of the chosen level.
+
+        Args:
+            metric (str): 'steps' or 'peaks'.
+            start (int, optional): The first seed of the range. Defaults to 1.
+            stop (int, optional): One past the last seed of the range. Defaults to the whole file.
+            max_columns (int, optional): Maximum number of rows returned. Defaults to MAX_COLUMNS.
+
+        Returns:
+            dict: 'level', 'block' (seeds per row), 'seeds' (first seed of each row), 'stop' (one
+                  past the last seed of the last row), 'bins' (lower bin edges), 'counts'
+                  (rows x bins) and 'histogram' (counts of the range).
+        """
+
+        stop = min(stop or self.capacity + 1, self.capacity + 1)
+        start = max(min(start, stop - 1), 1)
+
+        for level, counts in enumerate(self.levels[metric]):
+            block = self.base_block * self.level_factor**level
+            first = (start - 1) // block
+            last = -(-(stop - 1) // block)
+            if last - first <= max_columns or level == len(self.levels[metric]) - 1:
+                break
+
+        rows = counts[first:last]
+
+        return {'level': level,
+                'block': block,
+                'seeds': 1 + block*np.arange(first, last),
+                'stop': min(1 + block*last, self.capacity + 1),
+                'bins': self.bin_edges(metric),
+                'counts': rows,
+                'histogram': rows.sum(axis=0)}
+
+# ----------------------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Builds the distribution tiles of seeds 1..CAPACITY.')
+    parser.add_argument('capacity', type=int, help='Number of seeds covered, e.g. 100000000.')
+    parser.add_argument('--output', default='cc_tiles.npz', help='Tiles file. Defaults to cc_tiles.npz.')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of worker processes (0 for one per CPU). Defaults to 1.')
+    args = parser.parse_args()
+
+    begin = timer()
+    build_tiles(args.output, args.capacity, args.workers or None,
+                lambda done: print(f'Built {done}/{args.capacity} seeds', end='\r'))
+    print(f'\nBuilt {args.output} ({os.path.getsize(args.output) / 2**20:.1f} MiB) in {timer() - begin:.3f} s.')